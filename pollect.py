@@ -5,5 +5,8 @@ import signal
 signal.signal(signal.SIGINT, debug_signal_handler)
 
 import pollect.Pollect
-pollect.Pollect.main()
+
+if __name__ == '__main__':
+    # Guarded since worker processes (see ProcessWorker) import this module again
+    pollect.Pollect.main()
 
@@ -5,9 +5,12 @@ import sys
 
 import yaml
 
+from pollect.core.AsyncExecutionScheduler import AsyncExecutionScheduler
 from pollect.core.Core import Configuration
 from pollect.core.ExecutionScheduler import ExecutionScheduler
+from pollect.core.Factories import SourceFactory
 from pollect.core.Log import Log
+from pollect.core.Profiler import Profiler
 
 
 def load_config(config: str):
@@ -35,6 +38,8 @@ def main():
                              'both (yml and json) will be checked.')
     parser.add_argument('-r', '--dry-run', dest='dry_run', action='store_true',
                         help='Prints the probed data to stdout instead of sending it to the writer')
+    parser.add_argument('--list-sources', dest='list_sources', action='store_true',
+                        help='Prints all available source types')
     args = parser.parse_args()
 
     if args.version:
@@ -42,6 +47,11 @@ def main():
         print(f'Pollect {__version__}')
         return
 
+    if args.list_sources:
+        for class_name in SourceFactory(None).get_names():
+            print(class_name[:-len('Source')] if class_name.endswith('Source') else class_name)
+        return
+
     if args.debug:
         Log.set_debug()
 
@@ -53,11 +63,36 @@ def main():
             scheduler.stop()
         sys.exit(0)
 
+    def reload_handler(signal, frame):
+        if scheduler is None:
+            return
+        try:
+            scheduler.reload(load_config(args.config))
+        except Exception as e:
+            scheduler.log.error(f'Could not load configuration {args.config}: {e}')
+
+    def profile_handler(signum, frame):
+        if scheduler is None:
+            return
+        mode = Profiler.MODE_CPU if signum == signal.SIGUSR1 else Profiler.MODE_MEMORY
+        collections = [executor.collection_name for executor in scheduler.executors]
+        scheduler.config.profiler.start(mode, collections)
+
     signal.signal(signal.SIGINT, signal_handler)
+    if hasattr(signal, 'SIGUSR1'):
+        # Profiles the next ticks of all collections
+        signal.signal(signal.SIGUSR1, profile_handler)
+        signal.signal(signal.SIGUSR2, profile_handler)
+    if hasattr(signal, 'SIGHUP'):
+        # Reloads the configuration, unchanged sources and writers are kept
+        signal.signal(signal.SIGHUP, reload_handler)
 
     raw_config = load_config(args.config)
     config = Configuration(raw_config, args.dry_run)
-    scheduler = ExecutionScheduler(config, config.create_executors())
+    if config.engine == Configuration.ENGINE_ASYNCIO:
+        scheduler = AsyncExecutionScheduler(config, config.create_executors())
+    else:
+        scheduler = ExecutionScheduler(config, config.create_executors())
     scheduler.create()
     scheduler.run()
 
@@ -0,0 +1,249 @@
+"""
+Synthetic load benchmark of the core pipeline (sources, executor and writer).
+
+Usage: python -m pollect.bench --sources 1000 --values 100 [--writer prometheus] [--json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import platform
+import sys
+import threading
+import time
+from typing import List, Dict, Optional
+
+from pollect import __version__
+from pollect.core.Core import Configuration, Executor
+
+
+def create_config(args) -> Dict[str, any]:
+    """
+    Creates the pollect configuration of the benchmark
+    :param args: Command line arguments
+    :return: Raw configuration
+    """
+    executors = []
+    for index in range(args.executors):
+        sources = []
+        for source in range(index, args.sources, args.executors):
+            sources.append({
+                'type': 'Synthetic',
+                # Unique names, otherwise the sources would be shared
+                'name': f's{source}',
+                'values': args.values,
+                'labelCount': args.labels,
+                'cardinality': args.cardinality,
+                'columnar': args.columnar,
+                'labels': {
+                    'bench': 'true'
+                }
+            })
+        executors.append({
+            'collection': f'bench{index}',
+            'sources': sources,
+        })
+
+    writer = {'type': 'InMemory'}
+    if args.writer == 'prometheus':
+        writer = {'type': 'Prometheus', 'port': 0}
+    elif args.writer == 'prerendered':
+        writer = {'type': 'Prometheus', 'port': 0, 'prerender': True}
+    return {
+        'tickTime': 1,
+        'threads': args.threads,
+        'engine': args.engine,
+        'writer': writer,
+        'executors': executors,
+    }
+
+
+def run_tick(config: Configuration, executors: List[Executor]):
+    """
+    Executes all executors once, concurrently like the scheduler does
+    :param config: Configuration
+    :param executors: Executors
+    """
+    if config.engine == Configuration.ENGINE_ASYNCIO:
+        async def execute():
+            await asyncio.gather(*[executor.execute_async() for executor in executors])
+
+        asyncio.run(execute())
+    elif len(executors) == 1:
+        executors[0].execute()
+    else:
+        threads = [threading.Thread(target=executor.execute) for executor in executors]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    if hasattr(config.writer, 'data'):
+        # The in memory writer would otherwise keep all data
+        config.writer.data.clear()
+
+
+def get_percentile(values: List[float], percentile: float) -> float:
+    """
+    Returns the given percentile (nearest rank)
+    :param values: Sorted values
+    :param percentile: Percentile between 0 and 100
+    :return: Value
+    """
+    rank = math.ceil(percentile / 100 * len(values))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def get_peak_rss() -> Optional[int]:
+    """
+    Returns the peak resident set size of the process
+    :return: Size in bytes or None if not supported
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak
+    # Linux reports kilobytes
+    return peak * 1024
+
+
+def measure_scrape(writer, scrapes: int) -> Optional[float]:
+    """
+    Measures how long rendering the prometheus exposition takes
+    :param writer: Prometheus writer
+    :param scrapes: Number of renderings, the median is returned
+    :return: Duration in seconds
+    """
+    from prometheus_client import REGISTRY, generate_latest
+
+    durations = []
+    for _ in range(scrapes):
+        start = time.perf_counter()
+        if writer.config.get('prerender', False):
+            writer.get_prerendered({})
+        else:
+            generate_latest(REGISTRY)
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    return durations[len(durations) // 2]
+
+
+def run(args) -> Dict[str, any]:
+    """
+    Runs the benchmark
+    :param args: Command line arguments
+    :return: Results
+    """
+    start = time.perf_counter()
+    config = Configuration(create_config(args))
+    executors = config.create_executors()
+    setup_time = time.perf_counter() - start
+
+    try:
+        for _ in range(args.warmup):
+            run_tick(config, executors)
+
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            tick_start = time.perf_counter()
+            run_tick(config, executors)
+            latencies.append(time.perf_counter() - tick_start)
+        duration = time.perf_counter() - start
+
+        scrape_time = None
+        if args.writer != 'memory':
+            scrape_time = measure_scrape(config.writer, args.scrapes)
+    finally:
+        for executor in executors:
+            executor.shutdown()
+
+    latencies.sort()
+    values = args.sources * args.values
+    return {
+        'pollect': __version__,
+        'python': platform.python_version(),
+        'parameters': {
+            'sources': args.sources,
+            'values': args.values,
+            'labels': args.labels,
+            'cardinality': args.cardinality,
+            'columnar': args.columnar,
+            'executors': args.executors,
+            'threads': args.threads,
+            'engine': args.engine,
+            'writer': args.writer,
+            'ticks': args.ticks,
+        },
+        'setup_seconds': setup_time,
+        'ticks_per_second': args.ticks / duration,
+        'values_per_second': args.ticks * values / duration,
+        'tick_latency_seconds': {
+            'p50': get_percentile(latencies, 50),
+            'p90': get_percentile(latencies, 90),
+            'p99': get_percentile(latencies, 99),
+            'max': latencies[-1],
+        },
+        'peak_rss_bytes': get_peak_rss(),
+        'scrape_render_seconds': scrape_time,
+    }
+
+
+def print_results(results: Dict[str, any]):
+    parameters = results['parameters']
+    latency = results['tick_latency_seconds']
+    print(f'pollect {results["pollect"]} (python {results["python"]})')
+    print(f'{parameters["sources"]} sources x {parameters["values"]} values, {parameters["executors"]} executor(s), '
+          f'{parameters["engine"]} engine, {parameters["writer"]} writer')
+    print(f'Setup:          {results["setup_seconds"]:.3f} s')
+    print(f'Ticks/s:        {results["ticks_per_second"]:.2f}')
+    print(f'Values/s:       {results["values_per_second"]:.0f}')
+    print(f'Tick latency:   p50 {latency["p50"] * 1000:.1f} ms, p90 {latency["p90"] * 1000:.1f} ms, '
+          f'p99 {latency["p99"] * 1000:.1f} ms, max {latency["max"] * 1000:.1f} ms')
+    if results['peak_rss_bytes'] is not None:
+        print(f'Peak RSS:       {results["peak_rss_bytes"] / 1024 / 1024:.1f} MiB')
+    if results['scrape_render_seconds'] is not None:
+        print(f'Scrape render:  {results["scrape_render_seconds"] * 1000:.1f} ms')
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(prog='python -m pollect.bench',
+                                     description='Synthetic load benchmark of the pollect pipeline')
+    parser.add_argument('--sources', type=int, default=100, help='Number of sources')
+    parser.add_argument('--values', type=int, default=100, help='Values per source')
+    parser.add_argument('--labels', type=int, default=2, help='Additional labels per value')
+    parser.add_argument('--cardinality', type=int, default=10, help='Distinct values of each additional label')
+    parser.add_argument('--columnar', action='store_true', help='Returns the values as columnar value sets')
+    parser.add_argument('--executors', type=int, default=1, help='Number of executors the sources are split into')
+    parser.add_argument('--threads', type=int, default=5, help='Concurrency of each executor')
+    parser.add_argument('--engine', choices=[Configuration.ENGINE_THREAD, Configuration.ENGINE_ASYNCIO],
+                        default=Configuration.ENGINE_THREAD)
+    parser.add_argument('--writer', choices=['memory', 'prometheus', 'prerendered'], default='memory')
+    parser.add_argument('--ticks', type=int, default=10, help='Number of measured ticks')
+    parser.add_argument('--warmup', type=int, default=1, help='Number of ticks before the measurement')
+    parser.add_argument('--scrapes', type=int, default=3, help='Number of measured prometheus renderings')
+    parser.add_argument('--json', dest='json', action='store_true', help='Prints the results as json')
+    args = parser.parse_args(argv)
+    if args.ticks < 1:
+        parser.error('--ticks must be at least 1')
+
+    # Logging each probe would dominate the measurement.
+    # Disabled for the run only, so the log level of the process is unchanged afterwards
+    disabled = logging.root.manager.disable
+    logging.disable(logging.WARNING)
+    try:
+        results = run(args)
+    finally:
+        logging.disable(disabled)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+
+if __name__ == '__main__':
+    main()
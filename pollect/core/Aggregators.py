@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import math
+from abc import abstractmethod
+from typing import Dict, Callable
+
+
+class Aggregator:
+    """
+    Aggregates the values of a single series between two probes, using constant memory
+    """
+
+    __slots__ = ()
+
+    @abstractmethod
+    def add(self, value: float):
+        """
+        Adds a value
+        :param value: Value
+        """
+
+    @abstractmethod
+    def get(self) -> float:
+        """
+        Returns the aggregated value
+        :return: Value
+        """
+
+
+class LastAggregator(Aggregator):
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = math.nan
+
+    def add(self, value: float):
+        self.value = value
+
+    def get(self) -> float:
+        return self.value
+
+
+class SumAggregator(Aggregator):
+    __slots__ = ('sum',)
+
+    def __init__(self):
+        self.sum = 0
+
+    def add(self, value: float):
+        self.sum += value
+
+    def get(self) -> float:
+        return self.sum
+
+
+class CountAggregator(Aggregator):
+    __slots__ = ('count',)
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+
+    def get(self) -> float:
+        return self.count
+
+
+class MinAggregator(Aggregator):
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = math.inf
+
+    def add(self, value: float):
+        if value < self.value:
+            self.value = value
+
+    def get(self) -> float:
+        return self.value
+
+
+class MaxAggregator(Aggregator):
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = -math.inf
+
+    def add(self, value: float):
+        if value > self.value:
+            self.value = value
+
+    def get(self) -> float:
+        return self.value
+
+
+class AvgAggregator(Aggregator):
+    __slots__ = ('sum', 'count')
+
+    def __init__(self):
+        self.sum = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.sum += value
+        self.count += 1
+
+    def get(self) -> float:
+        return self.sum / self.count
+
+
+class QuantileAggregator(Aggregator):
+    """
+    Estimates a quantile using a DDSketch: the values are counted in logarithmic buckets,
+    so the estimate has a relative error of at most the configured accuracy.
+    The number of buckets is limited, if exceeded the lowest buckets are merged.
+    """
+
+    __slots__ = ('quantile', 'positive', 'negative', 'zeros', 'count')
+
+    ACCURACY = 0.01
+    """
+    Maximum relative error of the estimate
+    """
+
+    MAX_BUCKETS = 1024
+    """
+    Maximum number of buckets of each sign
+    """
+
+    GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+
+    def __init__(self, quantile: float):
+        """
+        :param quantile: Quantile between 0 and 1
+        """
+        self.quantile = quantile
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value == 0:
+            self.zeros += 1
+            return
+        buckets = self.positive if value > 0 else self.negative
+        index = math.ceil(math.log(abs(value)) / self.LOG_GAMMA)
+        buckets[index] = buckets.get(index, 0) + 1
+        if len(buckets) > self.MAX_BUCKETS:
+            self._collapse(buckets)
+
+    def get(self) -> float:
+        if self.count == 0:
+            return math.nan
+        rank = self.quantile * (self.count - 1)
+        seen = 0
+        # Negative values, from the largest magnitude to the smallest
+        for index in sorted(self.negative.keys(), reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._get_value(index)
+        seen += self.zeros
+        if seen > rank:
+            return 0
+        for index in sorted(self.positive.keys()):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._get_value(index)
+        return math.nan
+
+    def _get_value(self, index: int) -> float:
+        return 2 * self.GAMMA ** index / (self.GAMMA + 1)
+
+    @staticmethod
+    def _collapse(buckets: Dict[int, int]):
+        # Merges the two lowest buckets, which only affects the accuracy of the lowest values
+        lowest, second = sorted(buckets.keys())[:2]
+        buckets[second] += buckets.pop(lowest)
+
+
+AGGREGATORS: Dict[str, Callable[[], Aggregator]] = {
+    'last': LastAggregator,
+    'sum': SumAggregator,
+    'count': CountAggregator,
+    'min': MinAggregator,
+    'max': MaxAggregator,
+    'avg': AvgAggregator,
+}
+"""
+Aggregations by name, quantiles are named p<percentile> (e.g. p95 or p99.9)
+"""
+
+
+def get_factory(name: str) -> Callable[[], Aggregator]:
+    """
+    Returns the factory of the aggregator with the given name
+    :param name: Name of the aggregation (e.g. avg or p95)
+    :return: Function which creates a new aggregator
+    """
+    factory = AGGREGATORS.get(name)
+    if factory is not None:
+        return factory
+    if name.startswith('p'):
+        try:
+            quantile = float(name[1:]) / 100
+        except ValueError:
+            quantile = -1
+        if 0 <= quantile <= 1:
+            return lambda: QuantileAggregator(quantile)
+    raise ValueError(f'Unknown aggregation {name}, supported are {", ".join(AGGREGATORS.keys())} and '
+                     f'p<percentile>')
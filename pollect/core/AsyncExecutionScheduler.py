@@ -0,0 +1,211 @@
+import asyncio
+import math
+import traceback
+from typing import List, Dict, Optional, Tuple
+
+from pollect.core import Helper
+from pollect.core.Log import Log
+
+from pollect.core.Core import Configuration, Executor
+
+
+class AsyncExecutionScheduler(Log):
+    """
+    Schedules the executors on a single asyncio event loop.
+    Each executor runs as its own task so different executors can't block each-other during execution,
+    without requiring a dedicated thread per executor
+    """
+    _tick_times: Dict[Executor, float]
+    _replacements: Dict[Executor, Tuple[Optional[Executor], List[Executor]]]
+    """
+    Executor which replaces a running executor after a reload (None if its collection has been removed)
+    and all new executors
+    """
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _stop_event: Optional[asyncio.Event] = None
+
+    def __init__(self, config: Configuration, executors: List[Executor]):
+        super().__init__()
+        self.config = config
+        self.executors = executors
+        self._active = False
+        self._tick_times = {}
+        self._replacements = {}
+        self._tasks: List[asyncio.Future] = []
+
+    def create(self):
+        """
+        Creates the schedulers for the executors
+        """
+        for executor in self.executors:
+            if executor.is_scheduled():
+                self._tick_times[executor] = executor.get_interval()
+
+    def run(self):
+        """
+        Starts the scheduling, this blocks until stop() is called
+        """
+        self._active = True
+        asyncio.run(self._run())
+        self.log.debug('Stopped scheduler execution')
+
+    async def _run(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        if not self._active:
+            # Stopped before the loop was running
+            return
+
+        self._tasks = [asyncio.ensure_future(self._run_executor(executor)) for executor in self.executors
+                       if executor.is_scheduled()]
+        await self._stop_event.wait()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run_executor(self, executor: Executor):
+        """
+        Executes the given executor in its tick interval
+        :param executor: Executor
+        """
+        tick_time = self._tick_times[executor]
+        next_run = self._loop.time() + executor.get_start_delay()
+        await asyncio.sleep(next_run - self._loop.time())
+        while self._active:
+            if executor in self._replacements:
+                # The configuration has been reloaded
+                successor = self._replace(executor)
+                if successor is None:
+                    break
+                executor = successor
+                if self._tick_times[executor] != tick_time:
+                    tick_time = self._tick_times[executor]
+                    next_run = self._loop.time() + executor.get_start_delay()
+                    await asyncio.sleep(next_run - self._loop.time())
+                    continue
+
+            self.log.debug(f'Scheduling execution of {executor.collection_name}')
+            now = self._loop.time()
+            backlog = min(self._get_missed(next_run, tick_time, now), executor.get_backlog_limit())
+            executor.record_start(now - next_run, backlog)
+            jitter = executor.get_jitter()
+            if jitter > 0:
+                await asyncio.sleep(jitter)
+            try:
+                await executor.execute_async()
+            except Exception as e:
+                traceback.print_exc()
+                self.log.error(f'Error while executing {executor.collection_name}: {e}')
+
+            now = self._loop.time()
+            next_run = self._get_next_run(executor, next_run, tick_time, now)
+            await asyncio.sleep(next_run - now)
+        self.log.info(f'Stopped execution of {executor.collection_name}')
+
+    @staticmethod
+    def _get_missed(last_run: float, tick_time: float, now: float) -> int:
+        """
+        Returns the number of ticks after the given one which are already due
+        :param last_run: Target time of the last tick
+        :param tick_time: Interval in seconds
+        :param now: Current time
+        :return: Number of due ticks
+        """
+        if last_run + tick_time > now:
+            return 0
+        return math.floor((now - last_run) / tick_time)
+
+    def _get_next_run(self, executor: Executor, last_run: float, tick_time: float, now: float) -> float:
+        """
+        Returns the target time of the next execution, according to the overrun policy of the executor
+        :param executor: Executor
+        :param last_run: Target time of the last execution
+        :param tick_time: Interval in seconds
+        :param now: Current time
+        :return: Target time of the next execution
+        """
+        missed = self._get_missed(last_run, tick_time, now)
+        if missed == 0:
+            return last_run + tick_time
+
+        # The execution took longer than the tick time
+        limit = executor.get_backlog_limit()
+        if limit == 0:
+            executor.record_skipped(missed)
+            return Helper.get_next_run(last_run, tick_time, now)
+        if missed > limit:
+            executor.record_skipped(missed - limit)
+        if executor.overrun == Configuration.OVERRUN_COALESCE:
+            # Execute right away, as part of the latest due tick
+            return last_run + missed * tick_time
+        # Execute the oldest tick which is still in the backlog right away
+        return last_run + (max(0, missed - limit) + 1) * tick_time
+
+    def reload(self, config):
+        """
+        Replaces the executors with the ones of the given configuration.
+        The reload is done by the event loop, this method returns right away.
+
+        :param config: New raw configuration
+        """
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._reload, config)
+
+    def _reload(self, raw_config):
+        """
+        Creates the executors of the given configuration.
+        The running executors are replaced on their next tick, so unchanged collections keep their schedule
+        :param raw_config: New raw configuration
+        """
+        try:
+            config, executors = self.config.reload(raw_config, self.executors)
+        except Exception as e:
+            traceback.print_exc()
+            self.log.error(f'Could not reload the configuration, keeping the current one: {e}')
+            return
+
+        self.log.info('Reloading configuration')
+        for executor in self.executors:
+            if executor.is_scheduled():
+                self._replacements[executor] = (None, executors)
+            else:
+                # Probed on scrape, there is no task which could replace it later
+                executor.shutdown(executors)
+        for executor in executors:
+            predecessor = executor.predecessor
+            executor.predecessor = None
+            if not executor.is_scheduled():
+                continue
+            self._tick_times[executor] = executor.get_interval()
+            if predecessor is None or not predecessor.is_scheduled():
+                # New collection
+                self._tasks.append(asyncio.ensure_future(self._run_executor(executor)))
+            else:
+                self._replacements[predecessor] = (executor, executors)
+        self.config = config
+        self.executors = executors
+
+    def _replace(self, executor: Executor) -> Optional[Executor]:
+        """
+        Shuts down the given executor after a reload, keeping everything the new executors still use
+        :param executor: Replaced executor
+        :return: Executor which replaces the given one or None if its collection has been removed
+        """
+        while executor in self._replacements:
+            successor, executors = self._replacements.pop(executor)
+            del self._tick_times[executor]
+            executor.shutdown(executors)
+            if successor is None:
+                return None
+            executor = successor
+        return executor
+
+    def stop(self):
+        """
+        Stops the scheduling and terminates all probes
+        """
+        self._active = False
+        if self._loop is not None and self._stop_event is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        for executor in self.executors:
+            executor.shutdown()
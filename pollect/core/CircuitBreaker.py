@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for a single source.
+    After a number of consecutive failures the circuit opens and the source is skipped.
+    Once the back-off has passed a single probe is allowed (half-open):
+    if it succeeds the circuit closes again, otherwise the back-off is doubled.
+    """
+
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+    failure_threshold: int
+    """
+    Number of consecutive failures after which the circuit opens
+    """
+
+    backoff: float
+    """
+    Initial back-off in seconds
+    """
+
+    max_backoff: float
+    """
+    Maximum back-off in seconds
+    """
+
+    state: int = CLOSED
+    failures: int = 0
+    """
+    Number of consecutive failures
+    """
+
+    def __init__(self, config: Dict[str, any]):
+        self.failure_threshold = max(1, int(config.get('failureThreshold', 3)))
+        self.backoff = float(config.get('backoff', 30))
+        self.max_backoff = float(config.get('maxBackoff', 600))
+        self.state = self.CLOSED
+        self.failures = 0
+        self._current_backoff = self.backoff
+        self._open_until = 0.0
+
+    @staticmethod
+    def create(config: Optional[Dict[str, any] or bool]) -> Optional[CircuitBreaker]:
+        """
+        Creates a circuit breaker from the given configuration
+        :param config: Configuration, True for the default configuration or None/False if disabled
+        :return: Circuit breaker or None if disabled
+        """
+        if config is None or config is False:
+            return None
+        if config is True:
+            config = {}
+        return CircuitBreaker(config)
+
+    def has_same_settings(self, other: CircuitBreaker) -> bool:
+        """
+        Checks if the given circuit breaker uses the same thresholds as this one
+        :param other: Circuit breaker
+        :return: True if the settings are equal
+        """
+        return (self.failure_threshold, self.backoff, self.max_backoff) == \
+            (other.failure_threshold, other.backoff, other.max_backoff)
+
+    def allow(self, now: float) -> bool:
+        """
+        Checks if the source may be probed
+        :param now: Current time (monotonic)
+        :return: True if the source should be probed
+        """
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and now >= self._open_until:
+            # Let a single probe through
+            self.state = self.HALF_OPEN
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._current_backoff = self.backoff
+
+    def record_failure(self, now: float):
+        """
+        Records a failed probe
+        :param now: Current time (monotonic)
+        """
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            # The source is still failing, wait longer
+            self._current_backoff = min(self._current_backoff * 2, self.max_backoff)
+        elif self.failures < self.failure_threshold:
+            return
+        self.state = self.OPEN
+        self._open_until = now + self._current_backoff
+
+    def get_remaining(self, now: float) -> float:
+        """
+        Returns the time until the next probe is allowed
+        :param now: Current time (monotonic)
+        :return: Time in seconds
+        """
+        if self.state != self.OPEN:
+            return 0
+        return max(0.0, self._open_until - now)
@@ -1,14 +1,25 @@
 from __future__ import annotations
 
+import asyncio
+import random
+import threading
 import time
 import traceback
-from concurrent.futures.thread import ThreadPoolExecutor
-from typing import List, Dict, Optional
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from typing import List, Dict, Optional, Tuple, Callable, Set
 
+from pollect.core import Helper
+from pollect.core.CircuitBreaker import CircuitBreaker
 from pollect.core.ValueSet import ValueSet
 
 from pollect.core.Factories import WriterFactory, SourceFactory
 from pollect.core.Log import Log
+from pollect.core.ProcessWorker import ProcessWorker, RemoteSource
+from pollect.core.Profiler import Profiler
+from pollect.core.Shard import Shard
+from pollect.core.SharedSource import SharedSource
+from pollect.core.SelfMetrics import SelfMetrics
+from pollect.core.WorkerPool import WorkerPool, WorkerQuota
 from pollect.sources.Source import Source
 from pollect.core.config.ConfigContainer import ConfigContainer
 from pollect.writers.Writer import Writer
@@ -24,33 +35,197 @@ class Configuration:
     Global data writer which should be used by default
     """
 
-    tick_time: int
+    tick_time: float
     """
     Time for a single probe tick in seconds       
     """
 
-    def __init__(self, config, dry_run: bool = False):
+    engine: str
+    """
+    Execution engine, either "thread" (default) or "asyncio"
+    """
+
+    thread_count: int
+    """
+    Default number of sources an executor may probe concurrently
+    """
+
+    worker_pool: Optional[WorkerPool] = None
+    """
+    Process wide thread pool which is shared by all executors
+    """
+
+    self_metrics: bool = False
+    """
+    True if the internal pollect metrics should be exported as well
+    """
+
+    phase_spread: bool = False
+    """
+    True if the executors should be spread across their interval instead of starting at the same time
+    """
+
+    jitter: float = 0
+    """
+    Maximum random delay in seconds which is added to each execution
+    """
+
+    overrun: str
+    """
+    Default overrun policy of the executors, see OVERRUN_*
+    """
+
+    shard: Optional[Shard] = None
+    """
+    Slice of the sharded sources owned by this instance, None if sharding is disabled
+    """
+
+    circuit_breaker: Optional[Dict[str, any] or bool] = None
+    """
+    Default circuit breaker configuration of the sources, None if disabled
+    """
+
+    share_sources: bool = False
+    """
+    True if sources with the same configuration in multiple executors should only be probed once
+    """
+
+    profiler: Profiler
+    """
+    Profiler which can be started on demand, see Profiler
+    """
+
+    ENGINE_THREAD = 'thread'
+    ENGINE_ASYNCIO = 'asyncio'
+
+    OVERRUN_SKIP = 'skip'
+    """
+    Ticks which are due while the executor is still running are dropped
+    """
+    OVERRUN_COALESCE = 'coalesce'
+    """
+    All ticks which are due while the executor is still running are merged into a single execution
+    """
+    OVERRUN_IMMEDIATE = 'immediate'
+    """
+    Each tick which is due while the executor is still running is executed right after the current execution
+    """
+
+    PROBE_ON_TICK = 'tick'
+    """
+    The sources are probed in the tick interval of the executor
+    """
+    PROBE_ON_SCRAPE = 'scrape'
+    """
+    The sources are probed when the data is read from the writer (e.g. scraped by prometheus)
+    """
+
+    def __init__(self, config, dry_run: bool = False, writers: Optional[List[Writer]] = None):
+        """
+        :param config: Raw configuration
+        :param dry_run: True if the data should be printed instead of being written
+        :param writers: Running writers which should be reused if their configuration is unchanged
+        """
         self.config = ConfigContainer(config)
+        self.dry_run = dry_run
         self.tick_time = self.config.get('tickTime', 10)
         self.thread_count = self.config.get('threads', 5)
+        self.max_threads = self.config.get('maxThreads')
+        self.self_metrics = self.config.get('selfMetrics', False)
+        self.phase_spread = self.config.get('phaseSpread', False)
+        self.jitter = self.config.get('jitter', 0)
+        self.overrun = self.config.get('overrun', self.OVERRUN_COALESCE)
+        self.circuit_breaker = self.config.get('circuitBreaker')
+        self.share_sources = self.config.get('shareSources', False)
+        self.profiler = Profiler(self.config.get('profile', {}))
+        self.shard = Shard.create(self.config.get('shard'))
+        self.engine = self.config.get('engine', self.ENGINE_THREAD)
+        if self.engine not in (self.ENGINE_THREAD, self.ENGINE_ASYNCIO):
+            raise ValueError(f'Unknown engine {self.engine}')
 
-        self.writer_factory = WriterFactory(dry_run)
+        self.writer_factory = WriterFactory(dry_run, writers)
 
         writer_config = self.config.get('writer')
         if writer_config is not None:
             self.writer = self.writer_factory.create(writer_config)
 
-    def create_executors(self) -> List[Executor]:
+    def create_executors(self, previous: Optional[List[Executor]] = None) -> List[Executor]:
+        """
+        Creates the executors of this configuration
+
+        :param previous: Running executors which are replaced by the new ones.
+        Unchanged sources of an executor with the same collection name are reused
+        :return: Executors
+        """
         executors = []
         source_factory = SourceFactory(self)
-        for item in self.config.get('executors'):
-            thread_pool = ThreadPoolExecutor(max_workers=self.thread_count)
-            executor = Executor(thread_pool, item, self)
+        executor_items = self.config.get('executors')
+        remaining = [] if previous is None else list(previous)
+        self.worker_pool = WorkerPool(self._get_max_threads(executor_items))
+        if self.share_sources:
+            source_factory.share([source_item for item in executor_items if not item.get('process', False)
+                                  for source_item in item.get('sources')])
+        for item in executor_items:
+            quota = self.worker_pool.create_quota(item.get('collection'),
+                                                  item.get('maxConcurrency', self.thread_count),
+                                                  item.get('priority', 0))
+            executor = Executor(quota, item, self)
+            executor.predecessor = next((x for x in remaining if x.collection_name == executor.collection_name), None)
+            if executor.predecessor is not None:
+                remaining.remove(executor.predecessor)
             executor.create_writer(self.writer, self.writer_factory)
-            executor.initialize_objects(source_factory)
+            executor.initialize_objects(source_factory, executor.predecessor)
             executors.append(executor)
+        if previous is None:
+            # On a reload the writers are started once the ones they replace have been stopped (see reload)
+            self.writer_factory.start()
         return executors
 
+    def reload(self, config, executors: List[Executor]) -> Tuple[Configuration, List[Executor]]:
+        """
+        Creates a new configuration and its executors, which replace the given (running) executors.
+        Writers and sources whose configuration is unchanged are reused.
+        The old executors must be shut down by the caller, keeping the objects used by the new ones
+
+        :param config: New raw configuration
+        :param executors: Running executors
+        :return: New configuration and executors
+        """
+        new_config = Configuration(config, self.dry_run, [executor.writer for executor in executors])
+        if new_config.engine != self.engine:
+            raise ValueError('The engine can not be changed without a restart')
+        new_executors = new_config.create_executors(executors)
+
+        # Writers which have been replaced are stopped before the new ones are started,
+        # so they release their resources (e.g. the port and the registered prometheus metrics)
+        kept_writers = [executor.writer for executor in new_executors]
+        replaced = [writer for writer in {id(executor.writer): executor.writer for executor in executors}.values()
+                    if not any(writer is kept for kept in kept_writers)]
+        for writer in replaced:
+            writer.stop()
+        try:
+            new_config.writer_factory.start()
+        except Exception:
+            # The current configuration is kept
+            for writer in replaced:
+                writer.start()
+            raise
+        return new_config, new_executors
+
+    def _get_max_threads(self, executor_items) -> int:
+        """
+        Returns the total number of worker threads of the process
+        :param executor_items: Executor configurations
+        :return: Thread count
+        """
+        if self.max_threads is not None:
+            return self.max_threads
+        if self.engine == self.ENGINE_ASYNCIO:
+            # The event loop does the scheduling, only legacy (sync) sources need a thread
+            return self.thread_count
+        # Same parallelism as if each executor had its own pool
+        return sum(item.get('maxConcurrency', self.thread_count) for item in executor_items)
+
 
 class Executor(Log):
     """
@@ -59,7 +234,7 @@ class Executor(Log):
 
     config: Dict[str, any]
     writer: Writer
-    tick_time: int = 0
+    tick_time: float = 0
     collection_name: str
     global_config: Configuration
 
@@ -68,19 +243,103 @@ class Executor(Log):
     List of all sources which should be probed
     """
 
-    thread_pool: ThreadPoolExecutor
+    thread_pool: WorkerQuota
     """
-    Thread pool for probing
+    Quota of the shared worker pool used for probing
     """
 
-    def __init__(self, thread_pool: ThreadPoolExecutor, exec_config: Dict[str, any], global_config: Configuration):
+    timeout: Optional[float] = None
+    """
+    Maximum time in seconds a single execution may take.
+    Probes which take longer are abandoned.
+    """
+
+    self_metrics: SelfMetrics
+    """
+    Internal metrics of this executor
+    """
+
+    phase_spread: bool = False
+    """
+    True if the first execution should be delayed by a stable offset within the interval
+    """
+
+    source_phase_spread: bool = False
+    """
+    True if the sources should be started at a stable offset within the interval
+    """
+
+    MAX_SOURCE_SPREAD = 0.5
+    """
+    Fraction of the interval across which the sources are spread (with sourcePhaseSpread)
+    """
+
+    jitter: float = 0
+    """
+    Maximum random delay in seconds which is added to each execution
+    """
+
+    overrun: str
+    """
+    Policy for ticks which are due while the executor is still running, see Configuration.OVERRUN_*
+    """
+
+    max_backlog: int
+    """
+    Maximum number of ticks which are queued with the "immediate" overrun policy
+    """
+
+    process_worker: Optional[ProcessWorker] = None
+    """
+    Worker process which probes the sources, None if they are probed in this process
+    """
+
+    probe_on: str
+    """
+    When the sources should be probed, see Configuration.PROBE_ON_*
+    """
+
+    min_age: float
+    """
+    Minimum age in seconds of the data before the sources are probed again on scrape
+    """
+
+    predecessor: Optional[Executor] = None
+    """
+    Running executor which is replaced by this one after a configuration reload
+    """
+
+    def __init__(self, thread_pool: WorkerQuota, exec_config: Dict[str, any], global_config: Configuration):
         super().__init__()
         self.thread_pool = thread_pool
         self.config = exec_config
-        self.tick_time = int(self.config.get('tickTime', 0))
+        self.tick_time = float(self.config.get('tickTime', 0))
         self.collection_name = exec_config.get('collection')
+        self.timeout = self.config.get('timeout')
         self.global_config = global_config
+        self.phase_spread = self.config.get('phaseSpread', global_config.phase_spread)
+        self.source_phase_spread = self.config.get('sourcePhaseSpread', False)
+        self.jitter = self.config.get('jitter', global_config.jitter)
+        self.overrun = self.config.get('overrun', global_config.overrun)
+        if self.overrun not in (Configuration.OVERRUN_SKIP, Configuration.OVERRUN_COALESCE,
+                                Configuration.OVERRUN_IMMEDIATE):
+            raise ValueError(f'Unknown overrun policy {self.overrun}')
+        self.max_backlog = int(self.config.get('maxBacklog', 10))
+        self.probe_on = self.config.get('probeOn', Configuration.PROBE_ON_TICK)
+        if self.probe_on not in (Configuration.PROBE_ON_TICK, Configuration.PROBE_ON_SCRAPE):
+            raise ValueError(f'Unknown probeOn value {self.probe_on}')
+        self.min_age = float(self.config.get('minAge', self.get_interval()))
+        self.self_metrics = SelfMetrics({'collection': self.collection_name})
         self._sources = []
+        self._source_items = []
+        self._running = {}
+        self._abandoned: Set[Source] = set()
+        self._next_runs: Dict[Source, float] = {}
+        self._last_data: Dict[Source, List[ValueSet]] = {}
+        self._breakers: Dict[Source, CircuitBreaker] = {}
+        self.process_worker = None
+        self._scrape_lock = threading.Lock()
+        self._last_scrape: Optional[float] = None
 
     def create_writer(self, writer: Optional[Writer], writer_factory: WriterFactory):
         writer_config = self.config.get('writer')
@@ -89,68 +348,498 @@ class Executor(Log):
         if writer_config is None:
             # Use default writer
             self.writer = writer
-            return
+        else:
+            self.writer = writer_factory.create(writer_config)
 
-        self.writer = writer_factory.create(writer_config)
+        if self.probe_on == Configuration.PROBE_ON_SCRAPE:
+            if not self.writer.supports_scrape_hooks():
+                raise ValueError(f'The writer of {self.collection_name} does not support probeOn: scrape')
+            self.writer.add_scrape_hook(self.probe_on_scrape)
 
-    def initialize_objects(self, factory: SourceFactory):
+    def initialize_objects(self, factory: SourceFactory, previous: Optional[Executor] = None):
         """
         Initializes all source objects for the execution phase
 
         :param factory: Factory for creating the source objects
+        :param previous: Running executor whose unchanged sources (and their state) should be reused
         """
-        source_items = self.config.get('sources')
+        source_items = []
+        shards = []
+        for item in self.config.get('sources'):
+            shard = self._get_shard(item)
+            if shard is not None and not getattr(factory.get_class(item), 'shard_targets', False):
+                # The source is assigned to a single shard as a whole
+                if not shard.owns(self._get_shard_key(item)):
+                    self.log.debug(f'Skipping {self._get_shard_key(item)}, owned by another shard')
+                    continue
+                shard = None
+            source_items.append(item)
+            # Sources which split their own targets need to know the shard
+            shards.append(shard)
+
+        breaker_config = self.config.get('circuitBreaker', self.global_config.circuit_breaker)
+        if self.config.get('process', False):
+            if previous is not None and previous.process_worker is not None and \
+                    previous.process_worker.matches(source_items, self.thread_pool.max_concurrency, shards):
+                self.process_worker = previous.process_worker
+            else:
+                # The sources are only created in the worker process
+                self.process_worker = ProcessWorker(self.collection_name, source_items,
+                                                    self.thread_pool.max_concurrency, shards)
+                self.process_worker.start()
+        if previous is not None and previous.process_worker is not self.process_worker:
+            # Sources of another worker process can't be reused
+            previous = None
+
         sources = []
-        for item in source_items:
-            source = factory.create(item)
+        reusable = [] if previous is None else list(zip(previous._source_items, previous._sources))
+        for index, item in enumerate(source_items):
+            breaker = CircuitBreaker.create(item.get('circuitBreaker', breaker_config))
+            source = self._take_source(item, reusable)
+            if source is not None:
+                self._take_state(source, previous, breaker)
+                source.shard = shards[index]
+                sources.append(source)
+                continue
+
+            if self.process_worker is not None:
+                source = RemoteSource(item, self.process_worker, index)
+            else:
+                source = factory.create(item)
             if source is None:
                 raise KeyError('Source of type ' + str(item) + ' not found')
+            source.shard = shards[index]
+            if source.tick_time is not None and source.tick_time < self.get_interval():
+                self.log.warning(f'tickTime of {self.collection_name}/{source} is lower than the tickTime '
+                                 f'of the collection, it is probed on every tick')
+            if breaker is not None:
+                self._breakers[source] = breaker
+            if isinstance(source, SharedSource):
+                source.shared.add_user(max(source.tick_time or 0, self.get_interval()))
             sources.append(source)
         self._sources = sources
+        self._source_items = source_items
+
+    @staticmethod
+    def _take_source(item: Dict[str, any], reusable: List[Tuple[Dict[str, any], Source]]) -> Optional[Source]:
+        """
+        Returns a running source with the same configuration as the given one
+        :param item: Source configuration
+        :param reusable: Configuration and source of all running sources, the returned one is removed
+        :return: Source or None if the source has to be created
+        """
+        for index, (reusable_item, source) in enumerate(reusable):
+            if reusable_item == item:
+                del reusable[index]
+                return source
+        return None
 
-    def shutdown(self):
+    def _take_state(self, source: Source, previous: Executor, breaker: Optional[CircuitBreaker]):
+        """
+        Takes over the scheduling state of a reused source
+        :param source: Source
+        :param previous: Executor which has been running the source
+        :param breaker: New circuit breaker of the source
+        """
+        source.global_conf = self.global_config
+        if source in previous._next_runs:
+            self._next_runs[source] = previous._next_runs[source]
+        if source in previous._last_data:
+            self._last_data[source] = previous._last_data[source]
+        previous_breaker = previous._breakers.get(source)
+        if breaker is not None and previous_breaker is not None and breaker.has_same_settings(previous_breaker):
+            breaker = previous_breaker
+        if breaker is not None:
+            self._breakers[source] = breaker
+        future = previous._running.get(source)
+        if future is not None:
+            # An abandoned probe is still running
+            self._track(source, future)
+
+    def _get_shard(self, item: Dict[str, any]) -> Optional[Shard]:
+        """
+        Returns the shard of this instance if the given source should be sharded
+        :param item: Source configuration
+        :return: Shard or None if the source is probed by all instances
+        """
+        shard = self.global_config.shard
+        if shard is None or not item.get('shard', self.config.get('shard', False)):
+            return None
+        return shard
+
+    def _get_shard_key(self, item: Dict[str, any]) -> str:
+        """
+        Returns the key which is used to assign the given source to a shard
+        :param item: Source configuration
+        :return: Key
+        """
+        key = item.get('shardKey')
+        if key is not None:
+            return key
+        name = item.get('name')
+        source_name = item.get('type') if name is None else f'{item.get("type")}.{name}'
+        return f'{self.collection_name}/{source_name}'
+
+    def shutdown(self, successors: Optional[List[Executor]] = None):
         """
         Terminates all sources and writers
+
+        :param successors: Executors which replace this one after a reload.
+        Their sources, worker process and writers are kept running
         """
         self.log.info(f'Shutting down {self.collection_name}')
+        successors = [] if successors is None else successors
+        kept_sources = {source for executor in successors for source in executor._sources}
+        writer_kept = any(executor.writer is self.writer for executor in successors)
         self.thread_pool.shutdown()
         for source in self._sources:
+            if source in kept_sources:
+                continue
             source.shutdown()
-        self.writer.stop()
+            if writer_kept and self.writer.supports_partial_write():
+                # Removes the metrics of the source from the writer
+                self.writer.write([], source)
+        if self.process_worker is not None and \
+                not any(executor.process_worker is self.process_worker for executor in successors):
+            self.process_worker.shutdown()
+        self.writer.remove_scrape_hook(self.probe_on_scrape)
+        if not writer_kept:
+            self.writer.stop()
+
+    def get_interval(self) -> float:
+        """
+        Returns the interval in which this executor should be executed
+        :return: Interval in seconds
+        """
+        if self.tick_time <= 0:
+            # Use global tick time
+            return self.global_config.tick_time
+        return self.tick_time
+
+    def is_scheduled(self) -> bool:
+        """
+        Indicates if this executor should be executed in its tick interval by the scheduler
+        :return: False if the sources are probed on scrape
+        """
+        return self.probe_on == Configuration.PROBE_ON_TICK
+
+    def probe_on_scrape(self):
+        """
+        Probes all sources before the data is read from the writer.
+        Concurrent scrapes wait for the same execution, data which is younger than min_age is not probed again.
+        """
+        with self._scrape_lock:
+            if self._last_scrape is not None and time.monotonic() - self._last_scrape < self.min_age:
+                self.self_metrics.inc('scrape_cache_hits_total')
+                return
+            start = time.monotonic()
+            self.execute()
+            self._last_scrape = start
+
+    def get_start_delay(self) -> float:
+        """
+        Returns the delay until the first execution.
+        The delay is derived from the collection name, so it is stable across restarts
+        :return: Delay in seconds
+        """
+        if not self.phase_spread:
+            return 0
+        return Helper.get_start_delay(Helper.get_phase(self.collection_name), self.get_interval())
+
+    def get_jitter(self) -> float:
+        """
+        Returns a random delay which should be added to the next execution
+        :return: Delay in seconds
+        """
+        if self.jitter <= 0:
+            return 0
+        return random.uniform(0, self.jitter)
+
+    def get_backlog_limit(self) -> int:
+        """
+        Returns how many ticks may be waiting while the executor is running
+        :return: Tick count
+        """
+        if self.overrun == Configuration.OVERRUN_SKIP:
+            return 0
+        if self.overrun == Configuration.OVERRUN_COALESCE:
+            return 1
+        return max(1, self.max_backlog)
+
+    def record_start(self, lag: float, backlog: int):
+        """
+        Records the start of an execution in the self metrics
+        :param lag: Time in seconds the execution started behind its schedule
+        :param backlog: Number of ticks which are still waiting for execution
+        """
+        self.self_metrics.set('schedule_lag_seconds', max(0.0, lag))
+        self.self_metrics.set('queue_depth', backlog)
+
+    def record_skipped(self, skipped: int):
+        """
+        Records ticks which have been skipped since the executor was still running
+        :param skipped: Number of skipped ticks
+        """
+        self.self_metrics.inc('skipped_ticks_total', amount=skipped)
+        self.log.warning(f'Skipped {skipped} tick(s) of {self.collection_name}, the execution takes longer than '
+                         f'the tick time')
 
     def execute(self):
         """
-        Probes all data sources and writes the data using the current writer
+        Probes all data sources and writes the data using the current writer.
+        Sources which exceed their timeout are abandoned, the results collected so far are written.
+        """
+        self.log.debug(f'Executing {self.collection_name}')
+        partial_write = self.writer.supports_partial_write()
+        start = time.monotonic()
+        waiting = self._get_startable_sources(start)
+        pending: Dict[Future, Source] = {}
+
+        results: Dict[Source, Optional[List[ValueSet]]] = {}
+        while len(pending) > 0 or len(waiting) > 0:
+            timeout = self._start_due(waiting, pending, start, self._submit)
+            timeout = self._min_timeout(timeout, self._expire(pending))
+            if len(pending) == 0:
+                if len(waiting) > 0:
+                    # Wait for the phase offset of the next source
+                    time.sleep(timeout)
+                continue
+            done, _ = wait(pending.keys(), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = pending.pop(future)
+                value_sets = None if future.cancelled() else future.result()
+                self._handle_result(source, value_sets, partial_write, results)
+
+        self._finish(results, partial_write)
+
+    async def execute_async(self):
+        """
+        Probes all data sources and writes the data using the current writer.
+        Async sources are awaited on the running event loop,
+        all other sources are probed using the thread pool.
         """
         self.log.debug(f'Executing {self.collection_name}')
         partial_write = self.writer.supports_partial_write()
-        futures = []
+        start = time.monotonic()
+        waiting = self._get_startable_sources(start)
+        pending: Dict[asyncio.Future, Source] = {}
+
+        results: Dict[Source, Optional[List[ValueSet]]] = {}
+        while len(pending) > 0 or len(waiting) > 0:
+            timeout = self._start_due(waiting, pending, start, self._submit_async)
+            timeout = self._min_timeout(timeout, self._expire(pending))
+            if len(pending) == 0:
+                if len(waiting) > 0:
+                    await asyncio.sleep(timeout)
+                continue
+            done, _ = await asyncio.wait(pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                source = pending.pop(task)
+                value_sets = None if task.cancelled() else task.result()
+                self._handle_result(source, value_sets, partial_write, results)
+
+        self._finish(results, partial_write)
 
+    def _get_startable_sources(self, start: float) -> List[Tuple[float, Source]]:
+        """
+        Returns all sources which should be probed in this tick and sets their deadline.
+        Sources which are not due yet or are still busy with an abandoned probe are skipped.
+        :param start: Start of the execution (monotonic)
+        :return: Phase offset (relative to the start) and source, sorted by the offset
+        """
+        sources = []
         for source in self._sources:
             assert isinstance(source, Source)
-            future = self.thread_pool.submit(self._probe_and_write if partial_write else self._probe, source)
-            futures.append(future)
+            if not self._is_due(source, start):
+                continue
+            # Only sources which are not due keep their last result,
+            # there is no data of a source which is skipped or exceeds its timeout
+            self._last_data.pop(source, None)
+            if source in self._running:
+                self.log.warning(f'Skipping {self.collection_name}/{source}, previous probe is still running')
+                continue
+            breaker = self._breakers.get(source)
+            if breaker is not None:
+                allowed = breaker.allow(start)
+                self._record_circuit(source, breaker)
+                if not allowed:
+                    continue
+            offset = self._get_source_offset(source)
+            timeout = self._get_timeout(source)
+            source.deadline = None if timeout is None else start + offset + timeout
+            sources.append((offset, source))
+        sources.sort(key=lambda x: x[0])
+        return sources
 
-        if partial_write:
-            # Data has already been written to the exporter
-            return
+    def _is_due(self, source: Source, start: float) -> bool:
+        """
+        Checks if the given source should be probed in the current tick
+        and updates the next run of the source if so.
+        :param source: Source
+        :param start: Start of the execution (monotonic)
+        :return: True if the source is due
+        """
+        if source.tick_time is None:
+            return True
+
+        next_run = self._next_runs.get(source)
+        # Use the tick which is closest to the due time of the source
+        if next_run is not None and start + self.get_interval() / 2 < next_run:
+            return False
+        next_run = start if next_run is None else next_run
+        self._next_runs[source] = Helper.get_next_run(next_run, source.tick_time, start)
+        return True
+
+    def _get_source_offset(self, source: Source) -> float:
+        """
+        Returns the stable offset at which the given source should be started within the interval.
+        The offset is limited to the first half of the interval (and to the time before the probe
+        could exceed its timeout), so the execution still completes within the interval.
+        :param source: Source
+        :return: Offset in seconds
+        """
+        if not self.source_phase_spread:
+            return 0
+        window = self.get_interval() * self.MAX_SOURCE_SPREAD
+        timeout = self._get_timeout(source)
+        if timeout is not None:
+            window = max(0.0, min(window, self.get_interval() - timeout))
+        return Helper.get_phase(f'{self.collection_name}/{source}') * window
+
+    def _start_due(self, waiting: List[Tuple[float, Source]], pending: Dict[any, Source], start: float,
+                   submit: Callable[[Source], any]) -> Optional[float]:
+        """
+        Starts all waiting sources whose phase offset has been reached
+
+        :param waiting: Waiting sources, started ones are removed
+        :param pending: Futures of pending probes, started ones are added
+        :param start: Start of the execution (monotonic)
+        :param submit: Starts the probe of a source and returns its future
+        :return: Time until the next waiting source should be started, None if no source is waiting
+        """
+        now = time.monotonic()
+        while len(waiting) > 0 and start + waiting[0][0] <= now:
+            _, source = waiting.pop(0)
+            pending[submit(source)] = source
+        if len(waiting) == 0:
+            return None
+        return start + waiting[0][0] - now
 
-        # Wait and merge the results
-        data = []
-        for future in futures:
-            # noinspection PyTypeChecker
-            self._merge(future.result(), data)
-        self._write(data, self)
+    def _submit(self, source: Source) -> Future:
+        future = self.thread_pool.submit(self._probe, source)
+        self._track(source, future)
+        return future
 
-    def _probe_and_write(self, source: Source):
+    def _submit_async(self, source: Source) -> asyncio.Future:
+        if source.is_async():
+            task = asyncio.ensure_future(self._probe_async(source))
+            self._track(source, task)
+            return task
+
+        future = self.thread_pool.submit(self._probe, source)
+        # Track the thread future, the wrapping task is done as soon as it is cancelled
+        self._track(source, future)
+        return asyncio.wrap_future(future)
+
+    @staticmethod
+    def _min_timeout(a: Optional[float], b: Optional[float]) -> Optional[float]:
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return min(a, b)
+
+    def _track(self, source: Source, future):
         """
-        Probes a single source and writes the data to the writer
+        Marks the given source as running until its probe has returned
         :param source: Source
+        :param future: Future or task of the probe
         """
-        value_sets = self._probe(source)
-        data = []
-        self._merge(value_sets, data)
-        self._write(data, source)
+        self._running[source] = future
+        future.add_done_callback(lambda _: self._untrack(source))
+
+    def _untrack(self, source: Source):
+        self._running.pop(source, None)
+        self._abandoned.discard(source)
+
+    def _get_timeout(self, source: Source) -> Optional[float]:
+        """
+        Returns the timeout for probing the given source
+        :param source: Source
+        :return: Timeout in seconds or None if unlimited
+        """
+        timeouts = [x for x in (source.probe_timeout, self.timeout) if x is not None]
+        if len(timeouts) == 0:
+            return None
+        return min(timeouts)
+
+    def _expire(self, pending: Dict[any, Source]) -> Optional[float]:
+        """
+        Abandons all pending probes which have exceeded their deadline
+
+        :param pending: Futures of pending probes, expired ones are removed
+        :return: Time until the next pending probe expires, None if no probe has a deadline
+        """
+        now = time.monotonic()
+        next_timeout = None
+        for future, source in list(pending.items()):
+            if source.deadline is None:
+                continue
+            remaining = source.deadline - now
+            if remaining > 0:
+                next_timeout = self._min_timeout(next_timeout, remaining)
+                continue
+
+            # The future stays in _running until the probe actually returns
+            del pending[future]
+            self.self_metrics.inc('probe_timeouts_total', {'source': str(source)})
+            self.log.warning(f'Probing of {self.collection_name}/{source} exceeded the timeout of '
+                             f'{self._get_timeout(source)} seconds')
+            self._record_result(source, False)
+            # A running probe can't be cancelled, its result must not be counted again once it returns
+            if source in self._running:
+                self._abandoned.add(source)
+            future.cancel()
+        return next_timeout
+
+    def _handle_result(self, source: Source, value_sets: Optional[List[ValueSet]], partial_write: bool,
+                       results: Dict[Source, Optional[List[ValueSet]]]):
+        """
+        Handles the result of a single completed probe
+
+        :param source: Source which has been probed
+        :param value_sets: Probe result
+        :param partial_write: True if the data should be written right away
+        :param results: Collected results of the current execution
+        """
+        if not partial_write:
+            results[source] = value_sets
+            return
+
+        source_data = []
+        self._merge(value_sets, source_data)
+        self._write(source_data, source)
+
+    def _finish(self, results: Dict[Source, Optional[List[ValueSet]]], partial_write: bool):
+        """
+        Writes the data of the current execution
+        :param results: Collected results
+        :param partial_write: True if the data has already been written
+        """
+        if not partial_write:
+            # Keep the order of the sources, regardless of which probe completed first
+            data = []
+            for source in self._sources:
+                if source in results:
+                    source_data = []
+                    self._merge(results[source], source_data)
+                    self._last_data[source] = source_data
+                # Sources which are not due in this tick keep their last result
+                data.extend(self._last_data.get(source, []))
+            self._write(data, self)
+        if self.global_config.self_metrics:
+            self._write(self.self_metrics.get_value_sets(), self.self_metrics)
+        self.global_config.profiler.record_execution(self.collection_name)
 
     def _probe(self, source: Source) -> Optional[List[ValueSet]]:
         """
@@ -160,28 +849,102 @@ class Executor(Log):
         """
         log_tag = f'{self.collection_name}/{source}'
         self.log.info(f'Collecting data from {log_tag}')
-        now = int(time.time())
+        start = time.perf_counter()
         try:
-            value_sets = source.probe()
-            delta = int(time.time()) - now
-            if delta > 10:
-                self.log.warning(f'Probing of {log_tag} took {delta} seconds')
+            value_sets = self.global_config.profiler.profile(log_tag, source.probe)
+            self._record_probe(source, time.perf_counter() - start, value_sets)
+            self._record_result(source, True)
             return value_sets
         except Exception as e:
             # Catch all errors that could occur and ignore them
-            traceback.print_exc()
+            if self._record_result(source, False):
+                traceback.print_exc()
+            self.log.error(f'Error while probing using source {log_tag}: {e}')
+            self._record_probe(source, time.perf_counter() - start, None, True)
+        return None
+
+    async def _probe_async(self, source: Source) -> Optional[List[ValueSet]]:
+        """
+        Probes a single async source
+        :param source: Source
+        :return: The probe result data
+        """
+        log_tag = f'{self.collection_name}/{source}'
+        self.log.info(f'Collecting data from {log_tag}')
+        start = time.perf_counter()
+        try:
+            value_sets = await source.probe_async()
+            # Coroutines can't be profiled, since they are interleaved on the event loop
+            self.global_config.profiler.record(log_tag, time.perf_counter() - start)
+            self._record_probe(source, time.perf_counter() - start, value_sets)
+            self._record_result(source, True)
+            return value_sets
+        except Exception as e:
+            if self._record_result(source, False):
+                traceback.print_exc()
             self.log.error(f'Error while probing using source {log_tag}: {e}')
+            self._record_probe(source, time.perf_counter() - start, None, True)
         return None
 
+    def _record_result(self, source: Source, success: bool) -> bool:
+        """
+        Updates the circuit breaker of the given source
+
+        :param source: Source which has been probed
+        :param success: True if the probe succeeded
+        :return: True if this is the first failure in a row (or no circuit breaker is used)
+        """
+        if source in self._abandoned:
+            # The probe has already been counted as failed when it timed out
+            return False
+        breaker = self._breakers.get(source)
+        if breaker is None:
+            return True
+        if success:
+            breaker.record_success()
+        else:
+            now = time.monotonic()
+            breaker.record_failure(now)
+            if breaker.state == CircuitBreaker.OPEN:
+                self.log.warning(f'Circuit of {self.collection_name}/{source} is open, skipping it for '
+                                 f'{breaker.get_remaining(now):.1f} seconds')
+        self._record_circuit(source, breaker)
+        return success or breaker.failures == 1
+
+    def _record_circuit(self, source: Source, breaker: CircuitBreaker):
+        self.self_metrics.set('circuit_state', breaker.state, {'source': str(source)})
+
+    def _record_probe(self, source: Source, duration: float, value_sets: Optional[List[ValueSet]],
+                      failed: bool = False):
+        """
+        Records a completed probe in the self metrics
+
+        :param source: Source which has been probed
+        :param duration: Duration of the probe in seconds
+        :param value_sets: Probe result
+        :param failed: True if the probe raised an error
+        """
+        labels = {'source': str(source)}
+        self.self_metrics.observe('probe_duration_seconds', duration, labels)
+        if failed:
+            self.self_metrics.inc('probe_errors_total', labels)
+            return
+
+        value_count = 0 if value_sets is None else sum(value_set.get_count() for value_set in value_sets)
+        self.self_metrics.set('probe_values', value_count, labels)
+        if duration > 10:
+            self.log.warning(f'Probing of {self.collection_name}/{source} took {duration:.1f} seconds')
+
     def _merge(self, value_sets: List[ValueSet], results: List[ValueSet]):
         """
         Merges the given value sets
         :param value_sets: Value sets which should be merged
         :param results: Result list
         """
-        now = int(time.time())
+        if value_sets is None:
+            # The probe failed
+            return
         for value_set in value_sets:
-            value_set.time = now
             if len(value_set.name) > 0:
                 value_set.name = self.collection_name + '.' + value_set.name
             else:
@@ -200,7 +963,11 @@ class Executor(Log):
 
         # Write the data
         self.log.debug(f'Writing data for {self.collection_name}')
+        start = time.perf_counter()
         try:
-            self.writer.write(value_sets, source_ref)
+            self.global_config.profiler.profile(f'{self.collection_name}/write', self.writer.write, value_sets, source_ref)
         except Exception as e:
             self.log.error(f'Could not write data: {e}')
+            self.self_metrics.inc('write_errors_total', {'writer': type(self.writer).__name__})
+        self.self_metrics.observe('write_duration_seconds', time.perf_counter() - start,
+                                  {'writer': type(self.writer).__name__})
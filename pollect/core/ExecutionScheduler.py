@@ -1,9 +1,12 @@
+import heapq
+import itertools
 import queue
 import threading
 import time
-from typing import List, Dict
+import traceback
+from typing import List, Dict, Tuple, Set, Optional
 
-import schedule
+from pollect.core import Helper
 from pollect.core.Log import Log
 
 from pollect.core.Core import Configuration, Executor
@@ -16,69 +19,190 @@ class ExecutionScheduler(Log):
     so different executors can't block each-other during execution
     """
     _queues: Dict[Executor, queue.Queue]
+    """
+    Target times (monotonic) of the ticks which are waiting for execution.
+    After a reload the queue also receives the executor which replaces the current one
+    """
+    _busy: Set[Executor]
+    _intervals: Dict[Executor, float]
+    _timers: List[Tuple[float, int, Executor]]
+    """
+    Heap of the next (monotonic) execution time of each executor
+    """
 
     def __init__(self, config: Configuration, executors: List[Executor]):
         super().__init__()
         self.config = config
         self.executors = executors
         self._active = False
+        self._wakeup = threading.Event()
+        self._reload_config = None
         self._queues = {}
+        self._busy = set()
+        self._intervals = {}
+        self._timers = []
+        self._sequence = itertools.count()
         for executor in executors:
-            self._queues[executor] = queue.Queue(2)
+            if executor.is_scheduled():
+                self._queues[executor] = queue.Queue()
 
     def create(self):
         """
         Creates the schedulers for the executors
         """
         for executor in self.executors:
-            exec_time = executor.tick_time
-            if exec_time <= 0:
-                # Use global tick time
-                schedule.every(self.config.tick_time).seconds.do(self._schedule_execution, executor)
-                continue
-
-            # Executor has its own tick time defined
-            schedule.every(exec_time).seconds.do(self._schedule_execution, executor)
+            if executor.is_scheduled():
+                self._intervals[executor] = executor.get_interval()
 
     def run(self):
         """
-        Starts the scheduling
+        Starts the scheduling, this blocks until stop() is called
         """
         self._active = True
-        for executor, exec_queue in self._queues.items():
-            worker_thread = threading.Thread(target=self._work_on_queue, args=[executor])
-            worker_thread.start()
+        for executor in self._queues.keys():
+            self._start_worker(executor)
+
+        # Run them all once at the beginning, unless they are spread across their interval
+        now = time.monotonic()
+        for executor in self._intervals.keys():
+            heapq.heappush(self._timers, (now + executor.get_start_delay(), next(self._sequence), executor))
 
-        # Run them all once at the beginning
-        schedule.run_all()
         while self._active:
-            schedule.run_pending()
-            time.sleep(1)
+            if self._reload_config is not None:
+                self._reload()
+                continue
+
+            if len(self._timers) == 0:
+                self._wait(None)
+                continue
+
+            next_run, _, executor = self._timers[0]
+            delay = next_run - time.monotonic()
+            if delay > 0:
+                self._wait(delay)
+                continue
+
+            target = next_run
+            next_run = Helper.get_next_run(next_run, self._intervals[executor], time.monotonic())
+            heapq.heapreplace(self._timers, (next_run, next(self._sequence), executor))
+            self._schedule_execution(executor, target)
         self.log.debug('Stopped scheduler execution')
 
-    def _schedule_execution(self, executor: Executor):
+    def reload(self, config):
+        """
+        Replaces the executors with the ones of the given configuration.
+        The reload is done by the scheduler thread, this method returns right away.
+
+        :param config: New raw configuration
+        """
+        self._reload_config = config
+        self._wakeup.set()
+
+    def _wait(self, timeout: Optional[float]):
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def _reload(self):
         """
-        Queues a new executor for execution
+        Creates the executors of the pending configuration and replaces the running ones.
+        Unchanged collections keep their schedule
+        """
+        raw_config = self._reload_config
+        self._reload_config = None
+        try:
+            config, executors = self.config.reload(raw_config, self.executors)
+        except Exception as e:
+            traceback.print_exc()
+            self.log.error(f'Could not reload the configuration, keeping the current one: {e}')
+            return
+
+        self.log.info('Reloading configuration')
+        for executor in self.executors:
+            if not executor.is_scheduled():
+                # Probed on scrape, there is no worker which could replace it later
+                executor.shutdown(executors)
+
+        replaced = {}
+        added = []
+        for executor in executors:
+            predecessor = executor.predecessor
+            executor.predecessor = None
+            if not executor.is_scheduled():
+                continue
+            self._intervals[executor] = executor.get_interval()
+            if predecessor is None or not predecessor.is_scheduled():
+                # New collection
+                self._queues[executor] = queue.Queue()
+                self._start_worker(executor)
+                added.append(executor)
+                continue
+            replaced[predecessor] = executor
+            self._queues[executor] = self._queues.pop(predecessor)
+            # The worker swaps the executors once all ticks queued so far have been executed
+            self._queues[executor].put((executor, executors))
+
+        now = time.monotonic()
+        timers = []
+        for next_run, sequence, executor in self._timers:
+            successor = replaced.get(executor)
+            del self._intervals[executor]
+            if successor is None:
+                # The collection has been removed
+                self._queues.pop(executor).put((None, executors))
+                continue
+            if self._intervals[successor] != executor.get_interval():
+                next_run = now + successor.get_start_delay()
+            timers.append((next_run, sequence, successor))
+        for executor in added:
+            timers.append((now + executor.get_start_delay(), next(self._sequence), executor))
+        heapq.heapify(timers)
+        self._timers = timers
+        self.config = config
+        self.executors = executors
+
+    def _schedule_execution(self, executor: Executor, target: float):
+        """
+        Queues a new executor for execution, according to the overrun policy of the executor
         :param executor: Executor to be queued
+        :param target: Time (monotonic) at which the execution should have started
         """
         exec_queue = self._queues[executor]
-        if exec_queue.qsize() >= 1:
-            # The queue is already nearly full, don't add anything
+        if executor in self._busy and exec_queue.qsize() >= executor.get_backlog_limit():
+            executor.record_skipped(1)
             return
 
         self.log.debug(f'Scheduling execution of {executor.collection_name}')
-        exec_queue.put(executor.execute)
+        exec_queue.put(target)
 
-    def _work_on_queue(self, executor: Executor):
+    def _start_worker(self, executor: Executor):
+        worker_thread = threading.Thread(target=self._work_on_queue, args=[executor, self._queues[executor]])
+        worker_thread.start()
+
+    def _work_on_queue(self, executor: Executor, exec_queue: queue.Queue):
         """
         Works on the executor queue
         """
-        exec_queue = self._queues[executor]
         while self._active:
-            job_func = exec_queue.get()
-            if job_func is None:
+            target = exec_queue.get()
+            if target is None or not self._active:
+                # Stopped while waiting
                 continue
-            job_func()
+            if isinstance(target, tuple):
+                # The configuration has been reloaded
+                successor, executors = target
+                executor.shutdown(executors)
+                if successor is None:
+                    break
+                executor = successor
+                continue
+
+            self._busy.add(executor)
+            executor.record_start(time.monotonic() - target, exec_queue.qsize())
+            jitter = executor.get_jitter()
+            if jitter > 0:
+                time.sleep(jitter)
+            executor.execute()
+            self._busy.discard(executor)
             exec_queue.task_done()
         self.log.info(f'Stopped working on queue for executor {executor.collection_name}')
 
@@ -87,6 +211,7 @@ class ExecutionScheduler(Log):
         Stops the scheduling and terminates all probes
         """
         self._active = False
+        self._wakeup.set()
         for exec_queue in self._queues.values():
             exec_queue.put(None)
         for executor in self.executors:
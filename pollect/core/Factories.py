@@ -1,49 +1,107 @@
-import os
-from os import listdir
-from os.path import isfile
+import sys
+from importlib import metadata
+from typing import List, Optional, Dict, Set, Tuple
 
 from pollect.core.Log import Log
+from pollect.core.SharedSource import SharedProbe, SharedSource, get_share_key
 from pollect.sources.Source import Source
 from pollect.writers.Writer import Writer, DryRunWriter
 
+SOURCES = {
+    'AppStoreConnectSource': 'pollect.sources.AppStoreConnectSource',
+    'AsyncDummySource': 'pollect.sources.Source',
+    'BindSource': 'pollect.sources.BindSource',
+    'DellOpenManageSource': 'pollect.sources.DellOpenManageSource',
+    'DiskUsageSource': 'pollect.sources.DiskUsageSource',
+    'DummySource': 'pollect.sources.Source',
+    'FritzSource': 'pollect.sources.FritzSource',
+    'GdcSource': 'pollect.sources.GdcSource',
+    'HomematicIpSource': 'pollect.sources.HomematicIpSource',
+    'HttpIngressSource': 'pollect.sources.HttpIngressSource',
+    'HttpSource': 'pollect.sources.HttpSource',
+    'InterfaceSource': 'pollect.sources.InterfaceSource',
+    'IOSource': 'pollect.sources.IOSource',
+    'LoadAvgSource': 'pollect.sources.Source',
+    'MemoryUsageSource': 'pollect.sources.MemoryUsageSource',
+    'MMISource': 'pollect.sources.MMISource',
+    'OpenhabSource': 'pollect.sources.OpenhabSource',
+    'PlexSource': 'pollect.sources.PlexSource',
+    'ProcessSource': 'pollect.sources.ProcessSource',
+    'SensorsSource': 'pollect.sources.SensorsSource',
+    'SmaEnergyMeterSource': 'pollect.sources.SmaEnergyMeterSource',
+    'SmaPvModbusSource': 'pollect.sources.SmaPvModbusSource',
+    'SmartCtlSource': 'pollect.sources.SmartCtlSource',
+    'SnmpGetSource': 'pollect.sources.SnmpGetSource',
+    'SyntheticSource': 'pollect.sources.Source',
+    'TcpTimeSource': 'pollect.sources.TcpTimeSource',
+    'TpLinkEapSource': 'pollect.sources.TpLinkEapSource',
+    'ViessmannSource': 'pollect.sources.ViessmannSource',
+    'VSphereSource': 'pollect.sources.VSphereSource',
+    'ZfsSource': 'pollect.sources.ZfsSource',
+}
+"""
+Module of each built-in source class
+"""
+
+WRITERS = {
+    'DryRunWriter': 'pollect.writers.Writer',
+    'InMemoryWriter': 'pollect.writers.Writer',
+    'ParallelInMemoryWriter': 'pollect.writers.Writer',
+    'PrometheusWriter': 'pollect.writers.PrometheusWriter',
+    'PrometheusSslWriter': 'pollect.writers.PrometheusSslWriter',
+}
+"""
+Module of each built-in writer class
+"""
+
 
 class ObjectFactory(Log):
     """
-    Generic factory for creating objects
+    Generic factory for creating objects.
+    Only the module of a requested class is imported, so the (optional) dependencies
+    of unused sources and writers are never loaded.
     """
 
-    def __init__(self, base_name: str):
+    def __init__(self, base_name: str, registry: Dict[str, str]):
+        """
+        :param base_name: Name of the package containing the classes
+        :param registry: Module of each built-in class
+        """
         super().__init__()
         self._base_module = base_name
-        self._modules = self._get_modules()
+        self._registry = registry
 
     def create(self, class_name: str, *init_args):
-        class_obj = self._get_class_obj(class_name)
+        class_obj = self.get_class_obj(class_name)
         if class_obj is None:
             raise AttributeError(f'Class {class_name} not found in module {self._base_module} - missing import?')
         return class_obj(*init_args)
 
-    def _get_modules(self):
+    def get_names(self) -> List[str]:
         """
-        Returns all modules which contains the given class
+        Returns the names of all built-in and plugin classes, without importing them
+        :return: Class names
         """
-        base = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', self._base_module))
-        files = [f for f in listdir(base) if isfile(os.path.join(base, f)) and f.endswith('.py')]
-        modules = []
-        for file in files:
-            try:
-                file = file[:-3]
-                modules.append(self._import('pollect.' + self._base_module + '.' + file))
-            except ImportError as e:
-                self.log.debug('Could not import {}: {}'.format(file, str(e)))
-                continue
-        return modules
+        names = set(self._registry.keys())
+        names.update(entry_point.name for entry_point in self._get_entry_points())
+        return sorted(names)
+
+    def _get_entry_points(self):
+        """
+        Returns the entry points of third party plugins,
+        which are registered in the "pollect.sources" or "pollect.writers" group
+        """
+        group = 'pollect.' + self._base_module
+        if sys.version_info >= (3, 10):
+            return metadata.entry_points(group=group)
+        # Python 3.8 and 3.9 return the entry points of all groups as dict
+        return metadata.entry_points().get(group, [])
 
     @staticmethod
     def _import(package_name: str):
         return __import__(package_name, fromlist=[package_name])
 
-    def _get_class_obj(self, class_name: str):
+    def get_class_obj(self, class_name: str):
         if '.' in class_name:
             # The class specifies an absolute package import
             module_obj = self._import(class_name)
@@ -54,21 +112,59 @@ class ObjectFactory(Log):
             except AttributeError:
                 return None
 
-        # Search for the class in all known modules
-        for module_obj in self._modules:
-            try:
-                return getattr(module_obj, class_name)
-            except AttributeError:
-                continue
-        return None
+        module_name = self._registry.get(class_name)
+        if module_name is None:
+            for entry_point in self._get_entry_points():
+                if entry_point.name == class_name:
+                    return entry_point.load()
+            # Unregistered modules must be named after their class
+            module_name = 'pollect.' + self._base_module + '.' + class_name
+
+        try:
+            module_obj = self._import(module_name)
+        except ImportError as e:
+            if e.name != module_name:
+                # A dependency of the module is missing
+                self.log.error(f'Could not import {module_name}: {e}')
+            return None
+        return getattr(module_obj, class_name, None)
 
 
 class SourceFactory:
     def __init__(self, global_conf):
         self.global_conf = global_conf
-        self._factory = ObjectFactory('sources')
+        self._factory = ObjectFactory('sources', SOURCES)
+        self._shared_keys: Set[Tuple] = set()
+        self._shared: Dict[Tuple, SharedProbe] = {}
+
+    def share(self, items: List[Dict[str, any]]):
+        """
+        Marks all source configurations which occur more than once,
+        so a single source is created for them and probed on behalf of all users
+
+        :param items: Configuration of all sources
+        """
+        seen = set()
+        for item in items:
+            key = get_share_key(item)
+            if key in seen:
+                self._shared_keys.add(key)
+            seen.add(key)
 
     def create(self, source_data):
+        key = get_share_key(source_data) if len(self._shared_keys) > 0 else None
+        if key not in self._shared_keys:
+            return self._create(source_data)
+
+        shared = self._shared.get(key)
+        if shared is None:
+            shared = SharedProbe(self._create(source_data))
+            self._shared[key] = shared
+        source_obj = SharedSource(source_data, shared)
+        source_obj.setup(self.global_conf)
+        return source_obj
+
+    def _create(self, source_data):
         source_type = source_data.get('type')
         class_name = source_type + 'Source'
         source_obj = self._factory.create(class_name, source_data)
@@ -77,24 +173,52 @@ class SourceFactory:
         source_obj.setup(self.global_conf)
         return source_obj
 
+    def get_names(self) -> List[str]:
+        """
+        Returns the class names of all available sources, without importing them
+        :return: Class names
+        """
+        return self._factory.get_names()
+
+    def get_class(self, source_data):
+        """
+        Returns the class of the given source, without creating it
+        :param source_data: Source configuration
+        :return: Source class or None if not found
+        """
+        return self._factory.get_class_obj(source_data.get('type') + 'Source')
+
 
 class WriterFactory:
     """
     Factory for creating writer objects
     """
 
-    def __init__(self, dry_run: bool = False):
+    def __init__(self, dry_run: bool = False, writers: Optional[List[Writer]] = None):
+        """
+        :param dry_run: True if all data should be printed instead
+        :param writers: Running writers which should be reused if their configuration is unchanged
+        """
         self._writer_cache = {}
         """
         Cache for writer singleton objects
         """
-        self._factory = ObjectFactory('writers')
+        for writer in writers or []:
+            cached = self._writer_cache.setdefault(type(writer).__name__, [])
+            if not any(old_writer is writer for old_writer in cached):
+                cached.append(writer)
+        self._pending: List[Writer] = []
+        """
+        Created writers which haven't been started yet
+        """
+        self._factory = ObjectFactory('writers', WRITERS)
         self._dry_run = dry_run
 
     def create(self, writer_config):
         """
         Creates a new writer object from the given writer config.
-        If a same writer with the same config does already exist, the same object will be returned
+        If a same writer with the same config does already exist, the same object will be returned.
+        New writers are started by start
 
         :param writer_config: Writer configuration dict
         :type writer_config: dict(str, obj)
@@ -111,7 +235,7 @@ class WriterFactory:
         old_writers = self._writer_cache.get(class_name)
         if old_writers is None:
             # New class type
-            writer.start()
+            self._pending.append(writer)
             self._writer_cache[class_name] = [writer]
             return writer
 
@@ -121,5 +245,23 @@ class WriterFactory:
                 return old_writer
 
         # New writer - add it to the singleton cache
-        writer.start()
+        self._pending.append(writer)
         self._writer_cache[class_name].append(writer)
+        return writer
+
+    def start(self):
+        """
+        Starts all writers which have been created since the last call.
+        If a writer can't be started, the ones which have been started before are stopped again
+        """
+        started = []
+        try:
+            for writer in self._pending:
+                writer.start()
+                started.append(writer)
+        except Exception:
+            for writer in started:
+                writer.stop()
+            raise
+        finally:
+            self._pending.clear()
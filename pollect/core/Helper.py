@@ -1,3 +1,6 @@
+import math
+import time
+import zlib
 from typing import Optional
 from urllib import request
 from urllib.error import HTTPError
@@ -42,3 +45,38 @@ def get_url(url, timeout: int = 5, expected_status: Optional[int] = None, proxy:
         if expected_status is None and expected_status == e.status:
             return e.read()
         raise e
+
+
+def get_phase(key: str) -> float:
+    """
+    Returns a deterministic phase for the given key which is stable across restarts
+    :param key: Key (e.g. collection name)
+    :return: Phase in the range [0, 1)
+    """
+    return zlib.crc32(key.encode('utf-8')) / 2 ** 32
+
+
+def get_start_delay(phase: float, interval: float) -> float:
+    """
+    Returns the time until the next run of a job with the given phase.
+    The runs are aligned to the wall clock, so they happen at the same offset after a restart
+    :param phase: Phase in the range [0, 1)
+    :param interval: Interval of the job in seconds
+    :return: Delay in seconds
+    """
+    return (phase * interval - time.time()) % interval
+
+
+def get_next_run(last_run: float, interval: float, now: float) -> float:
+    """
+    Returns the next execution time based on the previous target time (not the actual time),
+    so the executions don't drift. Executions which have already been missed are skipped.
+    :param last_run: Previous target time (monotonic)
+    :param interval: Interval in seconds
+    :param now: Current time (monotonic)
+    :return: Next target time (monotonic)
+    """
+    next_run = last_run + interval
+    if next_run <= now:
+        next_run += math.ceil((now - next_run) / interval) * interval
+    return next_run
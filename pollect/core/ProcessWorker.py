@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import List, Optional, Dict, Tuple, Union
+
+from pollect.core.Log import Log
+from pollect.core.Shard import Shard
+from pollect.core.ValueSet import ValueSet, Value, ColumnarValueSet
+from pollect.sources.Source import Source
+
+EncodedValueSets = List[Union[Tuple[str, List[str], int, List[Tuple[any, Optional[str], List[str], Optional[int]]]],
+                              ColumnarValueSet]]
+
+
+def encode(value_sets: Optional[List[ValueSet]]) -> Optional[EncodedValueSets]:
+    """
+    Converts the given value sets into plain tuples, which are cheaper to transfer between processes.
+    Columnar value sets are already compact and transferred as they are
+    :param value_sets: Value sets
+    :return: Encoded value sets
+    """
+    if value_sets is None:
+        return None
+    return [value_set if isinstance(value_set, ColumnarValueSet) else
+            (value_set.name, value_set.labels, value_set.time,
+             [(value.value, value.name, value.label_values, value.time) for value in value_set.values])
+            for value_set in value_sets]
+
+
+def decode(data: Optional[EncodedValueSets]) -> Optional[List[ValueSet]]:
+    """
+    Converts encoded value sets back into value sets
+    :param data: Encoded value sets
+    :return: Value sets
+    """
+    if data is None:
+        return None
+    value_sets = []
+    for item in data:
+        if isinstance(item, ColumnarValueSet):
+            value_sets.append(item)
+            continue
+        name, labels, timestamp, values = item
+        value_set = ValueSet(labels)
+        value_set.name = name
+        value_set.time = timestamp
+        value_set.values = [Value(value, label_values, value_name, value_time)
+                            for value, value_name, label_values, value_time in values]
+        value_sets.append(value_set)
+    return value_sets
+
+
+def _run_child(conn: Connection, source_items: List[Dict[str, any]], max_concurrency: int,
+               shards: List[Optional[Shard]]):
+    """
+    Entry point of the worker process.
+    Creates the sources and probes them on request of the parent
+
+    :param conn: Connection to the parent
+    :param source_items: Source configurations
+    :param max_concurrency: Number of sources which may be probed concurrently
+    :param shards: Shard of each source which splits its targets between the shards
+    """
+    from pollect.core.Factories import SourceFactory
+
+    factory = SourceFactory(None)
+    sources = [factory.create(item) for item in source_items]
+    for source, shard in zip(sources, shards):
+        source.shard = shard
+    pool = ThreadPoolExecutor(max_concurrency)
+    send_lock = threading.Lock()
+
+    def probe(request_id: int, index: int, timeout: Optional[float]):
+        source = sources[index]
+        source.deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            reply = (request_id, True, encode(source.probe()))
+        except Exception as e:
+            traceback.print_exc()
+            reply = (request_id, False, str(e))
+        with send_lock:
+            conn.send(reply)
+
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            pool.submit(probe, *request)
+    except EOFError:
+        # The parent has terminated
+        pass
+    finally:
+        pool.shutdown(wait=False)
+        for source in sources:
+            source.shutdown()
+
+
+class ProcessWorker(Log):
+    """
+    Probes the sources of an executor in a separate process,
+    so CPU bound sources don't compete with the rest of pollect for the GIL.
+    The results are sent back to the parent which writes them as usual.
+    """
+
+    def __init__(self, name: str, source_items: List[Dict[str, any]], max_concurrency: int,
+                 shards: List[Optional[Shard]]):
+        super().__init__(name)
+        self.name = name
+        self._source_items = source_items
+        self._max_concurrency = max_concurrency
+        self._shards = shards
+        self._conn: Optional[Connection] = None
+        self._process: Optional[multiprocessing.Process] = None
+        self._receiver: Optional[threading.Thread] = None
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+
+    def start(self):
+        """
+        Starts the worker process
+        """
+        # Spawn instead of fork, since the parent is already running threads
+        context = multiprocessing.get_context('spawn')
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(target=_run_child, name=f'pollect-{self.name}',
+                                        args=(child_conn, self._source_items, self._max_concurrency,
+                                              self._shards))
+        self._process.daemon = True
+        self._process.start()
+        child_conn.close()
+        self._receiver = threading.Thread(target=self._receive, args=(self._conn,),
+                                          name=f'pollect-{self.name}-receiver')
+        self._receiver.daemon = True
+        self._receiver.start()
+
+    def matches(self, source_items: List[Dict[str, any]], max_concurrency: int,
+                shards: List[Optional[Shard]]) -> bool:
+        """
+        Checks if the worker process has been started with the given sources
+        :param source_items: Source configurations
+        :param max_concurrency: Number of sources which may be probed concurrently
+        :param shards: Shard of each source
+        :return: True if the worker can be reused for the sources
+        """
+        return self._source_items == source_items and self._max_concurrency == max_concurrency and \
+            self._shards == shards
+
+    def probe(self, index: int, timeout: Optional[float]) -> Optional[List[ValueSet]]:
+        """
+        Probes a source in the worker process and waits for the result
+        :param index: Index of the source
+        :param timeout: Remaining time of the probe, passed to the source
+        :return: Probe result
+        """
+        future = Future()
+        with self._lock:
+            if self._conn is None:
+                raise RuntimeError(f'Worker process of {self.name} is not running')
+            request_id = next(self._sequence)
+            self._pending[request_id] = future
+            self._conn.send((request_id, index, timeout))
+        return future.result()
+
+    def shutdown(self):
+        """
+        Stops the worker process, pending probes fail
+        """
+        with self._lock:
+            conn = self._conn
+            if conn is None:
+                return
+            self._conn = None
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        self._process.join(5)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        # The receiver stops once the child has closed its end
+        self._receiver.join(1)
+        conn.close()
+        self._fail_pending('Worker process has been stopped')
+
+    def _receive(self, conn: Connection):
+        while True:
+            try:
+                request_id, success, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if success:
+                future.set_result(decode(payload))
+            else:
+                future.set_exception(RuntimeError(payload))
+        self._fail_pending(f'Worker process of {self.name} terminated')
+
+    def _fail_pending(self, message: str):
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError(message))
+
+
+class RemoteSource(Source):
+    """
+    Placeholder for a source which is probed by a ProcessWorker.
+    Only the configuration is known in the parent process
+    """
+
+    def __init__(self, config, worker: ProcessWorker, index: int):
+        super().__init__(config)
+        self._worker = worker
+        self._index = index
+
+    def _probe(self) -> Optional[List[ValueSet]]:
+        return self._worker.probe(self._index, self.get_remaining_time())
+
+    def _process_results(self, results) -> Optional[List[ValueSet]]:
+        # Name and static labels have already been applied by the worker process
+        return results
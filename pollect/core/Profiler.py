@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Callable, Set
+
+from pollect.core.Log import Log
+
+
+class Profiler(Log):
+    """
+    Profiles the probes and writes of a running pollect instance for a number of ticks.
+    In "cpu" mode each probe and write is profiled deterministically (in whichever worker thread it runs),
+    in "memory" mode the allocations are traced and the growth over the profiled ticks is reported.
+    The results are written to the configured directory once the profile is complete.
+    """
+
+    MODE_CPU = 'cpu'
+    MODE_MEMORY = 'memory'
+
+    ticks: int
+    """
+    Number of executions of each collection which should be profiled
+    """
+
+    directory: str
+    """
+    Directory for the profile results
+    """
+
+    max_duration: float
+    """
+    Maximum duration of a profile in seconds, collections which are executed rarely are not waited for
+    """
+
+    active: bool = False
+    mode: Optional[str] = None
+
+    def __init__(self, config: Dict[str, any]):
+        super().__init__()
+        self.ticks = int(config.get('ticks', 5))
+        self.directory = config.get('directory', '.')
+        self.max_duration = float(config.get('maxDuration', 300))
+        self.active = False
+        self.mode = None
+        self._lock = threading.Lock()
+        self._collections: Set[str] = set()
+        self._executions: Dict[str, int] = {}
+        self._start = 0.0
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._durations: Dict[str, List[float]] = {}
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._overlap_warned = False
+
+    def start(self, mode: str, collections: List[str]):
+        """
+        Starts a new profile
+        :param mode: MODE_CPU or MODE_MEMORY
+        :param collections: Collections which should be profiled for the configured number of ticks
+        """
+        if mode not in (self.MODE_CPU, self.MODE_MEMORY):
+            raise ValueError(f'Unknown profiling mode {mode}')
+        with self._lock:
+            if self.active:
+                self.log.warning('A profile is already running')
+                return
+            self.mode = mode
+            self._collections = set(collections)
+            self._executions = {}
+            self._stats = {}
+            self._durations = {}
+            self._overlap_warned = False
+            self._start = time.monotonic()
+            if mode == self.MODE_MEMORY:
+                tracemalloc.start(10)
+                self._snapshot = tracemalloc.take_snapshot()
+            self.active = True
+        self.log.info(f'Started {mode} profile of {len(collections)} collection(s) for {self.ticks} tick(s)')
+
+    def profile(self, name: str, fn: Callable, *args):
+        """
+        Calls the given function, profiling it if a profile is running
+        :param name: Name of the call in the summary (e.g. the source)
+        :param fn: Function
+        :param args: Arguments
+        :return: Result of the function
+        """
+        if not self.active:
+            return fn(*args)
+
+        profile = None
+        if self.mode == self.MODE_CPU:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already active: in this thread or, since python 3.12, in any thread
+                # (cProfile is process wide there). Only the duration of this call is recorded
+                profile = None
+                self._warn_overlap()
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            duration = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            self.record(name, duration, profile)
+
+    def _warn_overlap(self):
+        with self._lock:
+            if self._overlap_warned:
+                return
+            self._overlap_warned = True
+        self.log.warning('Concurrent calls can not be profiled at the same time, '
+                         'only the duration is recorded for some of them')
+
+    def record(self, name: str, duration: float, profile: Optional[cProfile.Profile] = None):
+        """
+        Records a profiled call
+        :param name: Name of the call
+        :param duration: Duration in seconds
+        :param profile: Profile of the call, None if only the duration is known
+        """
+        with self._lock:
+            if not self.active:
+                return
+            durations = self._durations.setdefault(name, [0, 0.0])
+            durations[0] += 1
+            durations[1] += duration
+            if profile is None:
+                return
+            stats = self._stats.get(name)
+            if stats is None:
+                self._stats[name] = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+
+    def record_execution(self, collection: str):
+        """
+        Counts a completed execution and finishes the profile once all collections have been profiled
+        :param collection: Collection which has been executed
+        """
+        with self._lock:
+            if not self.active:
+                return
+            self._executions[collection] = self._executions.get(collection, 0) + 1
+            done = all(self._executions.get(name, 0) >= self.ticks for name in self._collections)
+            if not done and time.monotonic() - self._start < self.max_duration:
+                return
+            self.active = False
+        self._write_results()
+
+    def _write_results(self):
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = os.path.join(self.directory, 'pollect-' + time.strftime('%Y%m%d-%H%M%S') + '-' + self.mode)
+        summary = io.StringIO()
+        summary.write(f'{"Name":<60} {"Calls":>8} {"Total s":>10} {"Avg ms":>10}\n')
+        for name, (calls, total) in sorted(self._durations.items(), key=lambda x: x[1][1], reverse=True):
+            summary.write(f'{name:<60} {calls:>8} {total:>10.3f} {total / calls * 1000:>10.1f}\n')
+
+        if self.mode == self.MODE_CPU:
+            if len(self._stats) > 0:
+                total = pstats.Stats()
+                total.add(*self._stats.values())
+                total.dump_stats(prefix + '.pstats')
+            for name, stats in self._stats.items():
+                summary.write(f'\n### {name}\n')
+                stats.stream = summary
+                stats.sort_stats('cumulative').print_stats(10)
+        else:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            summary.write('\n### Memory growth\n')
+            for diff in snapshot.compare_to(self._snapshot, 'lineno')[:50]:
+                summary.write(f'{diff}\n')
+            self._snapshot = None
+
+        with open(prefix + '.txt', 'w') as f:
+            f.write(summary.getvalue())
+        self.log.info(f'Profile written to {prefix}.txt')
@@ -0,0 +1,153 @@
+from threading import Lock
+from typing import Dict, List, Tuple
+
+from pollect.core.ValueSet import ValueSet, Value
+
+
+class SelfMetric:
+    """
+    A single internal metric with a fixed set of labels
+    """
+
+    def __init__(self, name: str, label_names: List[str]):
+        self.name = name
+        self.label_names = label_names
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def get_value_sets(self, prefix: str) -> List[ValueSet]:
+        """
+        Returns the current values of this metric
+        :param prefix: Prefix of the metric name
+        :return: Value sets
+        """
+        value_set = ValueSet(labels=list(self.label_names))
+        value_set.name = prefix + '.' + self.name
+        for key, value in self.values.items():
+            value_set.add(Value(value, label_values=list(key)))
+        return [value_set]
+
+
+class SelfHistogram(SelfMetric):
+    """
+    Internal histogram, exported using the prometheus naming scheme
+    (cumulative "_bucket" series with a "le" label, "_sum" and "_count")
+    """
+
+    def __init__(self, name: str, label_names: List[str], buckets: List[float]):
+        super().__init__(name, label_names)
+        self.buckets = sorted(buckets)
+        self.counts: Dict[Tuple[str, ...], List[int]] = {}
+        self.sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, key: Tuple[str, ...], value: float):
+        counts = self.counts.get(key)
+        if counts is None:
+            # One additional bucket for +Inf
+            counts = [0] * (len(self.buckets) + 1)
+            self.counts[key] = counts
+            self.sums[key] = 0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-1] += 1
+        self.sums[key] += value
+
+    def get_value_sets(self, prefix: str) -> List[ValueSet]:
+        name = prefix + '.' + self.name
+        bucket_set = ValueSet(labels=self.label_names + ['le'])
+        bucket_set.name = name + '_bucket'
+        sum_set = ValueSet(labels=list(self.label_names))
+        sum_set.name = name + '_sum'
+        count_set = ValueSet(labels=list(self.label_names))
+        count_set.name = name + '_count'
+
+        for key, counts in self.counts.items():
+            bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+            for bound, count in zip(bounds, counts):
+                bucket_set.add(Value(count, label_values=list(key) + [bound]))
+            sum_set.add(Value(self.sums[key], label_values=list(key)))
+            count_set.add(Value(counts[-1], label_values=list(key)))
+        return [bucket_set, sum_set, count_set]
+
+
+class SelfMetrics:
+    """
+    Internal metrics about pollect itself (e.g. probe timeouts).
+    All metrics are exported using the reserved "pollect" prefix
+    """
+
+    PREFIX = 'pollect'
+
+    DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+    """
+    Default histogram buckets in seconds
+    """
+
+    def __init__(self, labels: Dict[str, str] = None):
+        """
+        :param labels: Static labels which are added to all metrics
+        """
+        self._labels = {} if labels is None else labels
+        self._metrics: Dict[str, SelfMetric] = {}
+        self._lock = Lock()
+
+    def inc(self, name: str, labels: Dict[str, str] = None, amount: float = 1):
+        """
+        Increments a counter
+        :param name: Name of the metric
+        :param labels: Labels of the series
+        :param amount: Increment
+        """
+        with self._lock:
+            metric, key = self._get_series(name, labels)
+            metric.values[key] = metric.values.get(key, 0) + amount
+
+    def set(self, name: str, value: float, labels: Dict[str, str] = None):
+        """
+        Sets the value of a gauge
+        :param name: Name of the metric
+        :param value: New value
+        :param labels: Labels of the series
+        """
+        with self._lock:
+            metric, key = self._get_series(name, labels)
+            metric.values[key] = value
+
+    def observe(self, name: str, value: float, labels: Dict[str, str] = None, buckets: List[float] = None):
+        """
+        Adds an observation to a histogram
+        :param name: Name of the metric
+        :param value: Observed value
+        :param labels: Labels of the series
+        :param buckets: Upper bounds of the buckets, only used when the histogram is created
+        """
+        with self._lock:
+            metric, key = self._get_series(name, labels, self.DEFAULT_BUCKETS if buckets is None else buckets)
+            assert isinstance(metric, SelfHistogram)
+            metric.observe(key, value)
+
+    def get_value_sets(self) -> List[ValueSet]:
+        """
+        Returns the current values of all metrics
+        :return: Value sets
+        """
+        with self._lock:
+            value_sets = []
+            for metric in self._metrics.values():
+                value_sets.extend(metric.get_value_sets(self.PREFIX))
+            return value_sets
+
+    def _get_series(self, name: str, labels: Dict[str, str] = None, buckets: List[float] = None):
+        all_labels = dict(self._labels)
+        if labels is not None:
+            all_labels.update(labels)
+
+        metric = self._metrics.get(name)
+        if metric is None:
+            if buckets is None:
+                metric = SelfMetric(name, list(all_labels.keys()))
+            else:
+                metric = SelfHistogram(name, list(all_labels.keys()), buckets)
+            self._metrics[name] = metric
+        key = tuple(all_labels.get(label_name, '') for label_name in metric.label_names)
+        return metric, key
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+from typing import List, Optional, Dict
+
+
+class Shard:
+    """
+    Slice of the sources (and targets) owned by this pollect instance.
+    Uses rendezvous hashing, so only the keys of an added or removed member move to another member.
+    No coordination is required, all instances only need the same list of members.
+    """
+
+    member: str
+    """
+    Name of this instance
+    """
+
+    members: List[str]
+    """
+    Names of all instances
+    """
+
+    def __init__(self, member: str, members: List[str]):
+        if member not in members:
+            raise ValueError(f'Shard member {member} is not part of the members {members}')
+        self.member = member
+        self.members = members
+
+    def __eq__(self, other):
+        if not isinstance(other, Shard):
+            return False
+        return self.member == other.member and self.members == other.members
+
+    def __hash__(self):
+        return hash((self.member, tuple(self.members)))
+
+    @staticmethod
+    def create(config: Optional[Dict[str, any]]) -> Optional[Shard]:
+        """
+        Creates the shard from the configuration.
+        Either "index" and "count" or "member" and "members" must be set
+
+        :param config: Shard configuration, None if sharding is disabled
+        :return: Shard or None
+        """
+        if config is None:
+            return None
+        if config.get('members') is not None:
+            return Shard(str(config.get('member')), [str(member) for member in config.get('members')])
+        count = int(config.get('count'))
+        index = int(config.get('index'))
+        return Shard(str(index), [str(i) for i in range(count)])
+
+    def owns(self, key: str) -> bool:
+        """
+        Checks if the given key belongs to this instance
+        :param key: Key of a source or target
+        :return: True if this instance is responsible for the key
+        """
+        return self.get_owner(key) == self.member
+
+    def get_owner(self, key: str) -> str:
+        """
+        Returns the member which is responsible for the given key
+        :param key: Key
+        :return: Member
+        """
+        return max(self.members, key=lambda member: self._get_weight(member, key))
+
+    def filter(self, keys: List[str]) -> List[str]:
+        """
+        Returns all keys which belong to this instance
+        :param keys: Keys
+        :return: Owned keys
+        """
+        return [key for key in keys if self.owns(key)]
+
+    @staticmethod
+    def _get_weight(member: str, key: str) -> int:
+        digest = hashlib.blake2b(f'{member}\0{key}'.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import List, Optional, Dict, Tuple
+
+from pollect.core.Shard import Shard
+from pollect.core.ValueSet import ValueSet
+from pollect.core.config.ConfigContainer import ConfigContainer
+from pollect.sources.Source import Source
+
+SCHEDULING_KEYS = ('tickTime', 'probeTimeout', 'circuitBreaker', 'shard', 'shardKey')
+"""
+Configuration keys which only affect how a source is scheduled, not what it probes
+"""
+
+
+def get_share_key(source_data: Dict[str, any]) -> Tuple:
+    """
+    Returns the part of the source configuration which identifies the probed data
+    :param source_data: Source configuration
+    :return: Hashable configuration without the scheduling settings
+    """
+    return tuple(sorted((key, _freeze(value)) for key, value in source_data.items() if key not in SCHEDULING_KEYS))
+
+
+def _freeze(value: any) -> any:
+    if isinstance(value, (dict, ConfigContainer)):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class SharedProbe:
+    """
+    Single source which is used by multiple executors.
+    The result of a probe is reused for half of the shortest interval in which the source is probed,
+    so each executor gets fresh data while the source itself is only probed once.
+    Executors which shard the targets of the source and executors which don't get separate results.
+    """
+
+    source: Source
+    interval: Optional[float] = None
+    """
+    Shortest interval in seconds in which the source is probed by any executor
+    """
+
+    def __init__(self, source: Source):
+        self.source = source
+        self.interval = None
+        self._users = 0
+        self._lock = threading.Lock()
+        self._results: Dict[Optional[Shard], Tuple[float, Optional[List[ValueSet]], Optional[Exception]]] = {}
+        """
+        Time, result and error of the last probe by shard
+        """
+
+    def add_user(self, interval: Optional[float]):
+        """
+        Registers an executor which probes the source
+        :param interval: Interval in seconds in which the executor probes the source
+        """
+        self._users += 1
+        if interval is not None and (self.interval is None or interval < self.interval):
+            self.interval = interval
+
+    def remove_user(self):
+        """
+        Unregisters an executor, the source is shut down once it has no users left
+        """
+        self._users -= 1
+        if self._users == 0:
+            self.source.shutdown()
+
+    def probe(self, deadline: Optional[float], shard: Optional[Shard]) -> Optional[List[ValueSet]]:
+        """
+        Returns the result of the source, probing it if the cached result is too old.
+        Concurrent calls wait for the same probe.
+        :param deadline: Deadline (monotonic) of the probe of the calling executor
+        :param shard: Shard of the calling executor, None if the targets are not sharded
+        :return: Copy of the value sets
+        """
+        with self._lock:
+            now = time.monotonic()
+            cached = self._results.get(shard)
+            if cached is None or self.interval is None or now - cached[0] >= self.interval / 2:
+                # The settings of the calling executor only apply while the lock is held
+                self.source.deadline = deadline
+                self.source.shard = shard
+                try:
+                    cached = (now, self.source.probe(), None)
+                except Exception as e:
+                    cached = (now, None, e)
+                self._results[shard] = cached
+            _, result, error = cached
+            if error is not None:
+                raise error
+            if result is None:
+                return None
+            return [value_set.copy() for value_set in result]
+
+
+class SharedSource(Source):
+    """
+    Source of an executor which is backed by a shared probe
+    """
+
+    def __init__(self, config, shared: SharedProbe):
+        super().__init__(config)
+        self.shared = shared
+
+    def shutdown(self):
+        self.shared.remove_user()
+
+    def _probe(self) -> Optional[List[ValueSet]]:
+        return self.shared.probe(self.deadline, self.shard)
+
+    def _process_results(self, results) -> Optional[List[ValueSet]]:
+        # Name and static labels have already been applied by the shared source
+        return results
@@ -1,42 +1,136 @@
-from threading import Lock
-from typing import Dict, List
+from threading import Lock, Condition
+from typing import Dict, List, Tuple, Optional, Sequence, Callable
 
-from pollect.core.ValueSet import Value, AvgValue
+from pollect.core.Aggregators import Aggregator, get_factory
+from pollect.core.ValueSet import Value
+
+
+class CachedSeries:
+    """
+    Aggregations of a single series
+    """
+
+    __slots__ = ('base', 'names', 'aggregators')
+
+    def __init__(self, base: Value, names: Sequence[str], aggregators: List[Aggregator]):
+        self.base = base
+        self.names = names
+        self.aggregators = aggregators
+
+    def add(self, value: float):
+        for aggregator in self.aggregators:
+            aggregator.add(value)
+
+    def get_values(self) -> List[Value]:
+        """
+        Returns the aggregated values.
+        With a single aggregation the value keeps its name, otherwise the aggregation is appended to the name
+        :return: Values
+        """
+        base = self.base
+        if len(self.aggregators) == 1:
+            base.value = self.aggregators[0].get()
+            return [base]
+        return [Value(aggregator.get(), base.label_values, f'{base.name}_{name}')
+                for name, aggregator in zip(self.names, self.aggregators)]
 
 
 class ValueCache:
     """
     Caches multiple values for async probing.
-    If multiple values of the same name are available, their value can be averaged
+    If multiple values of the same series are received between two probes, they are aggregated
+    (e.g. averaged, see Aggregators).
+    The series are split between multiple locks, so sources which receive values at a high rate
+    don't contend on a single lock.
     """
 
-    def __init__(self):
-        self._items: Dict[str, AvgValue] = {}
-        self._lock = Lock()
+    def __init__(self, stripes: int = 8):
+        """
+        :param stripes: Number of locks the series are split between
+        """
+        self._locks = [Lock() for _ in range(stripes)]
+        self._items: List[Dict[Tuple[Optional[str], Tuple[str, ...]], CachedSeries]] = [{} for _ in range(stripes)]
+        self._factories: Dict[Tuple[str, ...], List[Callable[[], Aggregator]]] = {}
+        self._batches = 0
+        """
+        Number of batches (see add_all) which are currently added
+        """
+        self._flushing = False
+        self._batch_state = Condition(Lock())
+        self._flush_lock = Lock()
 
     def flush_values(self) -> List[Value]:
-        self._lock.acquire()
+        """
+        Returns the aggregated values of all series received since the last flush
+        :return: Values
+        """
+        with self._flush_lock:
+            with self._batch_state:
+                # Batches which are being added are completed first and new ones wait,
+                # so a batch is never split between two flushes
+                self._flushing = True
+                self._batch_state.wait_for(lambda: self._batches == 0)
+            try:
+                stripes = []
+                for stripe, lock in enumerate(self._locks):
+                    with lock:
+                        stripes.append(self._items[stripe])
+                        self._items[stripe] = {}
+            finally:
+                with self._batch_state:
+                    self._flushing = False
+                    self._batch_state.notify_all()
         out = []
-        for item in self._items.values():
-            base = item.base
-            base.value = item.avg()
-            out.append(base)
-        self._items.clear()
-        self._lock.release()
+        for items in stripes:
+            for series in items.values():
+                out.extend(series.get_values())
         return out
 
-    def add(self, value: Value, average: bool = False):
-        key = value.get_key()
-        if average:
-            if key in self._items:
-                existing = self._items[key]
-                existing.add(value)
-                return
+    def add(self, value: Value, average: bool = False, aggregations: Optional[Tuple[str, ...]] = None):
+        """
+        Adds a value to its series
+        :param value: Value
+        :param average: True to average the values of the series, otherwise the last value is kept
+        :param aggregations: Aggregations of the series (e.g. ('avg', 'max', 'p95')), overrides average
+        """
+        if aggregations is None:
+            aggregations = ('avg',) if average else ('last',)
+        stripe = hash(value.get_key()) % len(self._locks)
+        with self._locks[stripe]:
+            self._add(stripe, value, aggregations)
 
-        self._items[key] = AvgValue(value)
+    def add_all(self, items: List[Tuple[Value, Tuple[str, ...]]]):
+        """
+        Adds multiple values at once, a flush returns either all or none of them.
+        Batches of multiple threads are added concurrently, only a flush waits for them
+        :param items: Values and the aggregations of their series (e.g. ('avg', 'max', 'p95'))
+        """
+        with self._batch_state:
+            self._batch_state.wait_for(lambda: not self._flushing)
+            self._batches += 1
+        try:
+            for value, aggregations in items:
+                stripe = hash(value.get_key()) % len(self._locks)
+                with self._locks[stripe]:
+                    self._add(stripe, value, aggregations)
+        finally:
+            with self._batch_state:
+                self._batches -= 1
+                if self._batches == 0:
+                    self._batch_state.notify_all()
 
-    def lock(self):
-        self._lock.acquire()
+    def _add(self, stripe: int, value: Value, aggregations: Tuple[str, ...]):
+        key = value.get_key()
+        items = self._items[stripe]
+        series = items.get(key)
+        if series is None:
+            series = CachedSeries(value, aggregations, [factory() for factory in self._get_factories(aggregations)])
+            items[key] = series
+        series.add(value.value)
 
-    def release(self):
-        self._lock.release()
+    def _get_factories(self, aggregations: Tuple[str, ...]) -> List[Callable[[], Aggregator]]:
+        factories = self._factories.get(aggregations)
+        if factories is None:
+            factories = [get_factory(name) for name in aggregations]
+            self._factories[aggregations] = factories
+        return factories
@@ -1,4 +1,14 @@
-from typing import List, Optional
+import time
+from array import array
+from typing import List, Optional, Dict, Iterator, Tuple, Sequence
+
+
+def get_time_ms() -> int:
+    """
+    Returns the current time in milliseconds since the epoch
+    :return: Timestamp
+    """
+    return time.time_ns() // 1000000
 
 
 class Value:
@@ -21,12 +31,19 @@ class Value:
     Values for the labels
     """
 
-    def __init__(self, value: any, label_values: list = None, name: str = None):
+    time: Optional[int] = None
+    """
+    Timestamp in milliseconds since the epoch at which the value has been sampled,
+    None to use the time of the value set
+    """
+
+    def __init__(self, value: any, label_values: list = None, name: str = None, time: Optional[int] = None):
         """
         Creates a new value
         :param value: Value (might be bool or float/int)
         :param label_values: The label values
         :param name: Name of this specific value, if None the ValueSet name will be used
+        :param time: Timestamp in milliseconds at which the value has been sampled, if known by the source
         """
         if isinstance(value, bool):
             self.value = 1 if value else 0
@@ -35,13 +52,14 @@ class Value:
 
         self.name = name
         self.label_values = [] if label_values is None else label_values  # type: List[str]
+        self.time = time
 
-    def get_key(self) -> str:
+    def get_key(self) -> Tuple[Optional[str], Tuple[str, ...]]:
         """
         Returns the unique key of this value
         :return: Key
         """
-        return self.name + ''.join(self.label_values)
+        return self.name, tuple(self.label_values)
 
     def __repr__(self):
         return str(self.value) + ' (' + str(self.name) + ', ' + str(self.label_values) + ')'
@@ -80,7 +98,8 @@ class ValueSet:
 
     time: int = 0
     """
-    Timestamp when the measurement was made
+    Timestamp in milliseconds since the epoch when the measurement was made (the probe completed),
+    0 if not set yet
     """
 
     name: str = ''
@@ -105,5 +124,163 @@ class ValueSet:
         """
         self.values.append(value)
 
+    def get_count(self) -> int:
+        """
+        Returns the number of values in this set
+        :return: Number of values
+        """
+        return len(self.values)
+
+    def iter_values(self) -> Iterator[Tuple[Optional[str], Sequence[str], float, int]]:
+        """
+        Iterates over the values of this set.
+        Writers should prefer this over the values list, since it doesn't require Value objects
+        :return: Name, label values, value and timestamp (milliseconds) of each value
+        """
+        for value in self.values:
+            yield value.name, value.label_values, value.value, self.get_time(value)
+
+    def add_static_labels(self, labels: Dict[str, str]):
+        """
+        Adds the given labels (with the same value) to all values of this set
+        :param labels: Label names mapped to their values
+        """
+        self.labels.extend(labels.keys())
+        label_values = list(labels.values())
+        for value in self.values:
+            value.label_values.extend(label_values)
+
+    def get_time(self, value: Value) -> int:
+        """
+        Returns the timestamp of the given value of this set
+        :param value: Value
+        :return: Timestamp in milliseconds since the epoch
+        """
+        if value.time is not None:
+            return value.time
+        return self.time
+
+    def copy(self):
+        """
+        Returns a copy of this set which can be renamed independently.
+        The values themselves are shared
+        :return: Value set
+        """
+        value_set = ValueSet(list(self.labels))
+        value_set.name = self.name
+        value_set.time = self.time
+        value_set.values = list(self.values)
+        return value_set
+
     def __repr__(self):
         return self.name + ' ' + str(self.labels) + '\n\t' + '\n\t'.join([str(value) for value in self.values])
+
+
+class ColumnarValueSet(ValueSet):
+    """
+    Value set which stores its values in columns instead of Value objects,
+    for sources which return a large number of values on each probe.
+    Value names and label values are interned, each distinct name and label combination is only stored once.
+
+    The values list is still supported, but it is a facade which creates the Value objects on each access
+    (changes to them are not applied to the set). Values should be added using add_value and read using iter_values.
+    """
+
+    def __init__(self, labels: Optional[List[str]] = None):
+        self._names: List[Optional[str]] = []
+        self._name_ids: Dict[Optional[str], int] = {}
+        self._label_values: List[Tuple[str, ...]] = []
+        self._label_ids: Dict[Tuple[str, ...], int] = {}
+        self._name_column = array('l')
+        self._label_column = array('l')
+        self._data = array('d')
+        # Sample time of each value (0 to use the time of the set), None until a value has its own time
+        self._time_column: Optional[array] = None
+        super().__init__(labels)
+
+    @property
+    def values(self) -> List[Value]:
+        times = self._time_column
+        return [Value(self._data[index], list(self._label_values[self._label_column[index]]),
+                      self._names[self._name_column[index]],
+                      None if times is None or times[index] == 0 else times[index])
+                for index in range(len(self._data))]
+
+    @values.setter
+    def values(self, values: List[Value]):
+        self._name_column = array('l')
+        self._label_column = array('l')
+        self._data = array('d')
+        self._time_column = None
+        for value in values:
+            self.add(value)
+
+    def add(self, value: Value):
+        self.add_value(value.value, value.label_values, value.name, value.time)
+
+    def add_value(self, value: float, label_values: Sequence[str] = (), name: Optional[str] = None,
+                  time: Optional[int] = None):
+        """
+        Adds a new value to this set without creating a Value object
+        :param value: Value
+        :param label_values: The label values
+        :param name: Name of this specific value, if None the ValueSet name will be used
+        :param time: Timestamp in milliseconds at which the value has been sampled, if known by the source
+        """
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self._names)
+            self._name_ids[name] = name_id
+            self._names.append(name)
+
+        label_values = tuple(label_values)
+        label_id = self._label_ids.get(label_values)
+        if label_id is None:
+            label_id = len(self._label_values)
+            self._label_ids[label_values] = label_id
+            self._label_values.append(label_values)
+
+        if time is not None and self._time_column is None:
+            self._time_column = array('q', [0]) * len(self._data)
+        self._name_column.append(name_id)
+        self._label_column.append(label_id)
+        self._data.append(value)
+        if self._time_column is not None:
+            self._time_column.append(0 if time is None else time)
+
+    def get_count(self) -> int:
+        return len(self._data)
+
+    def iter_values(self) -> Iterator[Tuple[Optional[str], Sequence[str], float, int]]:
+        names = self._names
+        label_values = self._label_values
+        if self._time_column is None:
+            for name_id, label_id, value in zip(self._name_column, self._label_column, self._data):
+                yield names[name_id], label_values[label_id], value, self.time
+            return
+        for name_id, label_id, value, timestamp in zip(self._name_column, self._label_column, self._data,
+                                                         self._time_column):
+            yield names[name_id], label_values[label_id], value, timestamp if timestamp != 0 else self.time
+
+    def add_static_labels(self, labels: Dict[str, str]):
+        static_values = tuple(labels.values())
+        if len(static_values) == 0:
+            return
+        # Only the distinct label combinations have to be extended
+        self.labels.extend(labels.keys())
+        self._label_values = [label_values + static_values for label_values in self._label_values]
+        self._label_ids = {label_values: label_id for label_id, label_values in enumerate(self._label_values)}
+
+    def copy(self):
+        value_set = ColumnarValueSet(list(self.labels))
+        value_set.name = self.name
+        value_set.time = self.time
+        value_set._names = list(self._names)
+        value_set._name_ids = dict(self._name_ids)
+        value_set._label_values = list(self._label_values)
+        value_set._label_ids = dict(self._label_ids)
+        value_set._name_column = self._name_column[:]
+        value_set._label_column = self._label_column[:]
+        value_set._data = self._data[:]
+        value_set._time_column = None if self._time_column is None else self._time_column[:]
+        return value_set
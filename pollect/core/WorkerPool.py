@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import Future
+from typing import List, Deque, Callable, Tuple
+
+from pollect.core.Log import Log
+
+
+class WorkerQuota:
+    """
+    Share of a worker pool which is used by a single executor.
+    Limits how many jobs of the executor may run at the same time.
+    """
+
+    name: str
+    max_concurrency: int
+    """
+    Maximum number of jobs of this quota which may run concurrently
+    """
+
+    priority: int
+    """
+    Pending jobs of quotas with a higher priority are started first
+    """
+
+    running: int = 0
+    """
+    Number of jobs which are currently running
+    """
+
+    def __init__(self, pool: WorkerPool, name: str, max_concurrency: int, priority: int):
+        self._pool = pool
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.priority = priority
+        self.running = 0
+        self.pending: Deque[Tuple[int, Future, Callable, tuple]] = deque()
+        self.closed = False
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """
+        Queues the given call for execution in the worker pool
+        :param fn: Callable
+        :param args: Arguments for the callable
+        :return: Future holding the result of the call
+        """
+        return self._pool.submit(self, fn, *args)
+
+    def has_capacity(self) -> bool:
+        return len(self.pending) > 0 and self.running < self.max_concurrency
+
+    def shutdown(self):
+        """
+        Removes this quota from the pool. Pending jobs are cancelled
+        """
+        self._pool.release(self)
+
+
+class WorkerPool(Log):
+    """
+    Process wide pool of worker threads which is shared by all executors.
+    The total number of threads is fixed, each executor gets a quota
+    which limits its concurrency so a slow executor can't starve the others.
+    """
+
+    def __init__(self, max_workers: int):
+        super().__init__()
+        self.max_workers = max(1, max_workers)
+        self._quotas: List[WorkerQuota] = []
+        self._threads: List[threading.Thread] = []
+        self._idle = 0
+        self._cond = threading.Condition()
+        self._sequence = itertools.count()
+        self._shutdown = False
+
+    def create_quota(self, name: str, max_concurrency: int, priority: int = 0) -> WorkerQuota:
+        """
+        Creates a new quota for an executor
+        :param name: Name of the quota, used for logging
+        :param max_concurrency: Maximum number of concurrently running jobs
+        :param priority: Priority of the jobs, higher values are started first
+        :return: Quota
+        """
+        quota = WorkerQuota(self, name, max_concurrency, priority)
+        with self._cond:
+            self._quotas.append(quota)
+        return quota
+
+    def submit(self, quota: WorkerQuota, fn: Callable, *args) -> Future:
+        """
+        Queues the given call for execution
+        :param quota: Quota of the executor
+        :param fn: Callable
+        :param args: Arguments for the callable
+        :return: Future holding the result of the call
+        """
+        future = Future()
+        with self._cond:
+            if quota.closed or self._shutdown:
+                raise RuntimeError(f'Cannot submit to {quota.name} after shutdown')
+            quota.pending.append((next(self._sequence), future, fn, args))
+            if self._idle < self._get_startable() and len(self._threads) < self.max_workers:
+                # Not enough idle workers - threads are created lazily
+                thread = threading.Thread(target=self._work, name=f'pollect-worker-{len(self._threads)}')
+                # Daemon, since hanging probes must not block the termination
+                thread.daemon = True
+                self._threads.append(thread)
+                thread.start()
+            # Idle workers might be blocked by their quota, wake them all up
+            self._cond.notify_all()
+        return future
+
+    def release(self, quota: WorkerQuota):
+        """
+        Removes the given quota from the pool.
+        The pool terminates its threads once the last quota has been released.
+        :param quota: Quota
+        """
+        with self._cond:
+            if quota.closed:
+                return
+            quota.closed = True
+            for _, future, _, _ in quota.pending:
+                if future.cancel():
+                    # Wakes up anyone waiting for the future
+                    future.set_running_or_notify_cancel()
+            quota.pending.clear()
+            self._quotas.remove(quota)
+            if len(self._quotas) == 0:
+                self._shutdown = True
+            self._cond.notify_all()
+
+    def _get_startable(self) -> int:
+        """
+        Returns the number of pending jobs which could be started right now.
+        Must be called while holding the lock
+        :return: Job count
+        """
+        count = 0
+        for quota in self._quotas:
+            count += min(len(quota.pending), quota.max_concurrency - quota.running)
+        return count
+
+    def _next_job(self):
+        """
+        Returns the next job which should be executed.
+        Must be called while holding the lock
+        :return: Quota and job or None if nothing can be started
+        """
+        best = None
+        for quota in self._quotas:
+            if not quota.has_capacity():
+                continue
+            if best is None or quota.priority > best.priority or \
+                    (quota.priority == best.priority and quota.pending[0][0] < best.pending[0][0]):
+                best = quota
+        if best is None:
+            return None
+        return best, best.pending.popleft()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                entry = self._next_job()
+                while entry is None:
+                    if self._shutdown:
+                        return
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                    entry = self._next_job()
+                quota, (_, future, fn, args) = entry
+                quota.running += 1
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*args))
+                    except BaseException as e:
+                        future.set_exception(e)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self._cond:
+                    quota.running -= 1
+                    # A slot of the quota is free again
+                    self._cond.notify_all()
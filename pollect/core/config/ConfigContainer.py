@@ -14,6 +14,17 @@ class ConfigContainer:
     def __init__(self, data: Dict[str, any]):
         self._data = data
 
+    def __eq__(self, other):
+        # Compares the raw configuration, so unchanged objects can be detected on a reload
+        if isinstance(other, ConfigContainer):
+            return self._data == other._data
+        if isinstance(other, dict):
+            return self._data == other
+        return NotImplemented
+
+    # The container is mutable and compared by its content, so it can't be used as a dict key or in a set
+    __hash__ = None
+
     def __getitem__(self, item):
         return self.get(item, required=True)
 
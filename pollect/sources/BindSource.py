@@ -1,10 +1,10 @@
-import time
 from urllib.error import URLError
 from xml.etree import ElementTree
 
 from pollect.core import Helper
 from pollect.core.ValueSet import ValueSet, Value
 from pollect.sources.Source import Source
+from pollect.sources.helper.CounterRates import CounterRates
 
 
 class BindSource(Source):
@@ -16,8 +16,7 @@ class BindSource(Source):
         super().__init__(config)
         self.url = config.get('url')
         self.views = config.get('views')
-        self._last_counters = None
-        self._last_time = None
+        self._rates = CounterRates()
 
     def _probe(self):
         counter_data = {}
@@ -60,18 +59,11 @@ class BindSource(Source):
                 data.add(Value(int(value), name=low_view_name + '.cache.rrsets',
                                label_values=[name.lower()]))
 
-        if self._last_time is not None:
-            # Calculate delta for counter values
-            time_delta = int(time.time() - self._last_time)
-            for key, value in counter_data.items():
-                name, query_type = key.split('|', 2)
-                if key in self._last_counters:
-                    data.add(Value((value - self._last_counters[key]) / time_delta,
-                                   name=name + '_per_sec',
-                                   label_values=[query_type]))
-
-        self._last_time = time.time()
-        self._last_counters = counter_data
+        # Calculate delta for counter values
+        for key, rate in self._rates.get_rates(counter_data, prune=True).items():
+            name, query_type = key.split('|', 2)
+            data.add(Value(rate, name=name + '_per_sec', label_values=[query_type]))
+
         return [data]
 
 
@@ -12,6 +12,7 @@ from pollect.sources.Source import Source
 
 class DellOpenManageSource(Source):
     value: Optional[int] = None
+    shard_targets = True
 
     def __init__(self, config):
         super().__init__(config)
@@ -24,13 +25,13 @@ class DellOpenManageSource(Source):
         worker_threads = config.get("worker_threads", 8)
 
         self.scrape_policy = config.get("scrape_policy", "auto")
+        self.energy_api_endpoint = config["energy_api_endpoint"]
 
         if self.scrape_policy == 'manual':
             self.targets = config["targets"]
         if self.scrape_policy == 'auto':
             self.targets = self._get_targets()
 
-        self.energy_api_endpoint = config["energy_api_endpoint"]
         self.ome = DellOpenManage(endpoint=ome_endpoint, username=ome_username, password=ome_password, logger=self.log,
                                   worker_threads=min(worker_threads, len(self.targets)))
 
@@ -47,7 +48,7 @@ class DellOpenManageSource(Source):
         if self.scrape_policy == 'all':
             result = self.ome.query_all_hosts()
         else:
-            result = self.ome.query_hosts(self.targets)
+            result = self.ome.query_hosts(self.filter_targets(self.targets))
 
         for host in result:
             if host is None:
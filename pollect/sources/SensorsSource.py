@@ -18,7 +18,7 @@ class SensorsSource(Source):
 
     def _probe(self):
         data = ValueSet(labels=['device', 'name', 'unit'])
-        lines = subprocess.check_output(['sensors']).decode('utf-8').splitlines()
+        lines = subprocess.check_output(['sensors'], timeout=self.get_remaining_time()).decode('utf-8').splitlines()
         device = None
         skip_chip = False
         for line in lines:
@@ -1,5 +1,6 @@
 from typing import Optional, List
 
+from pollect.core.Aggregators import get_factory
 from pollect.core.ValueCache import ValueCache
 from pollect.core.ValueSet import ValueSet, Value
 from pollect.libs.sma.SmaEnergyMeter import SmaEnergyMeter, MeterProtocol
@@ -15,20 +16,26 @@ class SmaEnergyMeterSource(Source):
         super().__init__(config)
         self._sma = SmaEnergyMeter(config['hostIp'])
         self._cache = ValueCache()
+        # Aggregations of the values which are received between two probes (e.g. avg, max, p95)
+        self._aggregations = tuple(config.get('aggregations', ['avg']))
+        for name in self._aggregations:
+            # Fails for unknown aggregations
+            get_factory(name)
         self._sma.meterProtocolReceived += self._handle_data
 
     def _handle_data(self, proto: MeterProtocol):
-        self._cache.lock()
+        items = []
         for item in proto.obis_pairs:
             value = Value(item.get_as_base_unit(),
                           name=item.meta.name,
                           label_values=[str(item.meta.phase)])
             if item.meta.type == 'avg':
-                self._cache.add(value, average=True)
+                items.append((value, self._aggregations))
                 continue
             value.name += '_sum'
-            self._cache.add(value)
-        self._cache.release()
+            items.append((value, ('last',)))
+        # A probe either gets all values of a datagram or none of them
+        self._cache.add_all(items)
 
     def setup(self, global_conf):
         self._sma.start()
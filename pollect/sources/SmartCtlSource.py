@@ -22,7 +22,8 @@ class SmartCtlSource(Source):
     def _probe(self):
         values = ValueSet(labels=['attribute', 'dev'])
         for dev in self.devices:
-            json_str = subprocess.check_output(['smartctl', '--json', '/dev/' + dev, '-a']).decode('utf-8')
+            json_str = subprocess.check_output(['smartctl', '--json', '/dev/' + dev, '-a'],
+                                               timeout=self.get_remaining_time()).decode('utf-8')
             data = json.loads(json_str)
 
             attributes_data = data.get('ata_smart_attributes')
@@ -1,6 +1,5 @@
 import re
 import subprocess
-import time
 from typing import Dict, List, Optional
 
 from pollect.core.Log import Log
@@ -9,11 +8,12 @@ from pollect.core.ValueSet import ValueSet, Value
 from pollect.core.config.ConfigContainer import ConfigContainer
 from pollect.libs.Utils import chunks
 from pollect.sources.Source import Source
-from pollect.sources.helper.ProbeValue import ProbeValue
+from pollect.sources.helper.CounterRates import CounterRates
 
 
 class SnmpValue:
     COUNTER32 = 'counter32'
+    COUNTER64 = 'counter64'
 
     __slots__ = ['val_type', 'value']
 
@@ -21,14 +21,16 @@ class SnmpValue:
         self.val_type = val_type
         self.value = value
 
-    def get_delta(self, old_value: float):
-        delta = self.value - old_value
+    def get_bits(self) -> Optional[int]:
+        """
+        Returns the width of counter values
+        :return: Width in bits or None if unknown
+        """
         if self.val_type == self.COUNTER32:
-            if delta < 0:
-                # Value did overflow - get the delta between the overflow and the last number
-                # and add the new value and +1 since there is one increment from max val to 0
-                return (4294967295 - old_value) + self.value + 1
-        return delta
+            return 32
+        if self.val_type == self.COUNTER64:
+            return 64
+        return None
 
 
 class OidLabel:
@@ -66,10 +68,9 @@ class MetricDefinition(Log):
         OIDs which should be probed
         """
 
-        self._last_probe = {}  # type: Dict[str, ProbeValue]
+        self._rates = CounterRates()
         """
-        Holds the timestamps of the last metrics mapped to the metric name.
-        This is used to calculate a rate
+        Holds the last values of the oids, used to calculate a rate
         """
 
         range_data = data.get('range')  # type: Dict[str, any]
@@ -117,7 +118,7 @@ class MetricDefinition(Log):
 
             value = self._to_value(snmp_value, resolved.oid)
             if value is None:
-                return data
+                continue
             value.label_values = self._get_label_values(resolved, snmp_values)
             data.values.append(value)
         return data
@@ -131,21 +132,15 @@ class MetricDefinition(Log):
             # Regular value
             return Value(smnp_value.value, name=self.name)
 
-        last_probe = self._last_probe.get(oid)  # type: Optional[ProbeValue]
-        if last_probe is None:
-            self._last_probe[oid] = ProbeValue(time.time(), smnp_value)
-            return None
-
-        # > 1st run - create a rate value for each value and sum them afterwards
+        # Create a rate value for each value and sum them afterwards
         # This is required to handle the overflow of each value correctly
-        time_delta = time.time() - last_probe.time
-        delta_value = smnp_value.get_delta(last_probe.data.value)
-        pollect_value = Value(delta_value / time_delta, name=self.name)
-
-        # Refresh the data
-        last_probe.time = time.time()
-        last_probe.data = smnp_value
-        return pollect_value
+        bits = smnp_value.get_bits()
+        # Only counters wrap around, other values (e.g. gauges) may decrease
+        rate = self._rates.get_rate(oid, smnp_value.value, bits=bits, wrap=bits is not None)
+        if rate is None:
+            # First run
+            return None
+        return Value(rate, name=self.name)
 
     @staticmethod
     def _resolve_oids(oid: str, start: int, end: int, label_name: str, oid_labels: List[OidLabel]) \
@@ -231,7 +226,7 @@ class SnmpGetSource(Source):
 
         args = ['snmpget', '-v1', '-c', self.community, self.host]
         args.extend(oids)
-        lines = subprocess.check_output(args).decode('utf-8').splitlines()
+        lines = subprocess.check_output(args, timeout=self.get_remaining_time()).decode('utf-8').splitlines()
 
         values = {}
         for line in lines:
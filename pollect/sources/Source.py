@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import random
+import time
 import typing
 from abc import abstractmethod
 from time import sleep
@@ -8,10 +11,11 @@ from typing import Optional, List
 
 from pollect.core import OSEnv
 from pollect.core.Log import Log
-from pollect.core.ValueSet import ValueSet, Value
+from pollect.core.ValueSet import ValueSet, Value, get_time_ms, ColumnarValueSet
 
 if typing.TYPE_CHECKING:
     from pollect.core.Core import Configuration
+    from pollect.core.Shard import Shard
 
 
 class Source(Log):
@@ -34,13 +38,43 @@ class Source(Log):
     Static labels which should be added to all values
     """
 
+    tick_time: Optional[float] = None
+    """
+    Interval in which this source should be probed, None to probe it on every tick of the executor
+    """
+
+    probe_timeout: Optional[float] = None
+    """
+    Maximum time in seconds a single probe of this source may take
+    """
+
+    deadline: Optional[float] = None
+    """
+    Monotonic time at which the current probe is abandoned, None if unlimited
+    """
+
+    shard_targets: bool = False
+    """
+    True if this source splits its own targets between the shards (see filter_targets)
+    instead of being assigned to a single shard as a whole
+    """
+
+    shard: Optional[Shard] = None
+    """
+    Shard of this instance if the targets of this source should be sharded
+    """
+
     global_conf: Configuration
 
     def __init__(self, config):
         super().__init__(config['type'])
         self.name = config.get('name')
+        self.tick_time = config.get('tickTime')
+        self.probe_timeout = config.get('probeTimeout')
 
         self.labels = config.get('labels', {})
+        # Resolved once, instead of for each value on every probe
+        self._static_labels = dict(zip(self.labels.keys(), self.labels.values()))
         self.type = config['type']
 
     def setup(self, global_conf):
@@ -52,24 +86,76 @@ class Source(Log):
         """
         self.global_conf = global_conf
 
+    def is_async(self) -> bool:
+        """
+        Indicates if this source implements an ``async _probe()``.
+        Async sources are awaited directly by the asyncio engine instead of using a worker thread
+
+        :return: True if the probe is a coroutine
+        """
+        return asyncio.iscoroutinefunction(self._probe)
+
+    def get_remaining_time(self) -> Optional[float]:
+        """
+        Returns the time left until the current probe is abandoned.
+        Should be used as timeout for blocking calls (e.g. subprocesses) so they are killed
+        once the probe has been abandoned.
+
+        :return: Remaining time in seconds or None if unlimited
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def filter_targets(self, targets: List[str]) -> List[str]:
+        """
+        Returns the targets which should be probed by this instance
+        :param targets: All targets of this source
+        :return: Targets owned by this instance
+        """
+        if self.shard is None:
+            return targets
+        return self.shard.filter(targets)
+
     def probe(self) -> Optional[List[ValueSet]]:
         """
         Probes the data and returns it
 
         :return: Single value or dict of values where the key is appendix for the data path
         """
-        results = self._probe()
+        if self.is_async():
+            # Async source used outside the event loop (e.g. by the thread engine)
+            return self._process_results(asyncio.run(self._probe()))
+        return self._process_results(self._probe())
+
+    async def probe_async(self) -> Optional[List[ValueSet]]:
+        """
+        Probes the data of an async source and returns it
+
+        :return: Single value or dict of values where the key is appendix for the data path
+        """
+        return self._process_results(await self._probe())
+
+    def _process_results(self, results) -> Optional[List[ValueSet]]:
+        """
+        Converts the raw results of the probe into value sets,
+        adds the static labels of this source and sets the time of the measurement
+
+        :param results: Result of _probe
+        :return: Value sets
+        """
         if results is None:
             return None
         if isinstance(results, ValueSet):
             results = [results]
+        now = get_time_ms()
         for result in results:
             result.name = self._get_suffix()
+            # Sources which know the actual sample time set it for each value
+            result.time = now
 
             # Add static labels from config
-            result.labels.extend(self.labels.keys())
-            for value in result.values:
-                value.label_values.extend(self.labels.values())
+            result.add_static_labels(self._static_labels)
 
         return results
 
@@ -116,6 +202,49 @@ class DummySource(Source):
         return data
 
 
+class AsyncDummySource(Source):
+    def __init__(self, config):
+        super().__init__(config)
+        self.value = config.get('value')
+        self.sleep = config.get('sleep', 0)
+
+    async def _probe(self) -> Optional[ValueSet]:
+        if self.sleep > 0:
+            await asyncio.sleep(self.sleep)
+        data = ValueSet()
+        data.add(Value(self.value))
+        return data
+
+
+class SyntheticSource(Source):
+    """
+    Generates a configurable number of random values, used for benchmarks
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.values = config.get('values', 10)
+        self.label_count = config.get('labelCount', 1)
+        self.cardinality = config.get('cardinality', 10)
+        self.columnar = config.get('columnar', False)
+
+    def _probe(self) -> Optional[ValueSet]:
+        labels = ['series'] + [f'label{i}' for i in range(self.label_count)]
+        if self.columnar:
+            data = ColumnarValueSet(labels=labels)
+            for i in range(self.values):
+                data.add_value(random.random(), self._get_label_values(i))
+            return data
+
+        data = ValueSet(labels=labels)
+        for i in range(self.values):
+            data.add(Value(random.random(), label_values=self._get_label_values(i)))
+        return data
+
+    def _get_label_values(self, index: int) -> List[str]:
+        return [str(index)] + [str((index + label) % self.cardinality) for label in range(self.label_count)]
+
+
 class LoadAvgSource(Source):
     def _probe(self):
         if not OSEnv.is_linux():
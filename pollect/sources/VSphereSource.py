@@ -5,13 +5,14 @@ from typing import Optional
 
 import requests
 
-from pollect.core.ValueSet import ValueSet, Value
+from pollect.core.ValueSet import ColumnarValueSet
 from pollect.sources.Source import Source
 from pollect.libs.vmware.vsphere import Vsphere
 
 
 class VSphereSource(Source):
     value: Optional[int] = None
+    shard_targets = True
 
     def __init__(self, config):
         super().__init__(config)
@@ -24,13 +25,13 @@ class VSphereSource(Source):
         worker_threads = config.get("worker_threads", 8)
 
         self.scrape_policy = config.get("scrape_policy", "auto")
+        self.energy_api_endpoint = config["energy_api_endpoint"]
 
         if self.scrape_policy == 'manual':
             self.targets = config["targets"]
         if self.scrape_policy == 'auto':
             self.targets = self._get_targets()
 
-        self.energy_api_endpoint = config["energy_api_endpoint"]
         self.vsphere = Vsphere(endpoint=vsphere_endpoint, username=vsphere_username, password=vsphere_password,
                                logger=self.log, worker_threads=min(worker_threads, len(self.targets)))
 
@@ -43,11 +44,12 @@ class VSphereSource(Source):
 
     def _probe(self):
 
-        data = ValueSet(labels=["type", "host", "vm"])
+        # Thousands of vms with hundreds of counters each
+        data = ColumnarValueSet(labels=["type", "host", "vm"])
         if self.scrape_policy == 'all':
             result = self.vsphere.query_all_hosts()
         else:
-            result = self.vsphere.query_hosts(self.targets)
+            result = self.vsphere.query_hosts(self.filter_targets(self.targets))
 
         excluded_metrics = ["name", "vms"]
 
@@ -56,17 +58,31 @@ class VSphereSource(Source):
                 self.log.warning("VSphere: No data found for host")
                 continue
             # add host metrics
+            sample_time = self._get_sample_time(host)
             for metric in host.keys():
                 if metric not in excluded_metrics:
-                    data.add(Value(host[metric], label_values=["host", host["name"], ""], name=metric))
+                    data.add_value(host[metric], ("host", host["name"], ""), metric, sample_time)
 
             # add vm metrics
             for vm in host["vms"]:
                 if vm is None:
                     self.log.warning("VSphere: No data found for host")
                     continue
+                sample_time = self._get_sample_time(vm)
                 for metric in vm.keys():
                     if metric not in excluded_metrics:
-                        data.add(Value(vm[metric], label_values=["vm", host["name"], vm["name"]], name=metric))
+                        data.add_value(vm[metric], ("vm", host["name"], vm["name"]), metric, sample_time)
 
         return data
+
+    @staticmethod
+    def _get_sample_time(result: dict) -> Optional[int]:
+        """
+        Returns the time at which vSphere has sampled the performance counters
+        :param result: Query result of a host or vm
+        :return: Timestamp in milliseconds or None if unknown
+        """
+        sample_ts = result.get('sample_ts', -1)
+        if sample_ts is None or sample_ts <= 0:
+            return None
+        return int(sample_ts * 1000)
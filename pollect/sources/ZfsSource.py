@@ -53,6 +53,9 @@ class ZpoolIostat:
         :return: Data
         """
         output: List[ValueSet] = []
+        if self._ticks == 0:
+            # No report since the last probe
+            return output
         for value_set in self._sets:
             new_set = ValueSet(labels=value_set.labels)
             output.append(new_set)
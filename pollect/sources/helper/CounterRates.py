@@ -0,0 +1,229 @@
+import math
+import time
+from array import array
+from typing import Dict, Hashable, Optional, Tuple, Sequence, List
+
+try:
+    import numpy
+except ImportError:
+    # Optional, the rates of counter vectors are calculated in python instead
+    numpy = None
+
+
+class CounterRates:
+    """
+    Calculates the rate (per second) of counters between two probes.
+    The previous sample of each counter is kept in arrays, indexed by a slot per counter key.
+    Uses the monotonic clock, so changes of the wall clock don't distort the rates.
+
+    A counter which decreases either wrapped around or has been reset (e.g. the device restarted).
+    It's considered wrapped if the increase across the wrap is less than half of the counter range,
+    otherwise it has been reset and no rate is returned for this probe.
+    """
+
+    bits: Optional[int] = None
+    """
+    Width of the counters (32 or 64), None to detect wraparounds of both widths
+    """
+
+    def __init__(self, bits: Optional[int] = None):
+        """
+        :param bits: Width of the counters (32 or 64), None to detect wraparounds of both widths
+        """
+        self.bits = bits
+        self._slots: Dict[Hashable, int] = {}
+        self._values = array('d')
+        self._times = array('d')
+
+    def get_rates(self, counters: Dict[Hashable, float], now: Optional[float] = None,
+                  bits: Optional[int] = None, prune: bool = False, wrap: bool = True) -> Dict[Hashable, float]:
+        """
+        Stores the given counter values and returns the rates since their previous values
+        :param counters: Counter keys mapped to their current values
+        :param now: Monotonic time at which the counters have been sampled
+        :param bits: Width of the counters, overrides the default width
+        :param prune: True if the counters are complete, the samples of all other counters are removed
+        (e.g. of devices which no longer exist)
+        :param wrap: False if the values aren't counters (e.g. gauges),
+        a decrease then results in a negative rate instead of being handled as wraparound or reset
+        :return: Rates per second of all counters which have a previous sample
+        """
+        if now is None:
+            now = time.monotonic()
+        if bits is None:
+            bits = self.bits
+
+        rates = {}
+        slots = self._slots
+        values = self._values
+        times = self._times
+        for key, value in counters.items():
+            slot = slots.get(key)
+            if slot is None:
+                slots[key] = len(values)
+                values.append(value)
+                times.append(now)
+                continue
+
+            last_value = values[slot]
+            time_delta = now - times[slot]
+            values[slot] = value
+            times[slot] = now
+            if time_delta <= 0:
+                continue
+            delta = value - last_value
+            if delta < 0 and wrap:
+                delta = self.get_wrapped_delta(last_value, value, bits)
+                if delta is None:
+                    # Reset, the rate can't be known until the next sample
+                    continue
+            rates[key] = delta / time_delta
+
+        if prune and len(slots) > len(counters):
+            self._prune(counters)
+        return rates
+
+    def get_rate(self, key: Hashable, value: float, now: Optional[float] = None,
+                 bits: Optional[int] = None, wrap: bool = True) -> Optional[float]:
+        """
+        Stores the value of a single counter and returns its rate
+        :param key: Counter key
+        :param value: Current value
+        :param now: Monotonic time at which the counter has been sampled
+        :param bits: Width of the counter, overrides the default width
+        :param wrap: False if the value isn't a counter (e.g. a gauge), a decrease then results in a negative rate
+        :return: Rate per second or None if there is no previous sample (or the counter has been reset)
+        """
+        return self.get_rates({key: value}, now, bits, wrap=wrap).get(key)
+
+    def _prune(self, keys: Dict[Hashable, float]):
+        slots = {}
+        values = array('d')
+        times = array('d')
+        for key, slot in self._slots.items():
+            if key not in keys:
+                continue
+            slots[key] = len(values)
+            values.append(self._values[slot])
+            times.append(self._times[slot])
+        self._slots = slots
+        self._values = values
+        self._times = times
+
+    @staticmethod
+    def get_wrapped_delta(last_value: float, value: float, bits: Optional[int] = None) -> Optional[float]:
+        """
+        Returns the increase of a counter which has decreased
+        :param last_value: Previous value
+        :param value: Current value
+        :param bits: Width of the counter, None to try 32 and 64 bits
+        :return: Increase across the wraparound or None if the counter has been reset
+        """
+        for width in ((32, 64) if bits is None else (bits,)):
+            size = 2 ** width
+            if last_value >= size:
+                continue
+            delta = value + (size - last_value)
+            if delta < size / 2:
+                return delta
+        return None
+
+
+class CounterVector:
+    """
+    Calculates the rates of many counters which are sampled together (e.g. all fields of all network interfaces).
+    The counters are stored in a contiguous array in which each key (e.g. a device) owns a block of fields.
+    As long as the keys don't change between two probes, the rates are calculated without any per-key lookup,
+    using NumPy array operations if NumPy is installed.
+    """
+
+    fields: int
+    """
+    Number of counters of each key
+    """
+
+    bits: Optional[int] = None
+    """
+    Width of the counters (32 or 64), None to detect wraparounds of both widths
+    """
+
+    def __init__(self, fields: int, bits: Optional[int] = None):
+        """
+        :param fields: Number of counters of each key
+        :param bits: Width of the counters (32 or 64), None to detect wraparounds of both widths
+        """
+        self.fields = fields
+        self.bits = bits
+        self._keys: Tuple[Hashable, ...] = ()
+        self._values = None
+        self._time: Optional[float] = None
+
+    def get_rates(self, keys: Tuple[Hashable, ...], values: Sequence[float], now: Optional[float] = None) \
+            -> List[float]:
+        """
+        Stores the given counters and returns the rates since their previous values
+        :param keys: Key of each block of counters
+        :param values: Counters, the fields of each key in the order of the keys
+        :param now: Monotonic time at which the counters have been sampled
+        :return: Rate per second of each counter, NaN if there is no previous sample (or the counter has been reset)
+        """
+        if now is None:
+            now = time.monotonic()
+        if numpy is not None:
+            current = numpy.asarray(values, dtype=numpy.float64)
+        else:
+            current = array('d', values)
+
+        previous = self._get_previous(keys)
+        time_delta = 0 if self._time is None else now - self._time
+        self._keys = keys
+        self._values = current
+        self._time = now
+        if previous is None or time_delta <= 0:
+            return [math.nan] * len(current)
+
+        if numpy is not None:
+            deltas = current - previous
+            for index in numpy.flatnonzero(deltas < 0):
+                deltas[index] = self._get_wrapped_delta(previous[index], current[index])
+            return (deltas / time_delta).tolist()
+
+        rates = []
+        for last_value, value in zip(previous, current):
+            delta = value - last_value
+            if delta < 0:
+                delta = self._get_wrapped_delta(last_value, value)
+            rates.append(delta / time_delta)
+        return rates
+
+    def _get_wrapped_delta(self, last_value: float, value: float) -> float:
+        delta = CounterRates.get_wrapped_delta(last_value, value, self.bits)
+        if delta is None:
+            # Reset
+            return math.nan
+        return delta
+
+    def _get_previous(self, keys: Tuple[Hashable, ...]):
+        """
+        Returns the previous counters in the layout of the given keys
+        :param keys: Current keys
+        :return: Previous counters, NaN for new keys. None if there are no previous counters
+        """
+        if self._values is None:
+            return None
+        if keys == self._keys:
+            return self._values
+
+        # The keys have changed, move the blocks of the remaining keys to their new position
+        blocks = {key: block for block, key in enumerate(self._keys)}
+        fields = self.fields
+        if numpy is not None:
+            previous = numpy.full(len(keys) * fields, numpy.nan)
+        else:
+            previous = array('d', [math.nan]) * (len(keys) * fields)
+        for block, key in enumerate(keys):
+            old_block = blocks.get(key)
+            if old_block is None:
+                continue
+            previous[block * fields:(block + 1) * fields] = self._values[old_block * fields:(old_block + 1) * fields]
+        return previous
@@ -1,7 +1,11 @@
+import math
+import operator
 import time
+from typing import Callable
 
 from pollect.core import Helper
-from pollect.core.ValueSet import ValueSet, Value
+from pollect.core.ValueSet import ColumnarValueSet
+from pollect.sources.helper.CounterRates import CounterVector
 
 
 class PsutilStats:
@@ -14,18 +18,29 @@ class PsutilStats:
         :type data_map: dict(str, dict(str, str))
         :param key_name: Name of the value which is used as key by the psutil command (e.g. interfaces, disk, ..)
         """
-        self._last_time = None
+        self._fields = list(data_map.keys())
+        self._rates = CounterVector(len(self._fields))
         """
-        Timestamp of the last run
-        
-        :type __last_time: float
+        Previous counters, used to calculate the rates
         """
 
-        self._stats = {}
+        self._names = []
         """
-        Last statistics probed
-        
-        :type _stats: dict(str, int)
+        Total and derived value name of each field, None if disabled
+        """
+        for source, dest in data_map.items():
+            total_name = dest['total'] if 'total' in dest else 'total_' + source
+            derive_name = dest['drv'] if 'drv' in dest else source + '_sec'
+            self._names.append((total_name, derive_name))
+
+        self._get_fields = None
+        """
+        Returns the mapped fields of a psutil namedtuple, created on the first probe
+        """
+
+        self._labels = {}
+        """
+        Label of each accepted key, None if the key is excluded
         """
 
         self._probe_call = probe_call
@@ -57,38 +72,47 @@ class PsutilStats:
         :rtype: dict(str, int)
         """
         probe_data = self._probe_call()
-        data = ValueSet(labels=[self._key_name])
+        now = time.monotonic()
+        if self._get_fields is None and len(probe_data) > 0:
+            self._get_fields = self._create_field_getter(type(next(iter(probe_data.values()))))
+
+        # Each key is checked only once, as long as it exists
+        last_labels = self._labels
+        self._labels = {}
+        labels = []
+        counters = []
         for if_name, stats in probe_data.items():
-            if not Helper.accept(self.include, self.exclude, if_name):
+            label = last_labels.get(if_name, False)
+            if label is False:
+                label = if_name.replace('.', '_') if Helper.accept(self.include, self.exclude, if_name) else None
+            self._labels[if_name] = label
+            if label is None:
                 continue
-
-            # Convert namedtuple to dict
-            stats = stats._asdict()
-            if_name = if_name.replace('.', '_')
-
-            last_stats = self._stats.get(if_name)
-            self._stats[if_name] = stats
-
-            for source, dest in self._data_map.items():
-                if 'total' in dest:
-                    total_name = dest['total']
-                else:
-                    total_name = 'total_' + source
-
-                if 'drv' in dest:
-                    derive_name = dest['drv']
-                else:
-                    derive_name = source + '_sec'
-
+            labels.append(label)
+            counters.extend(self._get_fields(stats))
+
+        rates = self._rates.get_rates(tuple(labels), counters, now)
+        data = ColumnarValueSet(labels=[self._key_name])
+        index = 0
+        for label in labels:
+            label_values = (label,)
+            for total_name, derive_name in self._names:
                 if total_name is not None:
                     # Total counters might be disabled by setting it to None
-                    data.add(Value(stats[source], name=total_name, label_values=[if_name]))
-
-                if last_stats is not None and derive_name is not None:
-                    time_delta = int(time.time() - self._last_time)
-
-                    data.add(Value((stats[source] - last_stats[source]) / time_delta, name=derive_name,
-                                   label_values=[if_name]))
-
-        self._last_time = time.time()
+                    data.add_value(counters[index], label_values, total_name)
+                rate = rates[index]
+                if derive_name is not None and not math.isnan(rate):
+                    data.add_value(rate, label_values, derive_name)
+                index += 1
         return data
+
+    def _create_field_getter(self, stats_type) -> Callable[[tuple], tuple]:
+        """
+        Creates a function which returns the mapped fields of a psutil namedtuple
+        :param stats_type: Namedtuple type returned by psutil
+        :return: Function
+        """
+        getter = operator.itemgetter(*[stats_type._fields.index(field) for field in self._fields])
+        if len(self._fields) == 1:
+            return lambda stats: (getter(stats),)
+        return getter
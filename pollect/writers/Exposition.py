@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import gzip
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Tuple, Set, Callable
+
+from pollect.core.ValueSet import ValueSet
+
+try:
+    import zstandard
+except ImportError:
+    # Optional, only gzip compressed expositions are served
+    zstandard = None
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+"""
+Content type of the prometheus text exposition format
+"""
+
+IDENTITY = 'identity'
+
+ENCODINGS: List[str] = ['gzip'] if zstandard is None else ['zstd', 'gzip']
+"""
+Supported content encodings, the preferred encoding first
+"""
+
+Series = Tuple[str, float, int]
+"""
+Rendered name and labels of the series (e.g. 'metric{a="b"} '), value and timestamp
+"""
+
+
+def format_value(value: float) -> str:
+    """
+    Formats a sample value like the prometheus client
+    :param value: Value
+    :return: Text
+    """
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """
+    Returns the content encoding of a response
+    :param accept_encoding: Accept-Encoding header of the request
+    :return: Supported encoding with the highest quality (the preferred one if equal), IDENTITY if none is accepted
+    """
+    best = IDENTITY
+    best_quality = 0.0
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if name not in ENCODINGS:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if quality > best_quality or \
+                (quality == best_quality and best != IDENTITY and ENCODINGS.index(name) < ENCODINGS.index(best)):
+            best = name
+            best_quality = quality
+    return best
+
+
+def encode(body: bytes, encoding: str) -> bytes:
+    """
+    Compresses the given body
+    :param body: Body
+    :param encoding: Content encoding (one of ENCODINGS or IDENTITY)
+    :return: Encoded body
+    """
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    return body
+
+
+class Exposition:
+    """
+    Keeps the exported series in a table and renders the prometheus text exposition from it.
+    The metrics changed by a write are rendered right away, so a scrape only has to serve the cached bytes
+    (and the compressed variants, which are created at most once per write).
+
+    The metrics are grouped by their collection (the first part of the value set name),
+    so each collection can also be served on its own. A write increments the generation of the collections
+    it has changed, which identifies the version of a response (its ETag).
+    """
+
+    def __init__(self, get_path: Callable[[str, Optional[str]], str], timestamps: bool = False):
+        """
+        :param get_path: Returns the metric name of a value (value set name and value name)
+        :param timestamps: True if the sample time of the values should be exported
+        """
+        self._get_path = get_path
+        self._timestamps = timestamps
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[object, Dict[Tuple[str, ...], Series]]] = {}
+        """
+        Series of each metric name, by the object which wrote them (the last writer last)
+        """
+        self._source_paths: Dict[object, Set[str]] = {}
+        self._path_collections: Dict[str, str] = {}
+        self._blocks: Dict[str, Dict[str, bytes]] = {}
+        """
+        Rendered exposition of each metric name, by collection
+        """
+        self._generations: Dict[str, int] = {}
+        self._responses: Dict[Tuple[Optional[str], str], Tuple[str, bytes]] = {}
+        """
+        ETag and body by collection (None for all collections) and content encoding
+        """
+        self._instance = os.urandom(4).hex()
+        """
+        Part of the ETags, so they don't match the ones of a previous process
+        """
+        self.generation = 0
+        """
+        Incremented on each write
+        """
+
+    def clear(self):
+        """
+        Removes all series
+        """
+        with self._lock:
+            self._metrics.clear()
+            self._source_paths.clear()
+            self._path_collections.clear()
+            self._blocks.clear()
+            self._generations.clear()
+            self._responses.clear()
+            self.generation += 1
+
+    def write(self, data: List[ValueSet], source_ref: object = None):
+        """
+        Replaces the series written by the given source
+        :param data: Value sets
+        :param source_ref: Reference object which collected the data.
+        Series which have been written by it before but are not part of the data are removed
+        """
+        with self._lock:
+            tables: Dict[str, Dict[Tuple[str, ...], Series]] = {}
+            for value_set in data:
+                collection = (value_set.name or '').split('.', 1)[0]
+                for name, label_values, value, timestamp in value_set.iter_values():
+                    path = self._get_path(value_set.name, name)
+                    table = tables.get(path)
+                    if table is None:
+                        table = {}
+                        tables[path] = table
+                        self._path_collections.setdefault(path, collection)
+                    if len(value_set.labels) == 0:
+                        key = ()
+                    elif isinstance(label_values, tuple):
+                        key = label_values
+                    else:
+                        key = tuple(label_values)
+                    previous = self._metrics.get(path, {}).get(source_ref, {}).get(key)
+                    if previous is None:
+                        prefix = self._render_prefix(path, value_set.labels, key)
+                    else:
+                        prefix = previous[0]
+                    table[key] = (prefix, value, timestamp)
+
+            old_paths = self._source_paths.pop(source_ref, set())
+            for path, table in tables.items():
+                sources = self._metrics.setdefault(path, {})
+                # Moved to the end, so its series replace the ones of other sources with the same labels
+                sources.pop(source_ref, None)
+                sources[source_ref] = table
+            for path in old_paths:
+                if path in tables:
+                    continue
+                sources = self._metrics[path]
+                del sources[source_ref]
+                if len(sources) == 0:
+                    del self._metrics[path]
+            if len(tables) > 0:
+                self._source_paths[source_ref] = set(tables.keys())
+
+            collections = set()
+            for path in tables.keys():
+                collections.add(self._render(path))
+            for path in old_paths.difference(tables.keys()):
+                collections.add(self._render(path))
+            self._invalidate(collections)
+
+    def get(self, collection: Optional[str] = None, encoding: str = IDENTITY) -> Optional[Tuple[str, bytes]]:
+        """
+        Returns the rendered exposition
+        :param collection: Name of the collection, None for all collections
+        :param encoding: Content encoding of the body (one of ENCODINGS or IDENTITY)
+        :return: ETag and body, None if the collection doesn't exist
+        """
+        with self._lock:
+            response = self._responses.get((collection, encoding))
+            if response is not None:
+                return response
+
+            if collection is None:
+                generation = self.generation
+            elif collection in self._blocks:
+                generation = self._generations[collection]
+            else:
+                return None
+
+            identity = self._responses.get((collection, IDENTITY))
+            if identity is not None:
+                body = identity[1]
+            elif collection is None:
+                body = b''.join(block for blocks in self._blocks.values() for block in blocks.values())
+            else:
+                body = b''.join(self._blocks[collection].values())
+            response = (f'"{self._instance}-{generation}-{encoding}"', encode(body, encoding))
+            self._responses[(collection, encoding)] = response
+            return response
+
+    def get_body(self, compressed: bool = False) -> bytes:
+        """
+        Returns the rendered exposition of all collections
+        :param compressed: True to return the gzip compressed exposition
+        :return: Exposition
+        """
+        return self.get(encoding='gzip' if compressed else IDENTITY)[1]
+
+    def _invalidate(self, collections: Set[str]):
+        self.generation += 1
+        for collection in collections:
+            if collection in self._blocks:
+                self._generations[collection] = self.generation
+        for key in list(self._responses.keys()):
+            if key[0] is None or key[0] in collections:
+                del self._responses[key]
+
+    def _render(self, path: str) -> str:
+        """
+        Renders all series of the given metric
+        :param path: Metric name
+        :return: Collection of the metric
+        """
+        collection = self._path_collections[path]
+        sources = self._metrics.get(path)
+        if sources is None:
+            del self._path_collections[path]
+            blocks = self._blocks.get(collection, {})
+            blocks.pop(path, None)
+            if len(blocks) == 0:
+                self._blocks.pop(collection, None)
+                self._generations.pop(collection, None)
+            return collection
+
+        if len(sources) == 1:
+            series = next(iter(sources.values()))
+        else:
+            # A series written by multiple sources is exported once, with the value of the last write
+            series = {}
+            for table in sources.values():
+                series.update(table)
+        lines = [f'# HELP {path} {path}\n# TYPE {path} gauge\n']
+        for prefix, value, timestamp in series.values():
+            if self._timestamps and timestamp > 0:
+                lines.append(f'{prefix}{format_value(value)} {timestamp}\n')
+            else:
+                lines.append(f'{prefix}{format_value(value)}\n')
+        self._blocks.setdefault(collection, {})[path] = ''.join(lines).encode('utf-8')
+        return collection
+
+    @staticmethod
+    def _render_prefix(path: str, label_names: List[str], label_values: Tuple[str, ...]) -> str:
+        if len(label_names) == 0:
+            return path + ' '
+        if len(label_values) != len(label_names):
+            raise ValueError('Incorrect label count for ' + str(label_values) + ': Got ' +
+                             str(len(label_names)) + ' labels and ' +
+                             str(len(label_values)) + ' label names')
+        labels = ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(label_names, label_values))
+        return f'{path}{{{labels}}} '
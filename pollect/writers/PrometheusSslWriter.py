@@ -24,6 +24,12 @@ class PrometheusSslWriter(PrometheusWriter):
 
     def start(self):
         def serve(env, start_response):
+            self.run_scrape_hooks()
+            if self._exposition is not None:
+                status, headers, body = self.get_prerendered(env)
+                start_response(status, headers)
+                return [body]
+
             params = parse_qs(env['QUERY_STRING'])
             accept_header = env['HTTP_ACCEPT']
 
@@ -37,6 +43,7 @@ class PrometheusSslWriter(PrometheusWriter):
             start_response('200 OK', headers)
             return [output]
 
+        self._stopped = False
         logger = logging.getLogger('prom')
         logger.setLevel(logging.ERROR)
 
@@ -50,4 +57,9 @@ class PrometheusSslWriter(PrometheusWriter):
         launcher.start()
 
     def stop(self):
+        self._stopped = True
+        self.clear()
+        if self._server is None:
+            return
         self._server.stop()
+        self._server = None
@@ -1,16 +1,31 @@
 from __future__ import annotations
 import threading
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Tuple
 from wsgiref.simple_server import WSGIServer
 
 from prometheus_client import Gauge, registry, exposition, REGISTRY
 
-from pollect.core.ValueSet import ValueSet, Value
+from pollect.core.ValueSet import ValueSet
 from pollect.libs import Utils
 from pollect.sources.Source import Source
+from pollect.writers.Exposition import Exposition, CONTENT_TYPE, IDENTITY, choose_encoding
 from pollect.writers.Writer import Writer
 
 
+class TimestampedGauge(Gauge):
+    """
+    Gauge which exports the time at which its value has been sampled
+    """
+
+    timestamp: Optional[float] = None
+    """
+    Timestamp in seconds since the epoch, None to let prometheus use the scrape time
+    """
+
+    def _child_samples(self):
+        return [sample._replace(timestamp=self.timestamp) for sample in super()._child_samples()]
+
+
 class PromMetric:
     """
     Represents a single metric
@@ -21,49 +36,75 @@ class PromMetric:
     Prometheus metric
     """
 
-    updated: Dict[str, bool]
+    series: Dict[Tuple[str, ...], list]
+    """
+    Label values of each series mapped to its prometheus child metric and the generation (write)
+    in which it has been updated last
+    """
+
+    generation: int = 0
     """
-    Indicates if the metric with the given label values has been updated in the current run
+    Number of the current write
     """
 
     def __init__(self, metric: Gauge):
         self.metric = metric
-        self.updated = {}
+        self.series = {}
+        self.generation = 0
+        self._updated = 0
+        self._timestamps = isinstance(metric, TimestampedGauge)
 
     def reset_state(self):
-        for key in self.updated.keys():
-            self.updated[key] = False
-
-    def update(self, value_set: ValueSet, value_obj: Value):
-        if len(value_set.labels) > 0:
-            if len(value_obj.label_values) != len(value_set.labels):
-                raise ValueError('Incorrect label count for ' + str(value_obj) + ': Got ' +
-                                 str(len(value_set.labels)) + ' labels and ' +
-                                 str(len(value_obj.label_values)) + ' label names')
-
-            self.metric.labels(*value_obj.label_values).set(value_obj.value)
-            label_key = '\t'.join(value_obj.label_values)
-            self.updated[label_key] = True
-            return
-
-        self.metric.set(value_obj.value)
-        self.updated[''] = True
+        self.generation += 1
+        self._updated = 0
+
+    def update(self, value_set: ValueSet, label_values: Sequence[str], value: float, timestamp: int):
+        if len(value_set.labels) == 0:
+            label_values = ()
+        elif not isinstance(label_values, tuple):
+            label_values = tuple(label_values)
+
+        series = self.series.get(label_values)
+        if series is None:
+            series = [self._create_child(value_set, label_values), -1]
+            self.series[label_values] = series
+        if series[1] != self.generation:
+            series[1] = self.generation
+            self._updated += 1
+
+        child = series[0]
+        if self._timestamps:
+            child.timestamp = timestamp / 1000 if timestamp > 0 else None
+        child.set(value)
+
+    def _create_child(self, value_set: ValueSet, label_values: Tuple[str, ...]) -> Gauge:
+        if len(label_values) == 0:
+            return self.metric
+        if len(label_values) != len(value_set.labels):
+            raise ValueError('Incorrect label count for ' + str(label_values) + ': Got ' +
+                             str(len(value_set.labels)) + ' labels and ' +
+                             str(len(label_values)) + ' label names')
+        return self.metric.labels(*label_values)
 
     def remove_not_updated(self, cache: MetricsCache):
-        for key in list(self.updated.keys()):
-            if self.updated[key] is True:
+        if self._updated == len(self.series):
+            # All series have been updated
+            return
+
+        for key, (_, generation) in list(self.series.items()):
+            if generation == self.generation:
                 continue
-            del self.updated[key]
+            del self.series[key]
 
-            if key == '':
+            if len(key) == 0:
                 # In case we don't have any labels
                 # we can just unregister the metric, since no other
                 # source is using it
                 # (Since > 1 sources using the same metric name will cause issues anyways)
                 cache.unregister(self)
                 continue
-            labels = key.split('\t')
-            self.metric.remove(*labels)
+            self.metric.remove(*key)
+        self._updated = len(self.series)
 
 
 class MetricsCache:
@@ -79,9 +120,13 @@ class MetricsCache:
 
     _prom_counter: Dict[str, Gauge]
 
-    def __init__(self):
+    def __init__(self, timestamps: bool = False):
+        """
+        :param timestamps: True if the sample time of the values should be exported
+        """
         self._source_metrics = {}
         self._prom_counter = {}
+        self._gauge_type = TimestampedGauge if timestamps else Gauge
 
     def get_or_create(self, path: str, label_names: List[str]) -> Gauge:
         """
@@ -92,7 +137,7 @@ class MetricsCache:
         """
         gauge = self._prom_counter.get(path)
         if gauge is None:
-            gauge = Gauge(path, path, labelnames=label_names)
+            gauge = self._gauge_type(path, path, labelnames=label_names)
             self._prom_counter[path] = gauge
             return gauge
         return gauge
@@ -130,15 +175,28 @@ class PrometheusWriter(Writer):
     _port: int
     _httpd: Optional[WSGIServer]
     _cache: MetricsCache
+    _exposition: Optional[Exposition] = None
+    """
+    Pre-rendered exposition, used instead of the prometheus client registry if enabled
+    """
 
     def __init__(self, config):
         super().__init__(config)
         self._port = self.config.get('port', 8080)
-        self._cache = MetricsCache()
+        self._httpd = None
+        self._stopped = False
+        self._cache = MetricsCache(self.config.get('timestamps', False))
+        self._paths: Dict[Tuple[str, Optional[str]], str] = {}
+        self._exposition = None
+        if self.config.get('prerender', False):
+            self._exposition = Exposition(self._get_path, self.config.get('timestamps', False))
 
     def supports_partial_write(self) -> bool:
         return True
 
+    def supports_scrape_hooks(self) -> bool:
+        return True
+
     def start(self):
         """
         Starts the prometheus exporter.
@@ -147,21 +205,40 @@ class PrometheusWriter(Writer):
         """Starts a WSGI server for prometheus metrics as a daemon thread."""
         addr: str = '0.0.0.0'
         port = self._port
+        self._stopped = False
 
         class TmpServer(exposition.ThreadingWSGIServer):
             """Copy of ThreadingWSGIServer to update address_family locally"""
 
         TmpServer.address_family, addr = exposition._get_best_family(addr, port)
-        app = exposition.make_wsgi_app(REGISTRY)
+        metrics_app = exposition.make_wsgi_app(REGISTRY)
+
+        def app(environ, start_response):
+            # Sources which are probed on scrape need to be probed before the data is read
+            self.run_scrape_hooks()
+            if self._exposition is not None:
+                status, headers, body = self.get_prerendered(environ)
+                start_response(status, headers)
+                return [body]
+            return metrics_app(environ, start_response)
+
         self._httpd = exposition.make_server(addr, port, app, TmpServer, handler_class=exposition._SilentHandler)
         t = threading.Thread(target=self._httpd.serve_forever)
         t.daemon = True
         t.start()
 
     def stop(self):
+        """
+        Stops the exporter and unregisters all metrics, so a writer which replaces this one
+        (e.g. after a reload) can register them again. Data written afterwards is ignored until it is started again
+        """
+        self._stopped = True
+        self.clear()
         if self._httpd is None:
             return
         self._httpd.shutdown()
+        # Releases the port
+        self._httpd.server_close()
         self._httpd = None
 
     def clear(self):
@@ -169,8 +246,63 @@ class PrometheusWriter(Writer):
         Removes all metrics
         """
         self._cache.clear()
+        if self._exposition is not None:
+            self._exposition.clear()
+
+    def get_prerendered(self, environ: Dict[str, str]) -> Tuple[str, List[Tuple[str, str]], bytes]:
+        """
+        Returns the response of a scrape using the pre-rendered exposition.
+        A scrape of /metrics/<collection> only returns the metrics of the given collection.
+        If the ETag of the client (If-None-Match) is still current, no body is returned
+        :param environ: WSGI environment of the request
+        :return: Status, response headers and body
+        """
+        collection = None
+        path = environ.get('PATH_INFO', '').strip('/')
+        if path.startswith('metrics/'):
+            collection = path[len('metrics/'):]
+
+        encoding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        response = self._exposition.get(collection, encoding)
+        if response is None:
+            return '404 Not Found', [('Content-Type', 'text/plain')], b'Unknown collection'
+
+        etag, body = response
+        headers = [('ETag', etag), ('Vary', 'Accept-Encoding')]
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            etags = [tag.strip() for tag in if_none_match.split(',')]
+            if '*' in etags or etag in etags or 'W/' + etag in etags:
+                return '304 Not Modified', headers, b''
+
+        headers.append(('Content-Type', CONTENT_TYPE))
+        if encoding != IDENTITY:
+            headers.append(('Content-Encoding', encoding))
+        return '200 OK', headers, body
+
+    def _get_path(self, set_name: str, value_name: Optional[str]) -> str:
+        """
+        Returns the prometheus name of the given value
+        :param set_name: Name of the value set
+        :param value_name: Name of the value
+        :return: Metric name
+        """
+        path = self._paths.get((set_name, value_name))
+        if path is None:
+            path = set_name
+            if value_name is not None:
+                path += '.' + value_name
+            path = path.replace('-', '_').replace('.', '_').replace('!', '')
+            self._paths[(set_name, value_name)] = path
+        return path
 
     def write(self, data: List[ValueSet], source_ref: Optional[Source] = None):
+        if self._stopped:
+            return
+        if self._exposition is not None:
+            self._exposition.write(data, source_ref)
+            return
+
         # Get the previous metrics for the given source
         existing_metrics = self._cache.get_metrics(source_ref)
 
@@ -178,20 +310,16 @@ class PrometheusWriter(Writer):
             value.reset_state()
 
         for value_set in data:
-            for value_obj in value_set.values:
-                path = value_set.name
-                if value_obj.name is not None:
-                    path += '.' + value_obj.name
-
-                path = path.replace('-', '_').replace('.', '_').replace('!', '')
-
-                if path not in existing_metrics:
+            for name, label_values, value, timestamp in value_set.iter_values():
+                path = self._get_path(value_set.name, name)
+                prom_metric = existing_metrics.get(path)
+                if prom_metric is None:
                     # New metric for the current source
                     gauge = self._cache.get_or_create(path, label_names=value_set.labels)
-                    existing_metrics[path] = PromMetric(gauge)
+                    prom_metric = PromMetric(gauge)
+                    existing_metrics[path] = prom_metric
 
-                prom_metric = existing_metrics[path]
-                prom_metric.update(value_set, value_obj)
+                prom_metric.update(value_set, label_values, value, timestamp)
 
         for value in list(existing_metrics.values()):
             value.remove_not_updated(self._cache)
@@ -1,5 +1,7 @@
+import threading
+import traceback
 from abc import abstractmethod
-from typing import List, Optional
+from typing import List, Optional, Callable
 
 from pollect.core.Log import Log
 from pollect.core.ValueSet import ValueSet
@@ -14,6 +16,7 @@ class Writer(Log):
     def __init__(self, config):
         super().__init__()
         self.config = config
+        self._scrape_hooks: List[Callable[[], None]] = []
 
     def supports_partial_write(self) -> bool:
         """
@@ -23,6 +26,47 @@ class Writer(Log):
         """
         return False
 
+    def supports_scrape_hooks(self) -> bool:
+        """
+        Indicates if the data is pulled from this writer (e.g. scraped by prometheus).
+        If true, executors can probe their sources on demand using a scrape hook
+        :return: Scrape hook support
+        """
+        return False
+
+    def add_scrape_hook(self, hook: Callable[[], None]):
+        """
+        Adds a function which is called each time before the data is read
+        :param hook: Hook
+        """
+        self._scrape_hooks.append(hook)
+
+    def remove_scrape_hook(self, hook: Callable[[], None]):
+        if hook in self._scrape_hooks:
+            self._scrape_hooks.remove(hook)
+
+    def run_scrape_hooks(self):
+        """
+        Calls all scrape hooks concurrently and waits until they are done.
+        Must be called before the data is read
+        """
+        hooks = list(self._scrape_hooks)
+        if len(hooks) == 1:
+            self._run_scrape_hook(hooks[0])
+            return
+        threads = [threading.Thread(target=self._run_scrape_hook, args=[hook]) for hook in hooks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _run_scrape_hook(self, hook: Callable[[], None]):
+        try:
+            hook()
+        except Exception as e:
+            traceback.print_exc()
+            self.log.error(f'Error while probing on scrape: {e}')
+
     @abstractmethod
     def start(self):
         """
@@ -97,5 +141,8 @@ class InMemoryWriter(Writer):
 
 class ParallelInMemoryWriter(InMemoryWriter):
 
+    def supports_scrape_hooks(self) -> bool:
+        return True
+
     def supports_partial_write(self) -> bool:
         return True
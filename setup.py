@@ -31,9 +31,8 @@ setuptools.setup(
     long_description_content_type='text/markdown',
     url='https://github.com/davidgiga1993/pollect',
     packages=setuptools.find_packages(),
-    python_requires='>3.6',
+    python_requires='>=3.8',
     install_requires=[
-        'schedule',
         'prometheus-client',
         'PyYAML'
     ],
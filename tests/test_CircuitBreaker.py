@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from pollect.core.CircuitBreaker import CircuitBreaker
+
+
+class TestCircuitBreaker(TestCase):
+
+    def test_disabled(self):
+        self.assertIsNone(CircuitBreaker.create(None))
+        self.assertIsNone(CircuitBreaker.create(False))
+        self.assertEqual(3, CircuitBreaker.create(True).failure_threshold)
+
+    def test_backoff(self):
+        breaker = CircuitBreaker({'failureThreshold': 2, 'backoff': 10, 'maxBackoff': 25})
+        self.assertTrue(breaker.allow(0))
+        breaker.record_failure(0)
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+        breaker.record_failure(1)
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+        self.assertFalse(breaker.allow(10))
+
+        # Half-open: a single probe is allowed
+        self.assertTrue(breaker.allow(11))
+        self.assertEqual(CircuitBreaker.HALF_OPEN, breaker.state)
+        self.assertFalse(breaker.allow(11))
+
+        # Still failing, the back-off is doubled
+        breaker.record_failure(11)
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+        self.assertEqual(20, breaker.get_remaining(11))
+        self.assertTrue(breaker.allow(31))
+        breaker.record_failure(31)
+        # Limited by maxBackoff
+        self.assertEqual(25, breaker.get_remaining(31))
+
+        self.assertTrue(breaker.allow(56))
+        breaker.record_success()
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+        self.assertEqual(0, breaker.failures)
+        self.assertTrue(breaker.allow(56))
@@ -1,13 +1,23 @@
 import os
+import socket
 import threading
-from time import sleep
+from time import sleep, monotonic
 from unittest import TestCase
 
 import requests
+from prometheus_client import REGISTRY
 
+from pollect.core.AsyncExecutionScheduler import AsyncExecutionScheduler
+from pollect.core import Helper
+from pollect.core.CircuitBreaker import CircuitBreaker
 from pollect.core.Core import Configuration
+from pollect.core.Shard import Shard
+from pollect.core.SharedSource import SharedProbe, SharedSource
+from pollect.core.config.ConfigContainer import ConfigContainer
 from pollect.core.ExecutionScheduler import ExecutionScheduler
 from pollect.core.Factories import SourceFactory, WriterFactory
+from pollect.sources.Source import DummySource
+from pollect.core.ValueSet import ValueSet, Value
 from pollect.writers.Writer import InMemoryWriter, ParallelInMemoryWriter
 
 
@@ -166,6 +176,57 @@ class TestCore(TestCase):
 
         self._run_and_stop(scheduler, 1, run)
 
+    def test_sample_time(self):
+        raw_config = {
+            "tickTime": 30,
+            "threads": 2,
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    "collection": "pollect",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                        },
+                        {
+                            "type": "Dummy",
+                            "value": 2,
+                            "sleep": 0.5,
+                        }
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executor = config.create_executors()[0]
+        executor.execute()
+        fast, slow = config.writer.data[0]
+        # Each source is stamped once its own probe has completed
+        self.assertGreaterEqual(slow.time - fast.time, 400)
+        self.assertEqual(fast.time, fast.get_time(fast.values[0]))
+        fast.values[0].time = 1000
+        self.assertEqual(1000, fast.get_time(fast.values[0]))
+        executor.shutdown()
+
+    def test_persistent_sample_time(self):
+        class PersistentSource(DummySource):
+            def __init__(self, config):
+                super().__init__(config)
+                self.value_set = ValueSet()
+                self.value_set.add(Value(1))
+
+            def _probe(self):
+                # The same value set is returned on every probe (e.g. HttpIngress)
+                return self.value_set
+
+        source = PersistentSource(ConfigContainer({'type': 'Dummy', 'value': 1}))
+        first = source.probe()[0].time
+        sleep(0.05)
+        self.assertGreaterEqual(source.probe()[0].time - first, 40)
+
     def test_parallel_executor(self):
         raw_config = {
             "tickTime": 1,
@@ -218,6 +279,693 @@ class TestCore(TestCase):
 
         self._run_and_stop(scheduler, 1, run)
 
+    def test_asyncio_engine(self):
+        raw_config = {
+            "tickTime": 1,
+            "threads": 1,
+            "engine": "asyncio",
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    "collection": "a",
+                    "sources": [
+                        {
+                            "type": "AsyncDummy",
+                            "value": 1,
+                            "sleep": 0.5,
+                        },
+                        {
+                            "type": "AsyncDummy",
+                            "value": 2,
+                            "sleep": 0.5,
+                        },
+                        {
+                            "type": "Dummy",
+                            "value": 3,
+                        }
+                    ]
+                },
+                {
+                    "collection": "b",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 4,
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executors = config.create_executors()
+        # All executors share the same pool for the sync sources
+        self.assertEqual(1, config.worker_pool.max_workers)
+        scheduler = AsyncExecutionScheduler(config, executors)
+
+        def run():
+            data = config.writer.data
+            self.assertEqual(config.writer.write_calls, 2)
+            names = {value_sets[0].name: [value_set.values[0].value for value_set in value_sets]
+                     for value_sets in data}
+            self.assertEqual([4], names['b.Dummy'])
+            # Both async sources have been awaited concurrently
+            self.assertEqual([1, 2, 3], names['a.AsyncDummy'])
+
+        self._run_and_stop(scheduler, 0.8, run)
+
+    def test_timeout(self):
+        raw_config = {
+            "tickTime": 30,
+            "selfMetrics": True,
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    "collection": "a",
+                    "timeout": 0.5,
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                            "sleep": 2,
+                        },
+                        {
+                            "type": "Dummy",
+                            "name": "fast",
+                            "value": 2,
+                        }
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executors = config.create_executors()
+        scheduler = ExecutionScheduler(config, executors)
+
+        def run():
+            # The tick finished with the result of the fast source only
+            data = config.writer.data
+            self.assertEqual(config.writer.write_calls, 2)
+            self.assertEqual(['a.Dummy.fast'], [value_set.name for value_set in data[0]])
+            self.assertEqual(2, data[0][0].values[0].value)
+            metrics = {value_set.name: value_set for value_set in data[1]}
+            self.assertEqual(1, metrics['pollect.probe_timeouts_total'].values[0].value)
+
+        self._run_and_stop(scheduler, 1, run)
+
+    def test_timeout_circuit(self):
+        raw_config = {
+            "tickTime": 30,
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    "collection": "a",
+                    "circuitBreaker": {
+                        "failureThreshold": 1,
+                    },
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                            "sleep": 0.5,
+                            "probeTimeout": 0.1,
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executor = config.create_executors()[0]
+        source = executor._sources[0]
+        executor.execute()
+        breaker = executor._breakers[source]
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+
+        # The abandoned probe completes successfully later on, which must not close the circuit again
+        sleep(0.8)
+        self.assertNotIn(source, executor._running)
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+        self.assertEqual(1, breaker.failures)
+        executor.shutdown()
+
+    def test_no_stale_data(self):
+        raw_config = {
+            "tickTime": 30,
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    "collection": "a",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                            "tickTime": 1,
+                            "probeTimeout": 0.2,
+                        },
+                        {
+                            "type": "Dummy",
+                            "name": "fast",
+                            "value": 2,
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executor = config.create_executors()[0]
+        source = executor._sources[0]
+        executor.execute()
+        self.assertEqual(['a.Dummy', 'a.Dummy.fast'], [value_set.name for value_set in config.writer.data[-1]])
+
+        # The last result is neither written after a timeout nor while the abandoned probe is still running
+        source.sleep = 0.6
+        executor.execute()
+        self.assertEqual(['a.Dummy.fast'], [value_set.name for value_set in config.writer.data[-1]])
+        executor.execute()
+        self.assertEqual(['a.Dummy.fast'], [value_set.name for value_set in config.writer.data[-1]])
+        sleep(0.6)
+        executor.shutdown()
+
+    def test_sub_second_tick(self):
+        raw_config = {
+            "tickTime": 0.25,
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    "collection": "pollect",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executors = config.create_executors()
+        scheduler = ExecutionScheduler(config, executors)
+
+        def run():
+            # Executed at 0, 0.25, 0.5, 0.75 and 1
+            self.assertEqual(5, config.writer.write_calls)
+
+        self._run_and_stop(scheduler, 1.1, run)
+
+    def test_source_tick_time(self):
+        raw_config = {
+            "tickTime": 0.25,
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    "collection": "pollect",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "name": "fast",
+                            "value": 1,
+                        },
+                        {
+                            "type": "Dummy",
+                            "name": "slow",
+                            "tickTime": 1,
+                            "value": 2,
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executors = config.create_executors()
+        scheduler = ExecutionScheduler(config, executors)
+
+        def run():
+            data = config.writer.data
+            self.assertEqual(5, config.writer.write_calls)
+            for value_sets in data:
+                self.assertEqual(['pollect.Dummy.fast', 'pollect.Dummy.slow'],
+                                 [value_set.name for value_set in value_sets])
+            # The slow source has only been probed at 0 and 1, the last result is kept in between
+            for i in range(1, 4):
+                self.assertIs(data[0][1], data[i][1])
+            self.assertIsNot(data[0][1], data[4][1])
+
+        self._run_and_stop(scheduler, 1.1, run)
+
+    def test_overrun_skip(self):
+        raw_config = {
+            "tickTime": 0.2,
+            "overrun": "skip",
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    "collection": "a",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                            "sleep": 0.5,
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executors = config.create_executors()
+        scheduler = ExecutionScheduler(config, executors)
+
+        def run():
+            # Executed at 0 and 0.6, the ticks at 0.2, 0.4, 0.8 and 1 are skipped
+            self.assertEqual(1, config.writer.write_calls)
+            metrics = {value_set.name: value_set for value_set in executors[0].self_metrics.get_value_sets()}
+            self.assertEqual(4, metrics['pollect.skipped_ticks_total'].values[0].value)
+            self.assertEqual(0, metrics['pollect.queue_depth'].values[0].value)
+
+        self._run_and_stop(scheduler, 1.05, run)
+
+    def test_process_executor(self):
+        raw_config = {
+            "tickTime": 30,
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    "collection": "a",
+                    "process": True,
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                            "labels": {
+                                "host": "x"
+                            }
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executor, = config.create_executors()
+        try:
+            executor.execute()
+        finally:
+            executor.shutdown()
+        value_set, = config.writer.data[0]
+        self.assertEqual('a.Dummy', value_set.name)
+        self.assertEqual(['host'], value_set.labels)
+        self.assertEqual(1, value_set.values[0].value)
+        self.assertEqual(['x'], value_set.values[0].label_values)
+        # Stamped in the worker process
+        self.assertGreater(value_set.time, 0)
+
+    def test_reload(self):
+        raw_config = {
+            "tickTime": 0.2,
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    "collection": "a",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                        },
+                        {
+                            "type": "Dummy",
+                            "name": "changed",
+                            "value": 2,
+                        },
+                    ]
+                },
+                {
+                    "collection": "b",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 3,
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executors = config.create_executors()
+        scheduler = ExecutionScheduler(config, executors)
+        a_sources = list(executors[0]._sources)
+
+        def run():
+            raw_config['executors'] = [
+                {
+                    "collection": "a",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                        },
+                        {
+                            "type": "Dummy",
+                            "name": "changed",
+                            "value": 4,
+                        },
+                    ]
+                },
+                {
+                    "collection": "c",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 5,
+                        },
+                    ]
+                }
+            ]
+            scheduler.reload(raw_config)
+            sleep(0.5)
+            a, c = scheduler.executors
+            self.assertEqual(['a', 'c'], [a.collection_name, c.collection_name])
+            # The unchanged source and the writer are kept
+            self.assertIs(a_sources[0], a._sources[0])
+            self.assertIsNot(a_sources[1], a._sources[1])
+            self.assertIs(config.writer, scheduler.config.writer)
+            written = [{value_set.name: value_set.values[0].value for value_set in data}
+                       for data in config.writer.data]
+            self.assertEqual({'a.Dummy': 1, 'a.Dummy.changed': 4}, written[-1] if 'a.Dummy' in written[-1]
+                             else written[-2])
+            self.assertIn({'c.Dummy': 5}, written)
+
+        self._run_and_stop(scheduler, 0.3, run)
+
+    def test_reload_prometheus(self):
+        raw_config = {
+            "tickTime": 0.2,
+            "writer": {
+                "type": "Prometheus",
+                "port": 18765,
+            },
+            "executors": [
+                {
+                    "collection": "c",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executors = config.create_executors()
+        scheduler = ExecutionScheduler(config, executors)
+        old_writer = config.writer
+
+        def run():
+            self.assertEqual(1, REGISTRY.get_sample_value('c_Dummy'))
+            # The new writer uses the same port
+            raw_config['writer'] = {
+                "type": "Prometheus",
+                "port": 18765,
+                "timestamps": True,
+            }
+            raw_config['executors'] = [
+                {
+                    "collection": "c",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 2,
+                        },
+                    ]
+                }
+            ]
+            scheduler.reload(raw_config)
+            sleep(0.6)
+            # The metrics of the replaced writer have been unregistered, the new writer exports the new value
+            self.assertIsNot(old_writer, scheduler.config.writer)
+            self.assertEqual({}, old_writer._cache._prom_counter)
+            self.assertIsNone(old_writer._httpd)
+            self.assertIsNotNone(scheduler.config.writer._httpd)
+            self.assertEqual(2, REGISTRY.get_sample_value('c_Dummy'))
+
+        try:
+            self._run_and_stop(scheduler, 0.5, run)
+        finally:
+            old_writer.stop()
+            scheduler.config.writer.stop()
+
+    def test_failed_reload(self):
+        def create_config(port: int, source_type: str):
+            return {
+                "writer": {
+                    "type": "Prometheus",
+                    "port": port,
+                },
+                "executors": [
+                    {
+                        "collection": "failed",
+                        "sources": [
+                            {
+                                "type": source_type,
+                                "value": 1,
+                            },
+                        ]
+                    }
+                ]
+            }
+
+        config = Configuration(create_config(18767, 'Dummy'))
+        executors = config.create_executors()
+        writer = config.writer
+        try:
+            # The writer of a configuration which fails is never started
+            with self.assertRaises(AttributeError):
+                config.reload(create_config(18768, 'Unknown'), executors)
+            with socket.socket() as sock:
+                sock.bind(('0.0.0.0', 18768))
+
+            # If the new writer can't be started, the replaced one is started again
+            with socket.socket() as sock:
+                sock.bind(('0.0.0.0', 18769))
+                with self.assertRaises(OSError):
+                    config.reload(create_config(18769, 'Dummy'), executors)
+            self.assertIsNotNone(writer._httpd)
+            executors[0].execute()
+            self.assertEqual(1, REGISTRY.get_sample_value('failed_Dummy'))
+        finally:
+            writer.stop()
+
+    def test_probe_on_scrape(self):
+        raw_config = {
+            "tickTime": 30,
+            "writer": {
+                "type": "ParallelInMemory"
+            },
+            "executors": [
+                {
+                    "collection": "a",
+                    "probeOn": "scrape",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                            "sleep": 0.3,
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executors = config.create_executors()
+        scheduler = ExecutionScheduler(config, executors)
+        scheduler.create()
+        # Not executed by the scheduler
+        self.assertEqual(0, len(scheduler._intervals))
+
+        # Concurrent scrapes only probe the sources once
+        scrapes = [threading.Thread(target=config.writer.run_scrape_hooks) for _ in range(3)]
+        for scrape in scrapes:
+            scrape.start()
+        for scrape in scrapes:
+            scrape.join()
+        self.assertEqual(1, config.writer.write_calls)
+
+        # The data is younger than the tick time
+        config.writer.run_scrape_hooks()
+        self.assertEqual(1, config.writer.write_calls)
+        executors[0].shutdown()
+        config.writer.run_scrape_hooks()
+        self.assertEqual(1, config.writer.write_calls)
+
+    def test_shared_source(self):
+        raw_config = {
+            "tickTime": 10,
+            "shareSources": True,
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    "collection": "a",
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                        },
+                    ]
+                },
+                {
+                    "collection": "b",
+                    "tickTime": 60,
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                            "probeTimeout": 5,
+                        },
+                        {
+                            "type": "Dummy",
+                            "value": 2,
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        a, b = config.create_executors()
+        self.assertIs(a._sources[0].shared, b._sources[0].shared)
+        self.assertEqual(10, a._sources[0].shared.interval)
+        self.assertFalse(hasattr(b._sources[1], 'shared'))
+
+        a.execute()
+        b.execute()
+        a_data, b_data = config.writer.data
+        # The source has only been probed once, but each collection has its own value sets
+        self.assertIs(a_data[0].values[0], b_data[0].values[0])
+        self.assertEqual('a.Dummy', a_data[0].name)
+        self.assertEqual('b.Dummy', b_data[0].name)
+        a.shutdown()
+        b.shutdown()
+
+    def test_shared_source_shard(self):
+        shards = []
+
+        class ShardedSource(DummySource):
+            def _probe(self):
+                shards.append(self.shard)
+                return super()._probe()
+
+        shard = Shard.create({'index': 0, 'count': 2})
+        shared = SharedProbe(ShardedSource(ConfigContainer({'type': 'Dummy', 'value': 1})))
+        shared.add_user(10)
+        sharded = SharedSource(ConfigContainer({'type': 'Dummy', 'value': 1}), shared)
+        sharded.shard = shard
+        unsharded = SharedSource(ConfigContainer({'type': 'Dummy', 'value': 1}), shared)
+        for source in (sharded, unsharded, sharded):
+            self.assertEqual(1, source.probe()[0].values[0].value)
+
+        # Each shard setting has its own (cached) result
+        self.assertEqual([shard, None], shards)
+
+    def test_phase_spread(self):
+        raw_config = {
+            "tickTime": 10,
+            "phaseSpread": True,
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    "collection": "a",
+                    "sourcePhaseSpread": True,
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                        },
+                    ]
+                },
+                {
+                    "collection": "b",
+                    "phaseSpread": False,
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 2,
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        a, b = config.create_executors()
+
+        # The phase only depends on the name, so it is the same after a restart
+        self.assertAlmostEqual(0.909053698880598, Helper.get_phase('a'))
+        self.assertNotEqual(Helper.get_phase('a'), Helper.get_phase('b'))
+        delay = a.get_start_delay()
+        self.assertTrue(0 <= delay < 10)
+        self.assertEqual(0, b.get_start_delay())
+        self.assertAlmostEqual(Helper.get_phase('a/Dummy') * 5, a._get_source_offset(a._sources[0]))
+        self.assertEqual(0, b._get_source_offset(b._sources[0]))
+
+    def test_late_source_phase(self):
+        raw_config = {
+            "tickTime": 1,
+            "writer": {
+                "type": "InMemory"
+            },
+            "executors": [
+                {
+                    # The phase of late20/Dummy is 0.9996
+                    "collection": "late20",
+                    "sourcePhaseSpread": True,
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                        },
+                    ]
+                },
+                {
+                    "collection": "late20",
+                    "sourcePhaseSpread": True,
+                    "sources": [
+                        {
+                            "type": "Dummy",
+                            "value": 1,
+                            "probeTimeout": 0.8,
+                        },
+                    ]
+                }
+            ]
+        }
+        config = Configuration(raw_config)
+        executor, timeout_executor = config.create_executors()
+        self.assertLess(executor._get_source_offset(executor._sources[0]), 0.5)
+        self.assertLessEqual(timeout_executor._get_source_offset(timeout_executor._sources[0]), 0.2)
+
+        # The execution completes within the interval
+        start = monotonic()
+        executor.execute()
+        self.assertLess(monotonic() - start, 0.9)
+        self.assertEqual(1, config.writer.write_calls)
+
     @staticmethod
     def _run_and_stop(executor: ExecutionScheduler, wait_time: int, call):
         executor.create()
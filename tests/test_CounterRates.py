@@ -0,0 +1,63 @@
+import math
+from unittest import TestCase
+from unittest.mock import patch
+
+from pollect.sources.helper import CounterRates as rates_module
+from pollect.sources.helper.CounterRates import CounterRates, CounterVector
+
+
+class TestCounterRates(TestCase):
+
+    def test_rates(self):
+        rates = CounterRates()
+        self.assertEqual({}, rates.get_rates({'a': 10, 'b': 0}, now=100))
+        # Sub second intervals
+        self.assertEqual({'a': 20, 'b': 2}, rates.get_rates({'a': 20, 'b': 1}, now=100.5))
+        # No time has passed
+        self.assertEqual({}, rates.get_rates({'a': 30}, now=100.5))
+        self.assertEqual(10, rates.get_rate('a', 40, now=101.5))
+
+    def test_wraparound(self):
+        rates = CounterRates()
+        rates.get_rates({'32': 2 ** 32 - 6, '64': 2 ** 64 - 2048}, now=0)
+        self.assertEqual({'32': 16, '64': 4096}, rates.get_rates({'32': 10, '64': 2048}, now=1))
+
+        rates = CounterRates(32)
+        rates.get_rate('a', 2 ** 32 - 1, now=0)
+        self.assertEqual(2, rates.get_rate('a', 1, now=1))
+
+    def test_reset(self):
+        rates = CounterRates()
+        rates.get_rate('a', 1000000, now=0)
+        # The counter has been reset, the rate is unknown
+        self.assertIsNone(rates.get_rate('a', 10, now=1))
+        self.assertEqual(5, rates.get_rate('a', 15, now=2))
+        # Values which aren't counters may decrease
+        self.assertEqual(-10, rates.get_rate('a', 5, now=3, wrap=False))
+
+    def test_prune(self):
+        rates = CounterRates()
+        rates.get_rates({'a': 1, 'b': 1}, now=0)
+        rates.get_rates({'b': 2}, now=1, prune=True)
+        self.assertEqual(['b'], list(rates._slots.keys()))
+        # The removed counter starts over
+        self.assertEqual({'b': 1}, rates.get_rates({'a': 5, 'b': 3}, now=2))
+        self.assertEqual({'a': 1, 'b': 1}, rates.get_rates({'a': 6, 'b': 4}, now=3))
+
+
+class TestCounterVector(TestCase):
+
+    def test_rates(self):
+        for numpy in (rates_module.numpy, None):
+            with patch.object(rates_module, 'numpy', numpy):
+                vector = CounterVector(2)
+                self.assertTrue(all(math.isnan(rate) for rate in vector.get_rates(('a', 'b'), [1, 2, 3, 4], now=0)))
+                rates = vector.get_rates(('a', 'b'), [3, 2, 2 ** 32 + 3, 2], now=2)
+                # The last counter has been reset
+                self.assertEqual([1, 0, 2 ** 31], rates[:3])
+                self.assertTrue(math.isnan(rates[3]))
+
+                # Removed and added keys
+                rates = vector.get_rates(('c', 'a'), [1, 1, 5, 4], now=3)
+                self.assertTrue(math.isnan(rates[0]) and math.isnan(rates[1]))
+                self.assertEqual([2, 2], rates[2:])
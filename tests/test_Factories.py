@@ -0,0 +1,54 @@
+import ast
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+from pollect.core.Factories import SourceFactory, WriterFactory, SOURCES, WRITERS
+
+
+class TestFactories(TestCase):
+
+    def test_lazy_import(self):
+        factory = SourceFactory(None)
+        self.assertIsNotNone(factory.create({'type': 'LoadAvg'}))
+        self.assertIn('LoadAvgSource', factory.get_names())
+
+        # Other tests may have imported any module already, so this is checked in a new interpreter
+        code = 'import sys\n' \
+               'from pollect.core.Factories import SourceFactory\n' \
+               'SourceFactory(None).create({"type": "LoadAvg"})\n' \
+               'print("pollect.sources.VSphereSource" in sys.modules)'
+        root = os.path.join(os.path.dirname(__file__), '..')
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=root)
+        self.assertEqual(b'False', output.strip())
+
+    def test_unknown_class(self):
+        factory = SourceFactory(None)
+        self.assertIsNone(factory.get_class({'type': 'Unknown'}))
+        with self.assertRaises(AttributeError):
+            factory.create({'type': 'Unknown'})
+
+    def test_writer(self):
+        factory = WriterFactory()
+        writer = factory.create({'type': 'InMemory'})
+        self.assertIs(writer, factory.create({'type': 'InMemory'}))
+
+    def test_registry(self):
+        # Every class in the sources and writers packages must be registered
+        self.assertEqual(self._get_classes('sources', 'Source'), SOURCES)
+        self.assertEqual(self._get_classes('writers', 'Writer'), WRITERS)
+
+    @staticmethod
+    def _get_classes(package: str, suffix: str):
+        base = os.path.join(os.path.dirname(__file__), '..', 'pollect', package)
+        classes = {}
+        for file in os.listdir(base):
+            if not file.endswith('.py'):
+                continue
+            with open(os.path.join(base, file), 'r') as f:
+                tree = ast.parse(f.read())
+            for node in tree.body:
+                if isinstance(node, ast.ClassDef) and node.name.endswith(suffix) and node.name != suffix:
+                    classes[node.name] = f'pollect.{package}.{file[:-3]}'
+        return classes
@@ -0,0 +1,81 @@
+import cProfile
+import os
+import pstats
+import tempfile
+from unittest import TestCase, mock
+
+from pollect.core.Core import Configuration
+from pollect.core.Profiler import Profiler
+
+
+class TestProfiler(TestCase):
+
+    def _create(self, directory: str):
+        config = Configuration({
+            'writer': {'type': 'InMemory'},
+            'profile': {'ticks': 2, 'directory': directory},
+            'executors': [
+                {
+                    'collection': 'a',
+                    'sources': [{'type': 'Dummy', 'value': 1}, {'type': 'LoadAvg'}],
+                },
+                {
+                    'collection': 'b',
+                    'sources': [{'type': 'Dummy', 'value': 2}],
+                }
+            ]
+        })
+        return config, config.create_executors()
+
+    def test_cpu(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config, (a, b) = self._create(directory)
+            # Not running yet
+            a.execute()
+            config.profiler.start(Profiler.MODE_CPU, ['a', 'b'])
+            for _ in range(2):
+                a.execute()
+            self.assertTrue(config.profiler.active)
+            self.assertEqual([], os.listdir(directory))
+            for _ in range(2):
+                b.execute()
+            self.assertFalse(config.profiler.active)
+
+            files = sorted(os.listdir(directory))
+            self.assertEqual(2, len(files))
+            self.assertTrue(files[0].endswith('-cpu.pstats'))
+            pstats.Stats(os.path.join(directory, files[0]))
+            with open(os.path.join(directory, files[1])) as f:
+                summary = f.read()
+            self.assertIn('a/Dummy', summary)
+            self.assertIn('a/LoadAvg', summary)
+            self.assertIn('b/write', summary)
+            a.shutdown()
+            b.shutdown()
+
+    def test_memory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config, (a, b) = self._create(directory)
+            config.profiler.start(Profiler.MODE_MEMORY, ['a'])
+            for _ in range(2):
+                a.execute()
+            self.assertFalse(config.profiler.active)
+            files = os.listdir(directory)
+            self.assertEqual(1, len(files))
+            with open(os.path.join(directory, files[0])) as f:
+                self.assertIn('Memory growth', f.read())
+            a.shutdown()
+            b.shutdown()
+
+    def test_overlap(self):
+        profiler = Profiler({})
+        profiler.start(Profiler.MODE_CPU, ['a'])
+        # Since python 3.12 another profile in any thread can't be enabled
+        with mock.patch.object(cProfile.Profile, 'enable', side_effect=ValueError()), \
+                self.assertLogs(profiler.log, 'WARNING') as logs:
+            self.assertEqual(1, profiler.profile('a/Dummy', lambda: 1))
+            self.assertEqual(2, profiler.profile('a/Dummy', lambda: 2))
+        # Warned once, the durations are still recorded
+        self.assertEqual(1, len(logs.output))
+        self.assertEqual(2, profiler._durations['a/Dummy'][0])
+        self.assertEqual({}, profiler._stats)
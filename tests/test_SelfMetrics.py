@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+from pollect.core.SelfMetrics import SelfMetrics
+
+
+class TestSelfMetrics(TestCase):
+
+    def test_counter(self):
+        metrics = SelfMetrics({'collection': 'a'})
+        metrics.inc('errors_total', {'source': 'x'})
+        metrics.inc('errors_total', {'source': 'x'}, 2)
+        metrics.inc('errors_total', {'source': 'y'})
+
+        value_set, = metrics.get_value_sets()
+        self.assertEqual('pollect.errors_total', value_set.name)
+        self.assertEqual(['collection', 'source'], value_set.labels)
+        self.assertEqual({('a', 'x'): 3, ('a', 'y'): 1},
+                         {tuple(value.label_values): value.value for value in value_set.values})
+
+    def test_histogram(self):
+        metrics = SelfMetrics({'collection': 'a'})
+        for value in [0.05, 0.2, 3]:
+            metrics.observe('duration_seconds', value, {'source': 'x'}, buckets=[0.1, 1])
+
+        bucket_set, sum_set, count_set = metrics.get_value_sets()
+        self.assertEqual('pollect.duration_seconds_bucket', bucket_set.name)
+        self.assertEqual(['collection', 'source', 'le'], bucket_set.labels)
+        self.assertEqual({'0.1': 1, '1': 2, '+Inf': 3},
+                         {value.label_values[-1]: value.value for value in bucket_set.values})
+        self.assertEqual('pollect.duration_seconds_sum', sum_set.name)
+        self.assertAlmostEqual(3.25, sum_set.values[0].value)
+        self.assertEqual('pollect.duration_seconds_count', count_set.name)
+        self.assertEqual(3, count_set.values[0].value)
@@ -0,0 +1,63 @@
+from unittest import TestCase
+
+from pollect.core.Core import Configuration
+from pollect.core.Shard import Shard
+
+
+class TestShard(TestCase):
+
+    def test_create(self):
+        self.assertIsNone(Shard.create(None))
+        shard = Shard.create({'index': 1, 'count': 3})
+        self.assertEqual('1', shard.member)
+        self.assertEqual(['0', '1', '2'], shard.members)
+        shard = Shard.create({'member': 'b', 'members': ['a', 'b']})
+        self.assertEqual('b', shard.member)
+        with self.assertRaises(ValueError):
+            Shard.create({'member': 'c', 'members': ['a', 'b']})
+
+    def test_distribution(self):
+        keys = [f'host-{i}' for i in range(1000)]
+        shards = [Shard(str(i), ['0', '1', '2', '3']) for i in range(4)]
+        owned = [set(shard.filter(keys)) for shard in shards]
+
+        # Each key is owned by exactly one shard, and the keys are spread evenly
+        self.assertEqual(1000, sum(len(keys) for keys in owned))
+        self.assertEqual(set(keys), set.union(*owned))
+        for keys in owned:
+            self.assertTrue(200 < len(keys) < 300)
+
+    def test_rebalance(self):
+        keys = [f'host-{i}' for i in range(1000)]
+        before = Shard('0', ['0', '1', '2', '3'])
+        after = Shard('0', ['0', '1', '2', '3', '4'])
+        moved = [key for key in keys if before.get_owner(key) != after.get_owner(key)]
+        # Only the keys of the new member move
+        self.assertTrue(all(after.get_owner(key) == '4' for key in moved))
+        self.assertTrue(len(moved) < 300)
+
+    def test_executor(self):
+        sources = [{'type': 'Dummy', 'name': f'dummy{i}', 'value': i} for i in range(20)]
+        owned = []
+        for index in range(2):
+            config = Configuration({
+                'writer': {'type': 'InMemory'},
+                'shard': {'index': index, 'count': 2},
+                'executors': [
+                    {
+                        'collection': 'sharded',
+                        'shard': True,
+                        'sources': sources,
+                    },
+                    {
+                        'collection': 'local',
+                        'sources': [{'type': 'Dummy', 'value': 1}],
+                    }
+                ]
+            })
+            sharded, local = config.create_executors()
+            owned.append({str(source) for source in sharded._sources})
+            self.assertEqual(1, len(local._sources))
+            sharded.shutdown()
+        self.assertEqual(20, len(owned[0]) + len(owned[1]))
+        self.assertEqual(set(), owned[0] & owned[1])
@@ -4,19 +4,27 @@ from unittest.mock import patch
 
 from pollect.core.config.ConfigContainer import ConfigContainer
 from pollect.sources.SnmpGetSource import SnmpGetSource, SnmpValue
+from pollect.sources.helper.CounterRates import CounterRates
 
 
 class TestSnmpGetSource(TestCase):
 
+    @staticmethod
+    def _get_delta(value: SnmpValue, old_value: float) -> float:
+        # Rate of two samples which are one second apart
+        rates = CounterRates()
+        rates.get_rate('oid', old_value, 0, value.get_bits())
+        return rates.get_rate('oid', value.value, 1, value.get_bits())
+
     def test_overflow_delta(self):
         value = SnmpValue(SnmpValue.COUNTER32, 0)
-        self.assertEqual(1, value.get_delta(4294967295))
+        self.assertEqual(1, self._get_delta(value, 4294967295))
 
         value = SnmpValue(SnmpValue.COUNTER32, 5)
-        self.assertEqual(6, value.get_delta(4294967295))
+        self.assertEqual(6, self._get_delta(value, 4294967295))
 
         value = SnmpValue(SnmpValue.COUNTER32, 5)
-        self.assertEqual(4, value.get_delta(1))
+        self.assertEqual(4, self._get_delta(value, 1))
 
     @patch('pollect.sources.SnmpGetSource.subprocess.check_output')
     def test_simple(self, mock_check_output):
@@ -220,3 +228,27 @@ iso.3.6.1.2.1.31.1.1.1.18.3 = STRING: "test name3"
         self.assertEqual(1, len(data.values))
         # 10 units / second
         self.assertAlmostEqual(16, data.values[0].value, 0)
+
+    @patch('pollect.sources.SnmpGetSource.subprocess.check_output')
+    def test_rate_gauge(self, mock_check_output):
+        std_out = 'iso.3.6.1.2.1.16.1.1.1.3.48 = Gauge32: 4294967290'
+        mock_check_output.return_value = std_out.encode('utf-8')
+
+        source = SnmpGetSource({
+            'host': '10.1.1.1',
+            'metrics': [{
+                'oid': 'iso.3.6.1.2.1.16.1.1.1.3.48',
+                'name': 'Test',
+                'mode': 'rate'
+            }],
+            'type': '-'
+        })
+
+        source.probe()
+        sleep(1)
+        std_out = 'iso.3.6.1.2.1.16.1.1.1.3.48 = Gauge32: 4294967280'
+        mock_check_output.return_value = std_out.encode('utf-8')
+        data = source.probe()[0]
+        self.assertEqual(1, len(data.values))
+        # Gauges don't wrap around, the rate is negative
+        self.assertAlmostEqual(-10, data.values[0].value, 0)
@@ -0,0 +1,86 @@
+import random
+import threading
+from unittest import TestCase
+
+from pollect.core.Aggregators import get_factory
+from pollect.core.ValueCache import ValueCache
+from pollect.core.ValueSet import Value
+
+
+class TestValueCache(TestCase):
+
+    def test_average(self):
+        cache = ValueCache()
+        cache.add(Value(1, ['a'], 'x'), average=True)
+        cache.add(Value(3, ['a'], 'x'), average=True)
+        cache.add(Value(1, ['b'], 'x'))
+        cache.add(Value(2, ['b'], 'x'))
+        values = sorted(cache.flush_values(), key=lambda value: value.label_values)
+        self.assertEqual([2, 2], [value.value for value in values])
+        self.assertEqual(['x', 'x'], [value.name for value in values])
+        self.assertEqual([], cache.flush_values())
+
+    def test_aggregations(self):
+        cache = ValueCache()
+        aggregations = ('min', 'max', 'sum', 'count', 'last', 'p50')
+        for value in (3, 1, 2):
+            cache.add(Value(value, ['a'], 'x'), aggregations=aggregations)
+        values = {value.name: value.value for value in cache.flush_values()}
+        self.assertEqual({'x_min': 1, 'x_max': 3, 'x_sum': 6, 'x_count': 3, 'x_last': 2},
+                         {name: value for name, value in values.items() if name != 'x_p50'})
+        self.assertAlmostEqual(2, values['x_p50'], delta=0.02 * 2)
+
+    def test_quantile(self):
+        values = [random.uniform(-100, 1000) for _ in range(10000)] + [0] * 100
+        for percentile in ('p1', 'p50', 'p99', 'p100'):
+            aggregator = get_factory(percentile)()
+            for value in values:
+                aggregator.add(value)
+            expected = sorted(values)[int(aggregator.quantile * (len(values) - 1))]
+            self.assertAlmostEqual(expected, aggregator.get(), delta=abs(expected) * 0.02)
+
+        with self.assertRaises(ValueError):
+            get_factory('median')
+        with self.assertRaises(ValueError):
+            get_factory('p101')
+
+    def test_concurrent(self):
+        cache = ValueCache()
+
+        def add(thread: int):
+            for i in range(1000):
+                cache.add(Value(1, [str(i % 50)], str(thread)), aggregations=('count',))
+
+        threads = [threading.Thread(target=add, args=[thread]) for thread in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        values = cache.flush_values()
+        self.assertEqual(200, len(values))
+        self.assertEqual(4000, sum(value.value for value in values))
+
+    def test_add_all(self):
+        cache = ValueCache()
+        threads = []
+
+        def add(thread: int):
+            for _ in range(2000):
+                cache.add_all([(Value(1, [str(i)], str(thread)), ('count',)) for i in range(20)])
+
+        for thread in range(2):
+            threads.append(threading.Thread(target=add, args=[thread]))
+            threads[-1].start()
+        totals = {'0': 0, '1': 0}
+        while True:
+            running = any(thread.is_alive() for thread in threads)
+            counts = {}
+            for value in cache.flush_values():
+                counts.setdefault(value.name, set()).add(value.value)
+            for name, values in counts.items():
+                # Every flush contains complete batches only
+                self.assertEqual(1, len(values))
+                totals[name] += values.pop()
+            if not running:
+                break
+        self.assertEqual({'0': 2000, '1': 2000}, totals)
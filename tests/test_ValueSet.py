@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+from pollect.core.ProcessWorker import encode, decode
+from pollect.core.ValueSet import ValueSet, ColumnarValueSet, Value
+
+
+class TestValueSet(TestCase):
+
+    def test_columnar(self):
+        value_set = ColumnarValueSet(labels=['host'])
+        value_set.time = 1000
+        value_set.add_value(1, ('a',), 'x')
+        value_set.add_value(2, ('b',), 'x', 500)
+        value_set.add(Value(True, ['a'], 'y'))
+        self.assertEqual(3, value_set.get_count())
+        self.assertEqual([('x', ('a',), 1, 1000), ('x', ('b',), 2, 500), ('y', ('a',), 1, 1000)],
+                         list(value_set.iter_values()))
+        # Each distinct label combination is only stored once
+        self.assertEqual(2, len(value_set._label_values))
+
+        values = value_set.values
+        self.assertEqual(['a'], values[0].label_values)
+        self.assertIsNone(values[0].time)
+        self.assertEqual(500, values[1].time)
+        self.assertEqual('y', values[2].name)
+
+    def test_static_labels(self):
+        row = ValueSet(labels=['host'])
+        row.add(Value(1, ['a']))
+        columnar = ColumnarValueSet(labels=['host'])
+        columnar.add_value(1, ['a'])
+        copy = columnar.copy()
+        for value_set in (row, columnar):
+            value_set.add_static_labels({'dc': 'x'})
+            self.assertEqual(['host', 'dc'], value_set.labels)
+            self.assertEqual(['a', 'x'], value_set.values[0].label_values)
+        # The copy is independent
+        self.assertEqual([(None, ('a',), 1, 0)], list(copy.iter_values()))
+
+    def test_encode(self):
+        columnar = ColumnarValueSet(labels=['host'])
+        columnar.add_value(1.5, ['a'])
+        row = ValueSet(labels=['host'])
+        row.time = 1000
+        row.add(Value(2, ['b'], 'x', 500))
+        columnar_copy, row_copy = decode(encode([columnar, row]))
+        self.assertEqual(list(columnar.iter_values()), list(columnar_copy.iter_values()))
+        self.assertEqual([('x', ['b'], 2, 500)], list(row_copy.iter_values()))
+        self.assertEqual(1000, row_copy.time)
+
+    def test_key(self):
+        self.assertEqual(('x', ('a', 'bc')), Value(1, ['a', 'bc'], 'x').get_key())
+        # Label boundaries are part of the key
+        self.assertNotEqual(Value(1, ['a', 'bc'], 'x').get_key(), Value(1, ['ab', 'c'], 'x').get_key())
+        self.assertEqual((None, ()), Value(1).get_key())
@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import wait
+from time import sleep
+from unittest import TestCase
+
+from pollect.core.WorkerPool import WorkerPool
+
+
+class TestWorkerPool(TestCase):
+
+    def test_max_concurrency(self):
+        pool = WorkerPool(4)
+        slow = pool.create_quota('slow', 1)
+        fast = pool.create_quota('fast', 3)
+        lock = threading.Lock()
+        running = {'slow': 0, 'fast': 0}
+        peak = {'slow': 0, 'fast': 0}
+
+        def job(name: str):
+            with lock:
+                running[name] += 1
+                peak[name] = max(peak[name], running[name])
+            sleep(0.1)
+            with lock:
+                running[name] -= 1
+            return name
+
+        futures = [slow.submit(job, 'slow') for _ in range(5)]
+        futures.extend(fast.submit(job, 'fast') for _ in range(6))
+        for future in futures:
+            future.result(5)
+
+        self.assertEqual(1, peak['slow'])
+        self.assertEqual(3, peak['fast'])
+        slow.shutdown()
+        fast.shutdown()
+
+    def test_priority(self):
+        pool = WorkerPool(1)
+        low = pool.create_quota('low', 2, priority=0)
+        high = pool.create_quota('high', 1, priority=10)
+        order = []
+        gate = threading.Event()
+
+        # Block the only worker so the following jobs are queued
+        blocker = low.submit(gate.wait)
+        futures = [low.submit(order.append, 'low') for _ in range(2)]
+        futures.append(high.submit(order.append, 'high'))
+        gate.set()
+        blocker.result(5)
+        for future in futures:
+            future.result(5)
+
+        self.assertEqual(['high', 'low', 'low'], order)
+        low.shutdown()
+        high.shutdown()
+
+    def test_shutdown_cancels_pending(self):
+        pool = WorkerPool(1)
+        quota = pool.create_quota('a', 1)
+        gate = threading.Event()
+        quota.submit(gate.wait)
+        pending = quota.submit(lambda: 1)
+        quota.shutdown()
+        gate.set()
+        self.assertTrue(pending.cancelled())
+        # Waiters of the cancelled future are woken up
+        self.assertEqual(1, len(wait([pending], timeout=5).done))
+        with self.assertRaises(RuntimeError):
+            quota.submit(lambda: 1)
@@ -0,0 +1,30 @@
+import contextlib
+import io
+import json
+import logging
+from unittest import TestCase
+
+from pollect import bench
+
+
+class TestBench(TestCase):
+
+    def test_json(self):
+        output = io.StringIO()
+        disabled = logging.root.manager.disable
+        with contextlib.redirect_stdout(output):
+            bench.main(['--sources', '4', '--values', '3', '--executors', '2', '--ticks', '3', '--json'])
+        # Logging is only disabled during the run
+        self.assertEqual(disabled, logging.root.manager.disable)
+        results = json.loads(output.getvalue())
+        self.assertEqual(4, results['parameters']['sources'])
+        self.assertGreater(results['ticks_per_second'], 0)
+        latency = results['tick_latency_seconds']
+        self.assertTrue(latency['p50'] <= latency['p90'] <= latency['p99'] <= latency['max'])
+        self.assertIsNone(results['scrape_render_seconds'])
+
+    def test_percentile(self):
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(50, bench.get_percentile(values, 50))
+        self.assertEqual(99, bench.get_percentile(values, 99))
+        self.assertEqual(1, bench.get_percentile([1.0], 99))
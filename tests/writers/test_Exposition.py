@@ -0,0 +1,143 @@
+import gzip
+from unittest import TestCase
+
+from pollect.core.ValueSet import ValueSet, Value, ColumnarValueSet
+from pollect.writers.Exposition import Exposition, choose_encoding, IDENTITY, ENCODINGS
+
+
+def get_path(set_name, value_name):
+    if value_name is None:
+        return set_name
+    return set_name + '_' + value_name
+
+
+class TestExposition(TestCase):
+
+    def test_render(self):
+        exposition = Exposition(get_path)
+        labeled = ValueSet(labels=['a'])
+        labeled.name = 'test'
+        labeled.add(Value(1, ['x"y\\'], 'value'))
+        labeled.add(Value(2.5, ['z'], 'value'))
+        plain = ValueSet()
+        plain.name = 'plain'
+        plain.add(Value(3))
+        exposition.write([labeled, plain], 'source')
+
+        self.assertEqual('# HELP test_value test_value\n'
+                         '# TYPE test_value gauge\n'
+                         'test_value{a="x\\"y\\\\"} 1.0\n'
+                         'test_value{a="z"} 2.5\n'
+                         '# HELP plain plain\n'
+                         '# TYPE plain gauge\n'
+                         'plain 3.0\n', exposition.get_body().decode('utf-8'))
+        self.assertEqual(exposition.get_body(), gzip.decompress(exposition.get_body(True)))
+
+    def test_removal(self):
+        exposition = Exposition(get_path)
+        value_set = ColumnarValueSet(labels=['a'])
+        value_set.name = 'test'
+        value_set.add_value(1, ('1',))
+        value_set.add_value(2, ('2',))
+        other = ValueSet(labels=['a'])
+        other.name = 'test'
+        other.add(Value(3, ['3']))
+        exposition.write([value_set], 'first')
+        exposition.write([other], 'second')
+        generation = exposition.generation
+
+        value_set = ColumnarValueSet(labels=['a'])
+        value_set.name = 'test'
+        value_set.add_value(4, ('2',))
+        exposition.write([value_set], 'first')
+        self.assertEqual(generation + 1, exposition.generation)
+        body = exposition.get_body().decode('utf-8')
+        self.assertNotIn('a="1"', body)
+        self.assertIn('test{a="2"} 4.0\n', body)
+        self.assertIn('test{a="3"} 3.0\n', body)
+
+        # Metrics without any series are removed completely
+        exposition.write([], 'first')
+        exposition.write([], 'second')
+        self.assertEqual(b'', exposition.get_body())
+
+    def test_shared_series(self):
+        exposition = Exposition(get_path)
+
+        def write(value: float, labels, source_ref):
+            value_set = ValueSet(labels=['a'])
+            value_set.name = 'test'
+            for label in labels:
+                value_set.add(Value(value, [label]))
+            exposition.write([value_set], source_ref)
+
+        write(1, ['h', 'x'], 'first')
+        write(2, ['h'], 'second')
+        self.assertEqual('# HELP test test\n'
+                         '# TYPE test gauge\n'
+                         'test{a="h"} 2.0\n'
+                         'test{a="x"} 1.0\n', exposition.get_body().decode('utf-8'))
+
+        # The last write wins
+        write(3, ['h', 'x'], 'first')
+        self.assertIn(b'test{a="h"} 3.0\n', exposition.get_body())
+        self.assertEqual(1, exposition.get_body().count(b'a="h"'))
+
+        # Series which are still written by another source are kept
+        write(3, ['x'], 'first')
+        self.assertIn(b'test{a="h"} 2.0\n', exposition.get_body())
+
+    def test_timestamps(self):
+        exposition = Exposition(get_path, timestamps=True)
+        value_set = ValueSet()
+        value_set.name = 'test'
+        value_set.time = 1000
+        value_set.add(Value(1))
+        exposition.write([value_set])
+        self.assertIn(b'test 1.0 1000\n', exposition.get_body())
+
+    def test_label_count(self):
+        exposition = Exposition(get_path)
+        value_set = ValueSet(labels=['a', 'b'])
+        value_set.name = 'test'
+        value_set.add(Value(1, ['x']))
+        with self.assertRaises(ValueError):
+            exposition.write([value_set])
+
+    def test_collections(self):
+        exposition = Exposition(get_path)
+        first = ValueSet()
+        first.name = 'a.x'
+        first.add(Value(1))
+        second = ValueSet()
+        second.name = 'b'
+        second.add(Value(2))
+        exposition.write([first], 'first')
+        exposition.write([second], 'second')
+
+        self.assertEqual(b'# HELP a.x a.x\n# TYPE a.x gauge\na.x 1.0\n', exposition.get('a')[1])
+        self.assertEqual(b'# HELP b b\n# TYPE b gauge\nb 2.0\n', exposition.get('b')[1])
+        self.assertIsNone(exposition.get('c'))
+
+        # Only the ETags of the written collection change
+        etag_a = exposition.get('a')[0]
+        etag_b, body_b = exposition.get('b', 'gzip')
+        etag_all = exposition.get()[0]
+        exposition.write([first], 'first')
+        self.assertNotEqual(etag_a, exposition.get('a')[0])
+        self.assertEqual((etag_b, body_b), exposition.get('b', 'gzip'))
+        self.assertNotEqual(etag_all, exposition.get()[0])
+        self.assertEqual(b'# HELP b b\n# TYPE b gauge\nb 2.0\n', gzip.decompress(body_b))
+        # Each encoding has its own ETag
+        self.assertNotEqual(etag_b, exposition.get('b')[0])
+
+        exposition.write([], 'first')
+        self.assertIsNone(exposition.get('a'))
+
+    def test_choose_encoding(self):
+        self.assertEqual(IDENTITY, choose_encoding(''))
+        self.assertEqual(IDENTITY, choose_encoding('deflate, gzip;q=0'))
+        self.assertEqual('gzip', choose_encoding('deflate, GZIP'))
+        self.assertEqual(ENCODINGS[0], choose_encoding('gzip, zstd'))
+        if 'zstd' in ENCODINGS:
+            self.assertEqual('gzip', choose_encoding('gzip, zstd;q=0.5'))